@@ -3,6 +3,10 @@ ASGI config for Stocker project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Servirlo con un servidor ASGI (p. ej. ``uvicorn Stocker.asgi:application``)
+habilita el stream SSE de notificaciones (/api/notificaciones/stream/); bajo
+WSGI el navbar vuelve al polling.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
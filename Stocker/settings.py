@@ -153,6 +153,21 @@ LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/inventario/'
 LOGOUT_REDIRECT_URL = '/login/'
 
+# Notificaciones diferidas (outbox), opcional: los productores solo insertan
+# un EventoNotificacion y un worker dedicado crea las notificaciones por
+# usuario. Para activarlo, desplegar junto a la web un proceso persistente
+#     python manage.py procesar_notificaciones --continuo
+# (con reinicio automático, p. ej. systemd o supervisor) y poner True. Sin ese
+# proceso las notificaciones quedan en el outbox. Con False se crean en el
+# momento, dentro de la transacción del productor.
+NOTIFICACIONES_DIFERIDAS = False
+
+# Digest de stock crítico (solo con NOTIFICACIONES_DIFERIDAS): las alertas se
+# acumulan durante estos minutos y cada encargado recibe una sola notificación
+# con los materiales afectados; el worker lo envía al cerrar la ventana.
+# 0 = una notificación por material.
+NOTIFICACIONES_DIGEST_STOCK_MINUTOS = 10
+
 PASSWORD_HASHERS = [
     'django.contrib.auth.hashers.Argon2PasswordHasher',  # <-- Argon2id (prioridad 1)
     'django.contrib.auth.hashers.PBKDF2PasswordHasher',  # Fallback
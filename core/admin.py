@@ -1,11 +1,17 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.utils import timezone
 from .models import (
     Rol, Material, Inventario, Mensual, Alerta,
     Solicitud, DetalleSolicitud, Movimiento, Notificacion,
-    Configuracion, Local
+    Configuracion, Local, SugerenciaCompra, TareaProgramada, EjecucionTarea,
+    NotificacionArchivada, EventoNotificacion, CorteStock, InventarioDiario
 )
+from .services.notificaciones_service import recalcular_contadores
+from .services import stock_service
 
 # Obtener el modelo de Usuario personalizado
 Usuario = get_user_model()
@@ -147,14 +153,75 @@ class MaterialAdmin(admin.ModelAdmin):
     )
 
 
+class InventarioAdminForm(forms.ModelForm):
+    """Lleva la versión cargada para detectar cambios concurrentes al guardar."""
+    # No puede llamarse 'version': el campo del modelo no es editable
+    version_cargada = forms.IntegerField(widget=forms.HiddenInput, required=False)
+    
+    class Meta:
+        model = Inventario
+        fields = '__all__'
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['version_cargada'].initial = self.instance.version
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.instance.pk and cleaned_data.get('version_cargada') != self.instance.version:
+            # Al volver a mostrar el formulario ya queda con la versión vigente
+            self.data = self.data.copy()
+            self.data['version_cargada'] = self.instance.version
+            raise forms.ValidationError(
+                f'El inventario cambió mientras editabas: el stock actual es '
+                f'{self.instance.stock_actual}. Revisa los valores y guarda nuevamente.'
+            )
+        return cleaned_data
+
+
 @admin.register(Inventario)
 class InventarioAdmin(admin.ModelAdmin):
-    list_display = ['material', 'stock_actual', 'stock_seguridad', 'estado_stock', 'fecha_actualizacion']
+    form = InventarioAdminForm
+    list_display = ['material', 'stock_actual', 'stock_reservado', 'stock_seguridad', 'estado_stock', 'fecha_actualizacion']
     list_filter = ['fecha_actualizacion']
     search_fields = ['material__codigo', 'material__descripcion']
     ordering = ['stock_actual']
     readonly_fields = ['fecha_creacion', 'fecha_actualizacion']
     
+    def save_model(self, request, obj, form, change):
+        """
+        UPDATE condicional por versión (solo los campos editados) y
+        movimiento de ajuste si cambió el stock, para que el libro cuadre.
+        """
+        if not change:
+            return super().save_model(request, obj, form, change)
+        
+        campos = {campo: getattr(obj, campo) for campo in form.changed_data if campo != 'version_cargada'}
+        if not campos:
+            return
+        filas = Inventario.objects.filter(pk=obj.pk, version=form.cleaned_data['version_cargada']).update(
+            **campos, version=F('version') + 1, fecha_actualizacion=timezone.now()
+        )
+        if not filas:
+            self.message_user(
+                request,
+                'No se guardó: el inventario cambió mientras editabas. Vuelve a abrirlo.',
+                messages.ERROR
+            )
+            return
+        
+        if 'stock_actual' in campos:
+            diferencia = obj.stock_actual - form.initial['stock_actual']
+            Movimiento.objects.create(
+                material=obj.material,
+                usuario=request.user,
+                tipo='ajuste',
+                cantidad=abs(diferencia),
+                variacion=diferencia,
+                detalle=f'Ajuste desde administración ({diferencia:+d})',
+            )
+            stock_service.alertar_si_critico(obj)
+    
     def estado_stock(self, obj):
         """Indicador visual del estado del stock"""
         if obj.stock_actual <= obj.stock_seguridad:
@@ -186,7 +253,7 @@ class AlertaAdmin(admin.ModelAdmin):
 
 @admin.register(Movimiento)
 class MovimientoAdmin(admin.ModelAdmin):
-    list_display = ['material', 'usuario', 'tipo', 'cantidad', 'solicitud', 'fecha']
+    list_display = ['material', 'usuario', 'tipo', 'cantidad', 'variacion', 'solicitud', 'fecha']
     list_filter = ['tipo', 'fecha']
     search_fields = ['material__codigo', 'material__descripcion', 'detalle']
     ordering = ['-fecha']
@@ -195,7 +262,7 @@ class MovimientoAdmin(admin.ModelAdmin):
     
     fieldsets = (
         ('Información del Movimiento', {
-            'fields': ('material', 'tipo', 'cantidad', 'usuario')
+            'fields': ('material', 'tipo', 'cantidad', 'variacion', 'usuario')
         }),
         ('Solicitud Asociada', {
             'fields': ('solicitud',),
@@ -283,15 +350,34 @@ class NotificacionAdmin(admin.ModelAdmin):
         return obj.mensaje[:50] + '...' if len(obj.mensaje) > 50 else obj.mensaje
     mensaje_corto.short_description = "Mensaje"
     
+    # Las ediciones desde el admin no pasan por notificaciones_service:
+    # se recalculan los contadores de los usuarios afectados.
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        recalcular_contadores([obj.usuario_id])
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        recalcular_contadores([obj.usuario_id])
+    
+    def delete_queryset(self, request, queryset):
+        usuario_ids = list(queryset.values_list('usuario_id', flat=True).distinct())
+        super().delete_queryset(request, queryset)
+        recalcular_contadores(usuario_ids)
+    
     def marcar_como_leidas(self, request, queryset):
         """Marcar notificaciones como leídas"""
+        usuario_ids = list(queryset.values_list('usuario_id', flat=True).distinct())
         updated = queryset.update(leida=True)
+        recalcular_contadores(usuario_ids)
         self.message_user(request, f'{updated} notificación(es) marcada(s) como leída(s).')
     marcar_como_leidas.short_description = "Marcar como leídas"
     
     def marcar_como_no_leidas(self, request, queryset):
         """Marcar notificaciones como no leídas"""
+        usuario_ids = list(queryset.values_list('usuario_id', flat=True).distinct())
         updated = queryset.update(leida=False)
+        recalcular_contadores(usuario_ids)
         self.message_user(request, f'{updated} notificación(es) marcada(s) como no leída(s).')
     marcar_como_no_leidas.short_description = "Marcar como no leídas"
 
@@ -321,12 +407,117 @@ class ConfiguracionAdmin(admin.ModelAdmin):
 
 @admin.register(Local)
 class LocalAdmin(admin.ModelAdmin):
-    list_display = ['codigo', 'nombre', 'direccion', 'numero', 'comuna', 'region']
+    list_display = ['codigo', 'nombre', 'direccion', 'numero', 'comuna', 'region', 'prioridad']
+    list_editable = ['prioridad']
     list_filter = ['region', 'comuna']
     search_fields = ['codigo', 'nombre', 'direccion', 'comuna']
     ordering = ['codigo']
 
 
+@admin.register(SugerenciaCompra)
+class SugerenciaCompraAdmin(admin.ModelAdmin):
+    list_display = ['material', 'stock_actual', 'punto_pedido', 'nivel_objetivo', 'cantidad_sugerida', 'metodo', 'fecha_calculo']
+    list_filter = ['metodo', 'fecha_calculo']
+    search_fields = ['material__codigo', 'material__descripcion']
+    ordering = ['-cantidad_sugerida']
+    readonly_fields = ['fecha_calculo']
+
+
+class EjecucionTareaInline(admin.TabularInline):
+    """Últimas ejecuciones dentro de la tarea"""
+    model = EjecucionTarea
+    extra = 0
+    fields = ['inicio', 'duracion', 'exito', 'error']
+    readonly_fields = fields
+    ordering = ['-inicio']
+    max_num = 0
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('salida')
+
+
+@admin.register(TareaProgramada)
+class TareaProgramadaAdmin(admin.ModelAdmin):
+    list_display = ['nombre', 'comando', 'cron', 'activa', 'proxima_ejecucion', 'ultima_ejecucion', 'ultima_duracion', 'ultimo_exito', 'en_ejecucion']
+    list_filter = ['activa', 'ultimo_exito']
+    search_fields = ['nombre', 'comando']
+    readonly_fields = ['proxima_ejecucion', 'en_ejecucion', 'inicio_ejecucion', 'ultima_ejecucion', 'ultima_duracion', 'ultimo_exito']
+    inlines = [EjecucionTareaInline]
+    
+    actions = ['liberar_bloqueo']
+    
+    def save_model(self, request, obj, form, change):
+        """Recalcular la próxima ejecución si cambia la expresión cron"""
+        if 'cron' in form.changed_data:
+            obj.proxima_ejecucion = None
+        super().save_model(request, obj, form, change)
+    
+    def liberar_bloqueo(self, request, queryset):
+        """Liberar tareas que quedaron marcadas en ejecución"""
+        updated = queryset.update(en_ejecucion=False, inicio_ejecucion=None)
+        self.message_user(request, f'{updated} tarea(s) liberada(s).')
+    liberar_bloqueo.short_description = "Liberar bloqueo de ejecución"
+
+
+@admin.register(EjecucionTarea)
+class EjecucionTareaAdmin(admin.ModelAdmin):
+    list_display = ['tarea', 'inicio', 'duracion', 'exito']
+    list_filter = ['exito', 'tarea', 'inicio']
+    ordering = ['-inicio']
+    date_hierarchy = 'inicio'
+    readonly_fields = ['tarea', 'inicio', 'fin', 'duracion', 'exito', 'salida', 'error']
+
+
+@admin.register(EventoNotificacion)
+class EventoNotificacionAdmin(admin.ModelAdmin):
+    list_display = ['id', 'tipo', 'destino', 'usuario', 'material', 'creado_en', 'procesado_en']
+    list_filter = ['tipo', 'destino', 'procesado_en']
+    ordering = ['-id']
+    readonly_fields = ['creado_en', 'procesado_en']
+
+
+@admin.register(NotificacionArchivada)
+class NotificacionArchivadaAdmin(admin.ModelAdmin):
+    list_display = ['id_original', 'usuario_id', 'tipo', 'leida', 'creada_en', 'archivada_en']
+    list_filter = ['tipo', 'leida', 'archivada_en']
+    search_fields = ['mensaje']
+    ordering = ['-archivada_en']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(CorteStock)
+class CorteStockAdmin(admin.ModelAdmin):
+    list_display = ['material', 'fecha', 'stock']
+    search_fields = ['material__codigo', 'material__descripcion']
+    ordering = ['-fecha']
+    date_hierarchy = 'fecha'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(InventarioDiario)
+class InventarioDiarioAdmin(admin.ModelAdmin):
+    list_display = ['material', 'dia', 'stock_actual', 'stock_seguridad']
+    search_fields = ['material__codigo', 'material__descripcion']
+    ordering = ['-dia']
+    date_hierarchy = 'dia'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 # Personalización del Admin Site
 admin.site.site_header = "Stocker - Administración"
 admin.site.site_title = "Stocker Admin"
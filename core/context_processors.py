@@ -1,14 +1,20 @@
-from .models import Notificacion
+from django.utils.functional import SimpleLazyObject
+
+from .services.notificaciones_service import datos_navbar
 
 def notificaciones(request):
-    if request.user.is_authenticated:
-        notificaciones_no_leidas = Notificacion.objects.filter(
-            usuario=request.user, 
-            leida=False
-        )[:5]  # Últimas 5
-        count = notificaciones_no_leidas.count()
-        return {
-            'notificaciones': notificaciones_no_leidas,
-            'notificaciones_count': count
-        }
-    return {'notificaciones': [], 'notificaciones_count': 0}
\ No newline at end of file
+    """
+    Resumen de notificaciones para el navbar. Es perezoso: solo consulta
+    (caché o BD) si el template usa las variables, así redirecciones, JSON
+    y descargas no pagan nada.
+    """
+    def cargar():
+        if request.user.is_authenticated:
+            return datos_navbar(request.user)
+        return {'notificaciones': [], 'count': 0}
+
+    datos = SimpleLazyObject(cargar)
+    return {
+        'notificaciones': SimpleLazyObject(lambda: datos['notificaciones']),
+        'notificaciones_count': SimpleLazyObject(lambda: datos['count']),
+    }
@@ -100,10 +100,11 @@ class EditarMaterialForm(forms.ModelForm):
         material = super().save(commit=False)
         if commit:
             material.save()
-            # Guardar cambios del Inventario
+            # Guardar cambios del Inventario (solo esa columna: save() reescribiría stock_actual)
             if hasattr(material, 'inventario'):
-                material.inventario.stock_seguridad = self.cleaned_data.get('stock_seguridad', 0)
-                material.inventario.save()
+                Inventario.objects.filter(material=material).update(
+                    stock_seguridad=self.cleaned_data.get('stock_seguridad', 0)
+                )
         return material
 
 
@@ -0,0 +1,136 @@
+"""
+Prueba de estrés de descuentos de stock concurrentes.
+
+Compara el patrón anterior (leer stock_actual, restar en Python y save())
+con stock_service.descontar (UPDATE condicional). Cada hilo descuenta de a
+1 unidad sobre un material temporal. Se piden más unidades que el stock
+inicial, así se detectan tanto actualizaciones perdidas como sobreventa.
+
+Pensado para MySQL: SQLite serializa las escrituras y reportará bloqueos.
+
+Uso:
+    python manage.py benchmark_stock
+    python manage.py benchmark_stock --hilos 16 --operaciones 200
+"""
+
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.models import Material, Inventario
+from core.services import stock_service
+from core.services.stock_service import StockInsuficiente
+
+CODIGO_BENCHMARK = 'BENCH-STOCK'
+
+
+def _descuento_anterior(material_id):
+    """Leer-modificar-guardar, como lo hacían las vistas antes de stock_service."""
+    with transaction.atomic():
+        inventario = Inventario.objects.get(material_id=material_id)
+        if inventario.stock_actual < 1:
+            return False
+        inventario.stock_actual -= 1
+        inventario.save()
+        return True
+
+
+def _descuento_condicional(material_id):
+    with transaction.atomic():
+        try:
+            stock_service.descontar(material_id, 1)
+            return True
+        except StockInsuficiente:
+            return False
+
+
+class Command(BaseCommand):
+    help = 'Mide throughput y actualizaciones perdidas al descontar stock en paralelo'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hilos',
+            type=int,
+            default=8,
+            help='Hilos concurrentes (default: 8)'
+        )
+        parser.add_argument(
+            '--operaciones',
+            type=int,
+            default=100,
+            help='Descuentos por hilo (default: 100)'
+        )
+
+    def handle(self, *args, **options):
+        hilos = options['hilos']
+        operaciones = options['operaciones']
+        # La mitad de lo que se pide: la segunda mitad debe rechazarse
+        stock_inicial = hilos * operaciones // 2
+
+        material = self._crear_material()
+        try:
+            for nombre, funcion in [
+                ('save() (anterior)', _descuento_anterior),
+                ('UPDATE condicional', _descuento_condicional),
+            ]:
+                self._ejecutar(nombre, funcion, material, hilos, operaciones, stock_inicial)
+        finally:
+            material.delete()
+
+    def _crear_material(self):
+        # bulk_create: sin signals (no notifica "material nuevo" ni crea movimientos)
+        Material.objects.filter(codigo=CODIGO_BENCHMARK).delete()
+        Material.objects.bulk_create([
+            Material(codigo=CODIGO_BENCHMARK, descripcion='Material de benchmark', unidad_medida='unidad')
+        ])
+        material = Material.objects.get(codigo=CODIGO_BENCHMARK)
+        Inventario.objects.bulk_create([Inventario(material=material, stock_actual=0, stock_seguridad=-1)])
+        return material
+
+    def _ejecutar(self, nombre, funcion, material, hilos, operaciones, stock_inicial):
+        Inventario.objects.filter(material=material).update(stock_actual=stock_inicial)
+
+        exitos = [0] * hilos
+        errores = [0] * hilos
+        barrera = threading.Barrier(hilos)
+
+        def trabajador(indice):
+            try:
+                barrera.wait()
+                for _ in range(operaciones):
+                    try:
+                        if funcion(material.id):
+                            exitos[indice] += 1
+                    except Exception:
+                        errores[indice] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=trabajador, args=(i,)) for i in range(hilos)]
+        t0 = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        duracion = time.monotonic() - t0
+
+        stock_final = Inventario.objects.get(material=material).stock_actual
+        total_exitos = sum(exitos)
+        # Si cada descuento exitoso se aplicó, stock_final = inicial - éxitos
+        perdidas = stock_final - (stock_inicial - total_exitos)
+        sobreventa = max(total_exitos - stock_inicial, 0)
+
+        self.stdout.write(f"\n{nombre}")
+        self.stdout.write(f"  Operaciones: {hilos * operaciones} en {duracion:.2f}s "
+                          f"({hilos * operaciones / duracion:.0f} ops/s)")
+        self.stdout.write(f"  Descuentos OK: {total_exitos} / stock inicial {stock_inicial}")
+        self.stdout.write(f"  Stock final: {stock_final}  Errores: {sum(errores)}")
+
+        if perdidas or sobreventa:
+            self.stdout.write(self.style.ERROR(
+                f"  ❌ Actualizaciones perdidas: {perdidas}  Sobreventa: {sobreventa}"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS("  ✓ Sin actualizaciones perdidas ni sobreventa"))
@@ -0,0 +1,41 @@
+"""
+Recalcula días de cobertura y fecha proyectada de quiebre para todo el inventario.
+
+Uso:
+    python manage.py calcular_cobertura
+"""
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+from django.utils import timezone
+from datetime import timedelta
+
+from core.models import Inventario
+from core.services.cobertura_service import calcular_cobertura_global
+
+
+class Command(BaseCommand):
+    help = 'Calcula días de cobertura y fecha de quiebre por material a partir del último resultado ML'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Filas por UPDATE en bulk_update (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        total = calcular_cobertura_global(batch_size=options['batch_size'])
+
+        hoy = timezone.localdate()
+        resumen = Inventario.objects.aggregate(
+            sin_demanda=Count('id', filter=Q(dias_cobertura__isnull=True)),
+            quiebre_7=Count('id', filter=Q(fecha_quiebre__lte=hoy + timedelta(days=7))),
+            quiebre_30=Count('id', filter=Q(fecha_quiebre__lte=hoy + timedelta(days=30))),
+        )
+
+        self.stdout.write(self.style.SUCCESS(f"✓ Cobertura calculada para {total} materiales"))
+        self.stdout.write(f"  Quiebre en ≤ 7 días: {resumen['quiebre_7']}")
+        self.stdout.write(f"  Quiebre en ≤ 30 días: {resumen['quiebre_30']}")
+        self.stdout.write(f"  Sin demanda pronosticada: {resumen['sin_demanda']}")
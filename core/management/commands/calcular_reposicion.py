@@ -0,0 +1,63 @@
+"""
+Genera sugerencias de compra para todo el catálogo (order-up-to o EOQ).
+
+Uso:
+    python manage.py calcular_reposicion
+    python manage.py calcular_reposicion --metodo eoq --costo-pedido 80 --costo-mantencion 2
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.reposicion_service import calcular_sugerencias_compra
+
+
+class Command(BaseCommand):
+    help = 'Calcula cantidades sugeridas de compra a partir del último resultado ML y el stock actual'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--metodo',
+            type=str,
+            choices=['order_up_to', 'eoq'],
+            default='order_up_to',
+            help="'order_up_to' (reponer a nivel objetivo) o 'eoq' (lote económico)"
+        )
+        parser.add_argument(
+            '--dias-revision',
+            type=int,
+            default=7,
+            help='Período entre revisiones, en días (order-up-to)'
+        )
+        parser.add_argument(
+            '--costo-pedido',
+            type=float,
+            default=50.0,
+            help='Costo fijo por orden de compra (EOQ)'
+        )
+        parser.add_argument(
+            '--costo-mantencion',
+            type=float,
+            default=1.0,
+            help='Costo anual de mantener una unidad en bodega (EOQ)'
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+
+        try:
+            sugerencias = calcular_sugerencias_compra(
+                metodo=options['metodo'],
+                dias_revision=options['dias_revision'],
+                costo_pedido=options['costo_pedido'],
+                costo_mantencion=options['costo_mantencion'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e)) from e
+
+        duracion = time.monotonic() - inicio
+        total_unidades = sum(s.cantidad_sugerida for s in sugerencias)
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {len(sugerencias)} materiales a reponer ({total_unidades} unidades) en {duracion:.2f}s"
+        ))
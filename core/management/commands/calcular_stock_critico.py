@@ -9,8 +9,10 @@ Uso:
 Autor: Sistema ML Stocker (versión simplificada)
 """
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from core.services.ml_service import ejecutar_calculo_global, detectar_estacion_actual
+from core.services.cobertura_service import calcular_cobertura_global
+from core.services.reposicion_service import calcular_sugerencias_compra
 
 
 class Command(BaseCommand):
@@ -66,6 +68,8 @@ class Command(BaseCommand):
                 usar_formula_conservadora=usar_conservadora,
                 usar_estacion=usar_estacion
             )
+            calcular_cobertura_global()
+            calcular_sugerencias_compra()
 
             # Resumen de resultados
             self.stdout.write("")
@@ -118,4 +122,5 @@ class Command(BaseCommand):
                 )
             )
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f"❌ Error: {str(e)}"))
\ No newline at end of file
+            # CommandError: código de salida != 0 para cron / run_scheduler
+            raise CommandError(f"❌ Error: {str(e)}") from e
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+Exporta movimientos, detalles de solicitud y demanda diaria a Parquet
+particionado por año/mes.
+
+Uso:
+    python manage.py exportar_parquet --destino /data/stocker
+    python manage.py exportar_parquet --destino /data/stocker --dataset movimientos --desde 2025-01-01
+
+Lectura:
+    pandas.read_parquet('/data/stocker/movimientos')
+    duckdb: SELECT * FROM read_parquet('/data/stocker/movimientos/*/*/*.parquet', hive_partitioning=true)
+"""
+
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.exportacion_parquet import DATASETS, exportar_dataset_particionado
+
+
+class Command(BaseCommand):
+    help = 'Exporta el historial de movimientos y demanda a archivos Parquet particionados por año/mes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--destino',
+            type=str,
+            required=True,
+            help='Carpeta raíz donde se escriben los datasets'
+        )
+        parser.add_argument(
+            '--dataset',
+            type=str,
+            choices=list(DATASETS) + ['todos'],
+            default='todos',
+            help='Dataset a exportar (default: todos)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50000,
+            help='Filas leídas por lote desde la BD (default: 50000)'
+        )
+        parser.add_argument(
+            '--desde', type=date.fromisoformat, help='Fecha inicial (YYYY-MM-DD); se exporta desde el inicio de su mes'
+        )
+        parser.add_argument(
+            '--hasta', type=date.fromisoformat, help='Fecha final (YYYY-MM-DD); se exporta hasta el fin de su mes'
+        )
+
+    def handle(self, *args, **options):
+        nombres = list(DATASETS) if options['dataset'] == 'todos' else [options['dataset']]
+
+        for nombre in nombres:
+            inicio = time.monotonic()
+            try:
+                filas, particiones = exportar_dataset_particionado(
+                    nombre,
+                    options['destino'],
+                    chunk_size=options['chunk_size'],
+                    desde=options['desde'],
+                    hasta=options['hasta'],
+                )
+            except ImportError as e:
+                raise CommandError(str(e)) from e
+
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ {nombre}: {filas} filas, {particiones} particiones en {time.monotonic() - inicio:.1f}s"
+            ))
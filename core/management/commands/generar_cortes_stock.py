@@ -0,0 +1,18 @@
+"""
+Guarda un corte de stock por material (ver historico_service).
+
+Uso:
+    python manage.py generar_cortes_stock
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.services.historico_service import generar_cortes
+
+
+class Command(BaseCommand):
+    help = 'Guarda el stock actual de cada material como corte para consultas históricas'
+
+    def handle(self, *args, **options):
+        creados = generar_cortes()
+        self.stdout.write(self.style.SUCCESS(f"✓ {creados} cortes de stock guardados"))
@@ -123,6 +123,7 @@ class Command(BaseCommand):
                         solicitud=solicitud, # <--- Aquí está la clave para el ML
                         tipo='salida',
                         cantidad=cantidad,
+                        variacion=-cantidad,
                         detalle=f"Despacho a {local.nombre}",
                         fecha=current_date
                     ))
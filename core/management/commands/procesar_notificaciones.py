@@ -0,0 +1,70 @@
+"""
+Worker del outbox de notificaciones (EventoNotificacion -> Notificacion).
+
+Uso:
+    python manage.py procesar_notificaciones              # procesa lo pendiente y sale
+    python manage.py procesar_notificaciones --continuo   # proceso persistente
+    python manage.py procesar_notificaciones --continuo --intervalo 1 --lote 500
+"""
+
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.services.notificaciones_service import procesar_eventos, procesar_digest_stock
+
+
+class Command(BaseCommand):
+    help = 'Expande los eventos pendientes del outbox en notificaciones por usuario'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=200,
+            help='Eventos por transacción (default: 200)'
+        )
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='No terminar: revisar el outbox cada --intervalo segundos'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=2,
+            help='Segundos de espera cuando no hay eventos (default: 2)'
+        )
+
+    def handle(self, *args, **options):
+        self.detener = False
+        if options['continuo']:
+            signal.signal(signal.SIGTERM, self._detener)
+            signal.signal(signal.SIGINT, self._detener)
+
+        total_eventos = total_notificaciones = 0
+        while not self.detener:
+            close_old_connections()
+            eventos, notificaciones = procesar_eventos(options['lote'])
+            digest, notificaciones_digest = procesar_digest_stock()
+            total_eventos += eventos + digest
+            total_notificaciones += notificaciones + notificaciones_digest
+
+            if eventos:
+                self.stdout.write(f"  {eventos} eventos → {notificaciones} notificaciones")
+            if digest:
+                self.stdout.write(f"  Digest stock crítico: {digest} alertas → {notificaciones_digest} notificaciones")
+            if eventos or digest:
+                continue
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {total_eventos} eventos procesados ({total_notificaciones} notificaciones)"
+        ))
+
+    def _detener(self, signum, frame):
+        self.detener = True
@@ -0,0 +1,69 @@
+"""
+Retención de notificaciones: archiva o elimina las antiguas en lotes por PK.
+
+Uso:
+    python manage.py purgar_notificaciones
+    python manage.py purgar_notificaciones --dias-leidas 30 --dias-no-leidas 180
+    python manage.py purgar_notificaciones --eliminar --lote 500 --pausa 0.2
+    python manage.py purgar_notificaciones --simular
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.services.notificaciones_service import purgar_notificaciones
+
+
+class Command(BaseCommand):
+    help = 'Archiva (o elimina) notificaciones antiguas según la política de retención'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias-leidas',
+            type=int,
+            default=30,
+            help='Antigüedad máxima de las notificaciones leídas (default: 30)'
+        )
+        parser.add_argument(
+            '--dias-no-leidas',
+            type=int,
+            default=180,
+            help='Antigüedad máxima de las notificaciones no leídas (default: 180)'
+        )
+        parser.add_argument(
+            '--eliminar',
+            action='store_true',
+            help='Eliminar sin copiar a notificacion_archivada'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Filas por transacción (default: 1000)'
+        )
+        parser.add_argument(
+            '--pausa',
+            type=float,
+            default=0,
+            help='Segundos de espera entre lotes (default: 0)'
+        )
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Solo contar las notificaciones afectadas'
+        )
+
+    def handle(self, *args, **options):
+        total = purgar_notificaciones(
+            dias_leidas=options['dias_leidas'],
+            dias_no_leidas=options['dias_no_leidas'],
+            archivar=not options['eliminar'],
+            lote=options['lote'],
+            pausa=options['pausa'],
+            simular=options['simular'],
+        )
+
+        if options['simular']:
+            self.stdout.write(f"{total} notificaciones serían procesadas")
+        else:
+            accion = 'eliminadas' if options['eliminar'] else 'archivadas'
+            self.stdout.write(self.style.SUCCESS(f"✓ {total} notificaciones {accion}"))
@@ -0,0 +1,90 @@
+"""
+Verifica que Inventario.stock_actual cuadre con la suma de sus movimientos.
+
+Uso:
+    python manage.py reconciliar_stock
+    python manage.py reconciliar_stock --procesos 8 --tamano 1000
+    python manage.py reconciliar_stock --corregir
+"""
+
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Material, Usuario
+from core.services.conciliacion_service import conciliar, corregir, TAMANO_TRAMO
+
+MAX_DETALLE = 50
+
+
+class Command(BaseCommand):
+    help = 'Concilia el stock de cada material con su historial de movimientos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Procesos en paralelo (default: núcleos disponibles)'
+        )
+        parser.add_argument(
+            '--tamano',
+            type=int,
+            default=TAMANO_TRAMO,
+            help=f'Materiales por tramo (default: {TAMANO_TRAMO})'
+        )
+        parser.add_argument(
+            '--corregir',
+            action='store_true',
+            help='Registrar ajustes para que el libro cuadre con el stock actual'
+        )
+        parser.add_argument(
+            '--usuario',
+            help='Username a nombre de quien se registran los ajustes (default: primer BODEGA activo)'
+        )
+
+    def handle(self, *args, **options):
+        t0 = time.monotonic()
+        descuadres = conciliar(tamano=options['tamano'], procesos=options['procesos'])
+        duracion = time.monotonic() - t0
+
+        indeterminados = [d for d in descuadres if d['indeterminado']]
+        diferencias = [d for d in descuadres if not d['indeterminado']]
+
+        if not descuadres:
+            self.stdout.write(self.style.SUCCESS(f"✓ Todo el inventario cuadra con el libro ({duracion:.1f}s)"))
+            return
+
+        codigos = dict(
+            Material.objects.filter(id__in=[d['material_id'] for d in descuadres[:MAX_DETALLE]])
+            .values_list('id', 'codigo')
+        )
+        self.stdout.write(f"Descuadres: {len(diferencias)}  Indeterminados: {len(indeterminados)}  ({duracion:.1f}s)")
+        for d in descuadres[:MAX_DETALLE]:
+            estado = 'INDETERMINADO' if d['indeterminado'] else f"{d['diferencia']:+d}"
+            self.stdout.write(
+                f"  {codigos.get(d['material_id'], d['material_id'])}: "
+                f"stock {d['stock_actual']}  libro {d['esperado']}  {estado}"
+            )
+        if len(descuadres) > MAX_DETALLE:
+            self.stdout.write(f"  ... y {len(descuadres) - MAX_DETALLE} más")
+
+        if not options['corregir']:
+            self.stdout.write(self.style.WARNING("Usa --corregir para registrar los ajustes"))
+            return
+
+        usuario = self._usuario(options['usuario'])
+        creados = corregir(diferencias, usuario)
+        self.stdout.write(self.style.SUCCESS(f"✓ {creados} ajustes de conciliación registrados"))
+
+    def _usuario(self, username):
+        if username:
+            try:
+                return Usuario.objects.get(username=username)
+            except Usuario.DoesNotExist:
+                raise CommandError(f"No existe el usuario '{username}'")
+        usuario = Usuario.objects.filter(rol='BODEGA', is_active=True).order_by('id').first()
+        if usuario is None:
+            raise CommandError('No hay usuarios BODEGA activos; indica --usuario')
+        return usuario
@@ -0,0 +1,54 @@
+"""
+Foto de cierre del inventario en InventarioDiario (ver historico_service).
+
+Sin --dia registra el día en que estaba programada la tarea (variable que
+deja run_scheduler) o, ejecutado a mano, el de hoy: una ejecución atrasada
+pasada la medianoche sigue guardando el cierre del día anterior.
+
+Uso:
+    python manage.py registrar_inventario_diario
+    python manage.py registrar_inventario_diario --dia 2025-03-14
+    python manage.py registrar_inventario_diario --desde 2025-01-01   # rellena días pasados
+"""
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date, parse_datetime
+
+from core.services.historico_service import registrar_inventario_diario, reconstruir_inventario_diario
+from core.services.scheduler_service import VARIABLE_PROGRAMADA
+
+
+class Command(BaseCommand):
+    help = 'Guarda el stock de cierre del día de cada material'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde',
+            help='Reconstruir los días desde esta fecha (YYYY-MM-DD) hasta ayer con cortes y movimientos'
+        )
+        parser.add_argument(
+            '--dia',
+            help='Día a registrar (YYYY-MM-DD). Por defecto el programado o hoy'
+        )
+
+    def handle(self, *args, **options):
+        if options['desde']:
+            desde = parse_date(options['desde'])
+            if desde is None:
+                raise CommandError('--desde debe tener formato YYYY-MM-DD')
+            dias = reconstruir_inventario_diario(desde)
+            self.stdout.write(self.style.SUCCESS(f"✓ {dias} días reconstruidos"))
+
+        dia = None
+        if options['dia']:
+            dia = parse_date(options['dia'])
+            if dia is None:
+                raise CommandError('--dia debe tener formato YYYY-MM-DD')
+        elif os.environ.get(VARIABLE_PROGRAMADA):
+            programada = parse_datetime(os.environ[VARIABLE_PROGRAMADA])
+            dia = programada.date() if programada else None
+
+        filas = registrar_inventario_diario(dia)
+        self.stdout.write(self.style.SUCCESS(f"✓ Inventario diario{f' {dia}' if dia else ''}: {filas} materiales"))
@@ -0,0 +1,27 @@
+"""
+Reconstruye los contadores de notificaciones no leídas desde la tabla Notificacion.
+
+Uso:
+    python manage.py reparar_contadores_notificaciones
+    python manage.py reparar_contadores_notificaciones --usuario 12 --usuario 15
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.services.notificaciones_service import recalcular_contadores
+
+
+class Command(BaseCommand):
+    help = 'Recalcula ContadorNotificaciones (no leídas por usuario y tipo) desde Notificacion'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--usuario',
+            type=int,
+            action='append',
+            help='ID de usuario a reparar (repetible). Por defecto: todos'
+        )
+
+    def handle(self, *args, **options):
+        filas = recalcular_contadores(options['usuario'])
+        self.stdout.write(self.style.SUCCESS(f"✓ {filas} contadores reconstruidos"))
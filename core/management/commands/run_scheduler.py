@@ -0,0 +1,140 @@
+"""
+Planificador de tareas en un proceso persistente (reemplaza al cron externo).
+
+Las tareas se configuran en el admin (Tareas Programadas) con una expresión
+cron de 5 campos. Cada ejecución corre en su propio proceso (manage.py
+<comando>) con el tiempo máximo de la tarea, y hasta --paralelas tareas
+corren a la vez: una tarea larga no atrasa a las demás.
+
+Uso:
+    python manage.py run_scheduler
+    python manage.py run_scheduler --intervalo 15 --paralelas 2
+    python manage.py run_scheduler --una-vez      # ejecuta lo vencido y termina
+    python manage.py run_scheduler --listar
+"""
+
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from django.utils import timezone
+
+from core.models import TareaProgramada
+from core.services.scheduler_service import tareas_vencidas, ejecutar_tarea, programar_siguiente
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta las tareas programadas (ML nocturno, mantenimiento) en un proceso persistente'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=30,
+            help='Segundos entre revisiones de tareas vencidas (default: 30)'
+        )
+        parser.add_argument(
+            '--paralelas',
+            type=int,
+            default=4,
+            help='Tareas que pueden ejecutarse al mismo tiempo (default: 4)'
+        )
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Ejecutar las tareas vencidas una vez y salir'
+        )
+        parser.add_argument(
+            '--listar',
+            action='store_true',
+            help='Mostrar las tareas configuradas y salir'
+        )
+
+    def handle(self, *args, **options):
+        if options['listar']:
+            self.listar()
+            return
+
+        self.detener = False
+        signal.signal(signal.SIGTERM, self._detener)
+        signal.signal(signal.SIGINT, self._detener)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Planificador iniciado (revisión cada {options['intervalo']}s)"
+        ))
+
+        self.en_curso = {}   # tarea_id -> (tarea, Future)
+        # Al salir del bloque se espera a que terminen las tareas en curso
+        with ThreadPoolExecutor(max_workers=options['paralelas']) as pool:
+            while not self.detener:
+                # Proceso de larga vida: descartar conexiones vencidas (conn_max_age)
+                close_old_connections()
+                self._recoger_terminadas()
+
+                for tarea in TareaProgramada.objects.filter(activa=True, proxima_ejecucion__isnull=True):
+                    programar_siguiente(tarea)
+                    self.stdout.write(f"  {tarea.nombre}: próxima ejecución {tarea.proxima_ejecucion:%d/%m/%Y %H:%M}")
+
+                for tarea in tareas_vencidas():
+                    if self.detener:
+                        break
+                    if tarea.pk in self.en_curso:
+                        continue
+                    comando = f"{tarea.comando} {tarea.argumentos}".strip()
+                    self.stdout.write(f"→ Ejecutando {tarea.nombre} ({comando})")
+                    self.en_curso[tarea.pk] = (tarea, pool.submit(self._ejecutar, tarea))
+
+                if options['una_vez']:
+                    break
+
+                for _ in range(options['intervalo']):
+                    if self.detener:
+                        break
+                    time.sleep(1)
+        self._recoger_terminadas()
+
+        self.stdout.write("Planificador detenido")
+
+    def _detener(self, signum, frame):
+        self.detener = True
+
+    @staticmethod
+    def _ejecutar(tarea):
+        try:
+            return ejecutar_tarea(tarea)
+        finally:
+            # Cada hilo abre su propia conexión
+            connections.close_all()
+
+    def _recoger_terminadas(self):
+        for tarea_id, (tarea, futuro) in list(self.en_curso.items()):
+            if not futuro.done():
+                continue
+            del self.en_curso[tarea_id]
+            try:
+                ejecucion = futuro.result()
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"  ❌ {tarea.nombre}: {e}"))
+                continue
+            if ejecucion is None:
+                self.stdout.write(self.style.WARNING(f"  {tarea.nombre} omitida: ya está en ejecución"))
+            elif ejecucion.exito:
+                self.stdout.write(self.style.SUCCESS(f"  ✓ {tarea.nombre} OK en {ejecucion.duracion:.1f}s"))
+            else:
+                self.stdout.write(self.style.ERROR(f"  ❌ {tarea.nombre} con error en {ejecucion.duracion:.1f}s"))
+
+    def listar(self):
+        tareas = TareaProgramada.objects.all()
+        if not tareas:
+            self.stdout.write(self.style.WARNING("No hay tareas programadas"))
+            return
+
+        for tarea in tareas:
+            estado = 'activa' if tarea.activa else 'inactiva'
+            proxima = timezone.localtime(tarea.proxima_ejecucion).strftime('%d/%m/%Y %H:%M') if tarea.proxima_ejecucion else '-'
+            ultima = 'OK' if tarea.ultimo_exito else ('ERROR' if tarea.ultimo_exito is False else '-')
+            self.stdout.write(
+                f"{tarea.nombre:<30} {tarea.cron:<15} {estado:<9} próxima: {proxima}  última: {ultima}"
+            )
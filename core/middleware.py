@@ -2,13 +2,19 @@ class NoCacheMiddleware:
     """
     Evita que el navegador almacene respuestas en caché.
     Útil para impedir volver a páginas protegidas tras logout.
+
+    Las respuestas con ETag (p. ej. la API de notificaciones) se pueden
+    guardar pero se revalidan siempre, así el servidor responde 304.
     """
     def __init__(self, get_response):
         self.get_response = get_response
     
     def __call__(self, request):
         response = self.get_response(request)
-        response['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+        if response.has_header('ETag'):
+            response['Cache-Control'] = 'private, no-cache'
+        else:
+            response['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
         response['Pragma'] = 'no-cache'
         response['Expires'] = '0'
         return response
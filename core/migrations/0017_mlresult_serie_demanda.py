@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_alter_usuario_rut'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mlresult',
+            name='serie_demanda',
+            field=models.BinaryField(blank=True, help_text='Demanda semanal usada en el cálculo (deltas int16)', null=True),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_mlresult_serie_demanda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventario',
+            name='dias_cobertura',
+            field=models.FloatField(blank=True, editable=False, help_text='Stock actual / demanda diaria pronosticada', null=True),
+        ),
+        migrations.AddField(
+            model_name='inventario',
+            name='fecha_quiebre',
+            field=models.DateField(blank=True, editable=False, help_text='Fecha proyectada de quiebre de stock', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='inventario',
+            index=models.Index(fields=['dias_cobertura'], name='core_invent_dias_co_e7bfcc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventario',
+            index=models.Index(fields=['fecha_quiebre'], name='core_invent_fecha_q_c373fb_idx'),
+        ),
+    ]
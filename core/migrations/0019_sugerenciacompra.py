@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:47
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_inventario_cobertura'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SugerenciaCompra',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock_actual', models.IntegerField()),
+                ('demanda_diaria', models.FloatField()),
+                ('leadtime_dias', models.IntegerField()),
+                ('punto_pedido', models.IntegerField(help_text='Stock crítico ML (demanda en reposición + seguridad)')),
+                ('nivel_objetivo', models.IntegerField(help_text='Stock al que se repone con order-up-to')),
+                ('lote_economico', models.IntegerField(help_text='EOQ: sqrt(2·D·S / H)')),
+                ('cantidad_sugerida', models.IntegerField()),
+                ('metodo', models.CharField(choices=[('order_up_to', 'Nivel objetivo (order-up-to)'), ('eoq', 'Lote económico (EOQ)')], default='order_up_to', max_length=20)),
+                ('fecha_calculo', models.DateTimeField(default=django.utils.timezone.now)),
+                ('material', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sugerencia_compra', to='core.material')),
+            ],
+            options={
+                'verbose_name': 'Sugerencia de Compra',
+                'verbose_name_plural': 'Sugerencias de Compra',
+                'db_table': 'sugerencia_compra',
+                'ordering': ['-cantidad_sugerida'],
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_sugerenciacompra'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TareaProgramada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True)),
+                ('comando', models.CharField(help_text='Nombre del comando de gestión (ej: calcular_cobertura)', max_length=100)),
+                ('argumentos', models.CharField(blank=True, default='', help_text='Argumentos como en la terminal', max_length=255)),
+                ('cron', models.CharField(help_text='Expresión cron de 5 campos: min hora día mes día_semana', max_length=100)),
+                ('activa', models.BooleanField(default=True)),
+                ('proxima_ejecucion', models.DateTimeField(blank=True, null=True)),
+                ('en_ejecucion', models.BooleanField(default=False)),
+                ('inicio_ejecucion', models.DateTimeField(blank=True, null=True)),
+                ('ultima_ejecucion', models.DateTimeField(blank=True, null=True)),
+                ('ultima_duracion', models.FloatField(blank=True, help_text='Segundos', null=True)),
+                ('ultimo_exito', models.BooleanField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Tarea Programada',
+                'verbose_name_plural': 'Tareas Programadas',
+                'db_table': 'tarea_programada',
+                'ordering': ['nombre'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EjecucionTarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inicio', models.DateTimeField()),
+                ('fin', models.DateTimeField()),
+                ('duracion', models.FloatField(help_text='Segundos')),
+                ('exito', models.BooleanField()),
+                ('salida', models.TextField(blank=True)),
+                ('error', models.TextField(blank=True)),
+                ('tarea', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ejecuciones', to='core.tareaprogramada')),
+            ],
+            options={
+                'verbose_name': 'Ejecución de Tarea',
+                'verbose_name_plural': 'Ejecuciones de Tareas',
+                'db_table': 'ejecucion_tarea',
+                'ordering': ['-inicio'],
+                'indexes': [models.Index(fields=['tarea', 'inicio'], name='ejecucion_t_tarea_i_2b48fb_idx')],
+            },
+        ),
+    ]
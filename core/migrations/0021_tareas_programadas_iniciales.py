@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:48
+
+from django.db import migrations
+
+
+TAREAS_INICIALES = [
+    {
+        'nombre': 'Cálculo ML nocturno',
+        'comando': 'calcular_stock_critico',
+        'argumentos': '',
+        'cron': '0 2 * * *',
+    },
+]
+
+
+def crear_tareas(apps, schema_editor):
+    TareaProgramada = apps.get_model('core', 'TareaProgramada')
+    for datos in TAREAS_INICIALES:
+        TareaProgramada.objects.get_or_create(nombre=datos['nombre'], defaults=datos)
+
+
+def eliminar_tareas(apps, schema_editor):
+    TareaProgramada = apps.get_model('core', 'TareaProgramada')
+    TareaProgramada.objects.filter(nombre__in=[t['nombre'] for t in TAREAS_INICIALES]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_tareas_programadas'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_tareas, eliminar_tareas),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_tareas_programadas_iniciales'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificacion',
+            name='material',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notificaciones', to='core.material'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['tipo', 'material', 'creada_en'], name='core_notifi_tipo_4c0a76_idx'),
+        ),
+    ]
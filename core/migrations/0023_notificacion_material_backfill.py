@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:50
+
+import re
+
+from django.db import migrations
+
+
+URL_MATERIAL = re.compile(r'^/material/(\d+)/$')
+
+
+def asignar_material(apps, schema_editor):
+    """Las alertas existentes guardan el material solo en la url (/material/<id>/)."""
+    Notificacion = apps.get_model('core', 'Notificacion')
+    Material = apps.get_model('core', 'Material')
+
+    pendientes = Notificacion.objects.filter(
+        tipo__in=['stock_critico', 'material_nuevo'],
+        material__isnull=True,
+        url__startswith='/material/',
+    )
+    ids_material = set(Material.objects.values_list('id', flat=True))
+
+    for url in pendientes.values_list('url', flat=True).distinct():
+        coincidencia = URL_MATERIAL.match(url or '')
+        if coincidencia and int(coincidencia.group(1)) in ids_material:
+            pendientes.filter(url=url).update(material_id=int(coincidencia.group(1)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_notificacion_material'),
+    ]
+
+    operations = [
+        migrations.RunPython(asignar_material, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_notificacion_material_backfill'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorNotificaciones',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=30)),
+                ('no_leidas', models.IntegerField(default=0)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contadores_notificaciones', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Contadores de Notificaciones',
+                'db_table': 'contador_notificaciones',
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'tipo'), name='contador_notif_usuario_tipo')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:51
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def poblar_contadores(apps, schema_editor):
+    Notificacion = apps.get_model('core', 'Notificacion')
+    ContadorNotificaciones = apps.get_model('core', 'ContadorNotificaciones')
+
+    filas = Notificacion.objects.filter(leida=False).values('usuario_id', 'tipo').annotate(total=Count('id')).order_by()
+    ContadorNotificaciones.objects.bulk_create(
+        [
+            ContadorNotificaciones(usuario_id=f['usuario_id'], tipo=f['tipo'], no_leidas=f['total'])
+            for f in filas
+        ],
+        batch_size=1000,
+    )
+
+
+def vaciar_contadores(apps, schema_editor):
+    apps.get_model('core', 'ContadorNotificaciones').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_contadornotificaciones'),
+    ]
+
+    operations = [
+        migrations.RunPython(poblar_contadores, vaciar_contadores),
+    ]
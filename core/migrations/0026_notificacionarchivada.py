@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:56
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_contadornotificaciones_inicial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificacionArchivada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('id_original', models.BigIntegerField(unique=True)),
+                ('usuario_id', models.BigIntegerField()),
+                ('tipo', models.CharField(max_length=30)),
+                ('material_id', models.BigIntegerField(blank=True, null=True)),
+                ('mensaje', models.TextField()),
+                ('leida', models.BooleanField()),
+                ('url', models.CharField(blank=True, max_length=200, null=True)),
+                ('creada_en', models.DateTimeField()),
+                ('actualizada_en', models.DateTimeField()),
+                ('archivada_en', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'Notificaciones Archivadas',
+                'db_table': 'notificacion_archivada',
+            },
+        ),
+    ]
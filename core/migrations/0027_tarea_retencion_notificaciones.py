@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:56
+
+from django.db import migrations
+
+
+TAREAS = [
+    {
+        'nombre': 'Retención de notificaciones',
+        'comando': 'purgar_notificaciones',
+        'argumentos': '--dias-leidas 30 --dias-no-leidas 180',
+        'cron': '30 3 * * *',
+    },
+]
+
+
+def crear_tareas(apps, schema_editor):
+    TareaProgramada = apps.get_model('core', 'TareaProgramada')
+    for datos in TAREAS:
+        TareaProgramada.objects.get_or_create(nombre=datos['nombre'], defaults=datos)
+
+
+def eliminar_tareas(apps, schema_editor):
+    TareaProgramada = apps.get_model('core', 'TareaProgramada')
+    TareaProgramada.objects.filter(nombre__in=[t['nombre'] for t in TAREAS]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_notificacionarchivada'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_tareas, eliminar_tareas),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:57
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_tarea_retencion_notificaciones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoNotificacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destino', models.CharField(choices=[('bodega', 'Encargados de Bodega'), ('usuario', 'Usuario')], max_length=10)),
+                ('tipo', models.CharField(max_length=30)),
+                ('mensaje', models.TextField()),
+                ('url', models.CharField(blank=True, max_length=200, null=True)),
+                ('creado_en', models.DateTimeField(default=django.utils.timezone.now)),
+                ('procesado_en', models.DateTimeField(blank=True, null=True)),
+                ('material', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='eventos_notificacion', to='core.material')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='eventos_notificacion', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Eventos de Notificación',
+                'db_table': 'evento_notificacion',
+                'indexes': [models.Index(fields=['procesado_en', 'id'], name='evento_noti_procesa_70a718_idx'), models.Index(fields=['tipo', 'material', 'creado_en'], name='evento_noti_tipo_0aa248_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_eventonotificacion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['usuario', 'leida', 'creada_en', 'id'], name='core_notifi_usuario_0c28b9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['usuario', 'creada_en', 'id'], name='core_notifi_usuario_7f65e7_idx'),
+        ),
+    ]
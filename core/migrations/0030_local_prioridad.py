@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_notificacion_indices_bandeja'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='local',
+            name='prioridad',
+            field=models.IntegerField(default=0, help_text='Mayor valor = se atiende primero al asignar stock escaso', verbose_name='Prioridad'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_local_prioridad'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventario',
+            name='stock_reservado',
+            field=models.IntegerField(default=0, editable=False, help_text='Unidades comprometidas en solicitudes pendientes'),
+        ),
+    ]
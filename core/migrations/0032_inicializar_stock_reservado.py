@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:06
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def inicializar_reservas(apps, schema_editor):
+    """stock_reservado inicial = suma de lo pedido en solicitudes pendientes."""
+    Inventario = apps.get_model('core', 'Inventario')
+    DetalleSolicitud = apps.get_model('core', 'DetalleSolicitud')
+    pendiente = (
+        DetalleSolicitud.objects
+        .filter(solicitud__estado='pendiente', material_id=OuterRef('material_id'))
+        .values('material_id')
+        .annotate(total=Sum('cantidad'))
+        .values('total')
+    )
+    Inventario.objects.update(stock_reservado=Coalesce(Subquery(pendiente), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_inventario_stock_reservado'),
+    ]
+
+    operations = [
+        migrations.RunPython(inicializar_reservas, migrations.RunPython.noop),
+    ]
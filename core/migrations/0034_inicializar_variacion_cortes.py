@@ -0,0 +1,65 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:07
+
+import re
+
+from django.db import migrations
+from django.db.models import F
+from django.utils import timezone
+
+
+# ajustar_inventario dejaba el signo en el detalle: "Ajuste de inventario (+5): ..."
+SIGNO_AJUSTE = re.compile(r'\(([+-]\d+)\)')
+
+TAREAS = [
+    {
+        'nombre': 'Cortes de stock',
+        'comando': 'generar_cortes_stock',
+        'argumentos': '',
+        'cron': '55 23 * * *',
+    },
+]
+
+
+def inicializar(apps, schema_editor):
+    Movimiento = apps.get_model('core', 'Movimiento')
+    Inventario = apps.get_model('core', 'Inventario')
+    CorteStock = apps.get_model('core', 'CorteStock')
+    TareaProgramada = apps.get_model('core', 'TareaProgramada')
+
+    Movimiento.objects.filter(tipo='entrada').update(variacion=F('cantidad'))
+    Movimiento.objects.filter(tipo='salida').update(variacion=-F('cantidad'))
+
+    # Ajustes: solo los que registraron el sentido; el resto queda NULL
+    ajustes = []
+    for movimiento in Movimiento.objects.filter(tipo='ajuste').only('id', 'detalle').iterator():
+        coincidencia = SIGNO_AJUSTE.search(movimiento.detalle or '')
+        if coincidencia:
+            movimiento.variacion = int(coincidencia.group(1))
+            ajustes.append(movimiento)
+    Movimiento.objects.bulk_update(ajustes, ['variacion'], batch_size=1000)
+
+    # Corte inicial con el stock actual: la historia previa se calcula hacia atrás
+    ahora = timezone.now()
+    CorteStock.objects.bulk_create([
+        CorteStock(material_id=material_id, fecha=ahora, stock=stock)
+        for material_id, stock in Inventario.objects.values_list('material_id', 'stock_actual')
+    ], batch_size=1000)
+
+    for datos in TAREAS:
+        TareaProgramada.objects.get_or_create(nombre=datos['nombre'], defaults=datos)
+
+
+def revertir(apps, schema_editor):
+    TareaProgramada = apps.get_model('core', 'TareaProgramada')
+    TareaProgramada.objects.filter(nombre__in=[t['nombre'] for t in TAREAS]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0033_movimiento_variacion_cortestock'),
+    ]
+
+    operations = [
+        migrations.RunPython(inicializar, revertir),
+    ]
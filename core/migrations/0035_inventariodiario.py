@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0034_inicializar_variacion_cortes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventarioDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('stock_actual', models.IntegerField()),
+                ('stock_seguridad', models.IntegerField()),
+                ('material', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventario_diario', to='core.material')),
+            ],
+            options={
+                'verbose_name': 'Inventario Diario',
+                'verbose_name_plural': 'Inventario Diario',
+                'db_table': 'inventario_diario',
+                'ordering': ['-dia'],
+                'constraints': [models.UniqueConstraint(fields=('material', 'dia'), name='inventario_diario_material_dia')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0036_tarea_inventario_diario'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='movimiento',
+            name='movimiento_material_fecha',
+        ),
+        migrations.AddIndex(
+            model_name='movimiento',
+            index=models.Index(fields=['material', 'fecha', 'variacion'], name='movimiento_mat_fecha_var'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0037_movimiento_indice_cubriente'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventario',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
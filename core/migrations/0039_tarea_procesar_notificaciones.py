@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:42
+
+from django.db import migrations
+
+
+# Con NOTIFICACIONES_DIFERIDAS el outbox solo se vacía si alguien corre el
+# worker; cada pasada también cierra los digest de stock crítico vencidos.
+TAREAS = [
+    {
+        'nombre': 'Procesar notificaciones',
+        'comando': 'procesar_notificaciones',
+        'argumentos': '',
+        'cron': '* * * * *',
+    },
+]
+
+
+def crear_tareas(apps, schema_editor):
+    TareaProgramada = apps.get_model('core', 'TareaProgramada')
+    for datos in TAREAS:
+        TareaProgramada.objects.get_or_create(nombre=datos['nombre'], defaults=datos)
+
+
+def eliminar_tareas(apps, schema_editor):
+    TareaProgramada = apps.get_model('core', 'TareaProgramada')
+    TareaProgramada.objects.filter(nombre__in=[t['nombre'] for t in TAREAS]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0038_inventario_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_tareas, eliminar_tareas),
+    ]
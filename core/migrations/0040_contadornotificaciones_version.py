@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0039_tarea_procesar_notificaciones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contadornotificaciones',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:53
+
+from django.db import migrations
+
+
+# El outbox es opcional y lo atiende un worker dedicado
+# (procesar_notificaciones --continuo), no run_scheduler cada minuto.
+TAREA = {
+    'nombre': 'Procesar notificaciones',
+    'comando': 'procesar_notificaciones',
+    'argumentos': '',
+    'cron': '* * * * *',
+}
+
+
+def eliminar_tarea(apps, schema_editor):
+    TareaProgramada = apps.get_model('core', 'TareaProgramada')
+    TareaProgramada.objects.filter(nombre=TAREA['nombre'], comando=TAREA['comando']).delete()
+
+
+def crear_tarea(apps, schema_editor):
+    TareaProgramada = apps.get_model('core', 'TareaProgramada')
+    TareaProgramada.objects.get_or_create(nombre=TAREA['nombre'], defaults=TAREA)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0040_contadornotificaciones_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(eliminar_tarea, crear_tarea),
+    ]
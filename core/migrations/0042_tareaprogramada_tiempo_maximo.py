@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0041_quitar_tarea_procesar_notificaciones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tareaprogramada',
+            name='tiempo_maximo',
+            field=models.PositiveIntegerField(default=21600, help_text='Segundos; al superarlos se termina el proceso de la tarea'),
+        ),
+    ]
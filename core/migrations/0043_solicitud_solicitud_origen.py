@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0042_tareaprogramada_tiempo_maximo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solicitud',
+            name='solicitud_origen',
+            field=models.ForeignKey(blank=True, help_text='Solicitud aprobada parcialmente de la que esta es el saldo pendiente', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='saldos', to='core.solicitud'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:02
+
+from django.db import migrations, models
+
+
+def marcar_sin_demanda(apps, schema_editor):
+    Inventario = apps.get_model('core', 'Inventario')
+    Inventario.objects.filter(dias_cobertura__isnull=False).update(sin_demanda=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0043_solicitud_solicitud_origen'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='inventario',
+            name='core_invent_dias_co_e7bfcc_idx',
+        ),
+        migrations.AddField(
+            model_name='inventario',
+            name='sin_demanda',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.RunPython(marcar_sin_demanda, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='inventario',
+            index=models.Index(fields=['sin_demanda', 'dias_cobertura', 'material'], name='core_invent_sin_dem_b10e2c_idx'),
+        ),
+    ]
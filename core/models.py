@@ -4,6 +4,9 @@ from django.conf import settings
 from django.utils import timezone
 from rut_chile import rut_chile
 from django.core.exceptions import ValidationError
+from django.utils.functional import cached_property
+
+from .services.cron import ExpresionCron
 
 
 # ==================== CONFIGURACION ====================
@@ -87,6 +90,11 @@ class Local(models.Model):
     activo = models.BooleanField(
         default=True, verbose_name="Activo"
     )
+    prioridad = models.IntegerField(
+        default=0,
+        verbose_name='Prioridad',
+        help_text='Mayor valor = se atiende primero al asignar stock escaso'
+    )
     
     class Meta:
         verbose_name = 'Local'
@@ -218,15 +226,44 @@ class Inventario(models.Model):
     material = models.OneToOneField(Material, on_delete=models.CASCADE, related_name='inventario')
     stock_actual = models.IntegerField(default=0)
     stock_seguridad = models.IntegerField(default=5)
+    # Suma de lo pedido en solicitudes pendientes; lo mantiene stock_service
+    stock_reservado = models.IntegerField(
+        default=0, editable=False,
+        help_text='Unidades comprometidas en solicitudes pendientes'
+    )
     fecha_creacion = models.DateTimeField(default=timezone.now)
     fecha_actualizacion = models.DateTimeField(default=timezone.now)
+    # Concurrencia optimista: sube en cada cambio de stock_actual
+    version = models.PositiveIntegerField(default=0, editable=False)
+    
+    # Calculados en lote por calcular_cobertura (None = sin demanda pronosticada)
+    dias_cobertura = models.FloatField(
+        null=True, blank=True, editable=False,
+        help_text='Stock actual / demanda diaria pronosticada'
+    )
+    # dias_cobertura IS NULL guardado: el orden por urgencia (sin demanda al
+    # final) usa el índice compuesto en vez de NULLS LAST, que MySQL no indexa
+    sin_demanda = models.BooleanField(default=True, editable=False)
+    fecha_quiebre = models.DateField(
+        null=True, blank=True, editable=False,
+        help_text='Fecha proyectada de quiebre de stock'
+    )
     
     class Meta:
         verbose_name_plural = "Inventarios"
-        indexes = [models.Index(fields=['material'])]
+        indexes = [
+            models.Index(fields=['material']),
+            models.Index(fields=['sin_demanda', 'dias_cobertura', 'material']),
+            models.Index(fields=['fecha_quiebre']),
+        ]
     
     def __str__(self):
         return f"Inventario: {self.material.descripcion} - Stock: {self.stock_actual}"
+    
+    @property
+    def stock_disponible(self):
+        """Stock que aún se puede comprometer (actual - reservado)."""
+        return self.stock_actual - self.stock_reservado
 
 
 # ==================== MENSUAL ====================
@@ -304,6 +341,12 @@ class Solicitud(models.Model):
         related_name='solicitudes_respondidas'
     )
     observaciones = models.TextField(blank=True, null=True)
+    solicitud_origen = models.ForeignKey(
+        'self', on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='saldos',
+        help_text='Solicitud aprobada parcialmente de la que esta es el saldo pendiente'
+    )
     
     class Meta:
         verbose_name_plural = "Solicitudes"
@@ -373,15 +416,72 @@ class Movimiento(models.Model):
         ('ajuste', 'Ajuste'),
     ])
     cantidad = models.IntegerField()
+    # Efecto con signo sobre el stock: +entrada, -salida, ±ajuste.
+    # NULL solo en ajustes antiguos cuyo sentido no quedó registrado.
+    variacion = models.IntegerField(null=True, blank=True)
     detalle = models.CharField(max_length=255, blank=True)
     fecha = models.DateTimeField(default=timezone.now)
     
     class Meta:
         db_table = 'movimiento'
         ordering = ['-fecha']
+        indexes = [
+            # Incluye variacion: las sumas por material se resuelven solo con el índice
+            models.Index(fields=['material', 'fecha', 'variacion'], name='movimiento_mat_fecha_var'),
+        ]
     
     def __str__(self):
         return f"{self.tipo.upper()} - {self.material.codigo} - {self.cantidad}"
+    
+    def save(self, *args, **kwargs):
+        # Los ajustes deben indicar la variación explícitamente
+        if self.variacion is None and self.tipo in ('entrada', 'salida'):
+            self.variacion = self.cantidad if self.tipo == 'entrada' else -self.cantidad
+        super().save(*args, **kwargs)
+
+
+class CorteStock(models.Model):
+    """
+    Stock de un material en un instante. Con los cortes, el stock en
+    cualquier fecha es el corte más cercano más la suma de las
+    variaciones de movimiento entre ambos (ver historico_service).
+    """
+    material = models.ForeignKey(Material, on_delete=models.CASCADE, related_name='cortes_stock')
+    fecha = models.DateTimeField()
+    stock = models.IntegerField()
+    
+    class Meta:
+        db_table = 'corte_stock'
+        verbose_name = 'Corte de Stock'
+        verbose_name_plural = 'Cortes de Stock'
+        ordering = ['-fecha']
+        constraints = [
+            models.UniqueConstraint(fields=['material', 'fecha'], name='corte_stock_material_fecha'),
+        ]
+    
+    def __str__(self):
+        return f"{self.material.codigo} @ {self.fecha:%Y-%m-%d %H:%M} - Stock: {self.stock}"
+
+
+class InventarioDiario(models.Model):
+    """Foto de cierre del inventario por material y día (para gráficos de evolución)."""
+    material = models.ForeignKey(Material, on_delete=models.CASCADE, related_name='inventario_diario')
+    dia = models.DateField()
+    stock_actual = models.IntegerField()
+    stock_seguridad = models.IntegerField()
+    
+    class Meta:
+        db_table = 'inventario_diario'
+        verbose_name = 'Inventario Diario'
+        verbose_name_plural = 'Inventario Diario'
+        ordering = ['-dia']
+        constraints = [
+            # También sirve de índice para las consultas por rango de un material
+            models.UniqueConstraint(fields=['material', 'dia'], name='inventario_diario_material_dia'),
+        ]
+    
+    def __str__(self):
+        return f"{self.material.codigo} {self.dia} - Stock: {self.stock_actual}"
 
 
 # ==================== NOTIFICACION ====================
@@ -399,6 +499,15 @@ class Notificacion(models.Model):
         on_delete=models.CASCADE
     )
     tipo = models.CharField(max_length=30, choices=TIPO_CHOICES, default='material_nuevo')
+    # Material al que se refiere (stock crítico, material nuevo). Junto con
+    # tipo es la clave de deduplicación de las alertas.
+    material = models.ForeignKey(
+        Material,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='notificaciones'
+    )
     mensaje = models.TextField()
     leida = models.BooleanField(default=False)
     url = models.CharField(max_length=200, blank=True, null=True)
@@ -408,11 +517,111 @@ class Notificacion(models.Model):
     class Meta:
         verbose_name_plural = "Notificaciones"
         ordering = ['-creada_en']
+        indexes = [
+            models.Index(fields=['tipo', 'material', 'creada_en']),
+            # Bandeja y API: paginación keyset por (creada_en, id)
+            models.Index(fields=['usuario', 'leida', 'creada_en', 'id']),
+            models.Index(fields=['usuario', 'creada_en', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.tipo} - {self.usuario.username}"
 
 
+class ContadorNotificaciones(models.Model):
+    """
+    Notificaciones no leídas por usuario y tipo, mantenido con F() por
+    notificaciones_service. Se reconstruye con reparar_contadores_notificaciones.
+    """
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='contadores_notificaciones'
+    )
+    tipo = models.CharField(max_length=30)
+    no_leidas = models.IntegerField(default=0)
+    # Sube en cada escritura: la suma por usuario versiona sus no leídas
+    version = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'contador_notificaciones'
+        verbose_name_plural = "Contadores de Notificaciones"
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'tipo'], name='contador_notif_usuario_tipo'),
+        ]
+    
+    def __str__(self):
+        return f"{self.usuario_id} - {self.tipo}: {self.no_leidas}"
+
+
+class EventoNotificacion(models.Model):
+    """
+    Outbox de notificaciones: los productores escriben un evento compacto en
+    la misma transacción que el cambio de negocio y procesar_notificaciones
+    lo expande después en una Notificacion por destinatario.
+    """
+    DESTINO_CHOICES = [
+        ('bodega', 'Encargados de Bodega'),
+        ('usuario', 'Usuario'),
+    ]
+    
+    destino = models.CharField(max_length=10, choices=DESTINO_CHOICES)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='eventos_notificacion'
+    )
+    tipo = models.CharField(max_length=30)
+    mensaje = models.TextField()
+    url = models.CharField(max_length=200, blank=True, null=True)
+    material = models.ForeignKey(
+        Material,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='eventos_notificacion'
+    )
+    creado_en = models.DateTimeField(default=timezone.now)
+    procesado_en = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'evento_notificacion'
+        verbose_name_plural = "Eventos de Notificación"
+        indexes = [
+            models.Index(fields=['procesado_en', 'id']),
+            models.Index(fields=['tipo', 'material', 'creado_en']),
+        ]
+    
+    def __str__(self):
+        return f"{self.tipo} -> {self.destino} ({'procesado' if self.procesado_en else 'pendiente'})"
+
+
+class NotificacionArchivada(models.Model):
+    """
+    Notificaciones antiguas movidas por purgar_notificaciones. Sin índices
+    secundarios ni FKs: es un histórico que no consulta la aplicación.
+    """
+    id_original = models.BigIntegerField(unique=True)
+    usuario_id = models.BigIntegerField()
+    tipo = models.CharField(max_length=30)
+    material_id = models.BigIntegerField(null=True, blank=True)
+    mensaje = models.TextField()
+    leida = models.BooleanField()
+    url = models.CharField(max_length=200, blank=True, null=True)
+    creada_en = models.DateTimeField()
+    actualizada_en = models.DateTimeField()
+    archivada_en = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'notificacion_archivada'
+        verbose_name_plural = "Notificaciones Archivadas"
+    
+    def __str__(self):
+        return f"{self.tipo} - {self.usuario_id} ({self.creada_en:%d/%m/%Y})"
+
+
 # ==================== MLRESULT ====================
 
 class MLResult(models.Model):
@@ -427,7 +636,113 @@ class MLResult(models.Model):
     stock_seguridad = models.FloatField(default=0.0, help_text="Colchón extra por variabilidad")
     coeficiente_variacion = models.FloatField(default=0.0, help_text="Variabilidad relativa (sigma/media)")
     metodo_utilizado = models.CharField(max_length=50, default="Estandar")
+    serie_demanda = models.BinaryField(
+        blank=True, null=True, editable=False,
+        help_text="Demanda semanal usada en el cálculo (deltas int16)"
+    )
     
     class Meta:
         db_table = 'ml_result'
         ordering = ['-fecha_calculo']
+    
+    @cached_property
+    def demanda_semanal(self):
+        """Serie semanal decodificada. Solo se decodifica al accederla."""
+        # Import diferido: serie_compacta carga numpy/pandas
+        from .services.serie_compacta import decodificar_serie
+        return decodificar_serie(self.serie_demanda)
+    
+    @cached_property
+    def sparkline_puntos(self):
+        from .services.serie_compacta import puntos_sparkline
+        return puntos_sparkline(self.demanda_semanal)
+
+
+# ==================== SUGERENCIA DE COMPRA ====================
+
+class SugerenciaCompra(models.Model):
+    METODO_CHOICES = [
+        ('order_up_to', 'Nivel objetivo (order-up-to)'),
+        ('eoq', 'Lote económico (EOQ)'),
+    ]
+    
+    material = models.OneToOneField(Material, on_delete=models.CASCADE, related_name='sugerencia_compra')
+    stock_actual = models.IntegerField()
+    demanda_diaria = models.FloatField()
+    leadtime_dias = models.IntegerField()
+    punto_pedido = models.IntegerField(help_text="Stock crítico ML (demanda en reposición + seguridad)")
+    nivel_objetivo = models.IntegerField(help_text="Stock al que se repone con order-up-to")
+    lote_economico = models.IntegerField(help_text="EOQ: sqrt(2·D·S / H)")
+    cantidad_sugerida = models.IntegerField()
+    metodo = models.CharField(max_length=20, choices=METODO_CHOICES, default='order_up_to')
+    fecha_calculo = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'sugerencia_compra'
+        verbose_name = 'Sugerencia de Compra'
+        verbose_name_plural = 'Sugerencias de Compra'
+        ordering = ['-cantidad_sugerida']
+    
+    def __str__(self):
+        return f"Comprar {self.cantidad_sugerida} - {self.material.codigo}"
+
+
+# ==================== TAREAS PROGRAMADAS ====================
+
+class TareaProgramada(models.Model):
+    """Comando de gestión ejecutado periódicamente por run_scheduler."""
+    
+    nombre = models.CharField(max_length=100, unique=True)
+    comando = models.CharField(max_length=100, help_text="Nombre del comando de gestión (ej: calcular_cobertura)")
+    argumentos = models.CharField(max_length=255, blank=True, default='', help_text="Argumentos como en la terminal")
+    cron = models.CharField(max_length=100, help_text="Expresión cron de 5 campos: min hora día mes día_semana")
+    activa = models.BooleanField(default=True)
+    tiempo_maximo = models.PositiveIntegerField(
+        default=6 * 3600,
+        help_text="Segundos; al superarlos se termina el proceso de la tarea"
+    )
+    
+    proxima_ejecucion = models.DateTimeField(null=True, blank=True)
+    # Bloqueo contra ejecuciones superpuestas (tomado con un UPDATE condicional)
+    en_ejecucion = models.BooleanField(default=False)
+    inicio_ejecucion = models.DateTimeField(null=True, blank=True)
+    
+    ultima_ejecucion = models.DateTimeField(null=True, blank=True)
+    ultima_duracion = models.FloatField(null=True, blank=True, help_text="Segundos")
+    ultimo_exito = models.BooleanField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'tarea_programada'
+        verbose_name = 'Tarea Programada'
+        verbose_name_plural = 'Tareas Programadas'
+        ordering = ['nombre']
+    
+    def __str__(self):
+        return f"{self.nombre} ({self.cron})"
+    
+    def clean(self):
+        super().clean()
+        try:
+            ExpresionCron(self.cron)
+        except ValueError as e:
+            raise ValidationError({'cron': str(e)})
+
+
+class EjecucionTarea(models.Model):
+    tarea = models.ForeignKey(TareaProgramada, on_delete=models.CASCADE, related_name='ejecuciones')
+    inicio = models.DateTimeField()
+    fin = models.DateTimeField()
+    duracion = models.FloatField(help_text="Segundos")
+    exito = models.BooleanField()
+    salida = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    
+    class Meta:
+        db_table = 'ejecucion_tarea'
+        verbose_name = 'Ejecución de Tarea'
+        verbose_name_plural = 'Ejecuciones de Tareas'
+        ordering = ['-inicio']
+        indexes = [models.Index(fields=['tarea', 'inicio'])]
+    
+    def __str__(self):
+        return f"{self.tarea.nombre} - {self.inicio:%d/%m/%Y %H:%M} - {'OK' if self.exito else 'ERROR'}"
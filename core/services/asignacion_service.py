@@ -0,0 +1,299 @@
+"""
+Motor de asignación de stock sobre la cola de solicitudes pendientes.
+
+En una sola pasada (y una transacción) reparte el stock disponible de cada
+material entre todas las líneas pendientes que lo piden, según la política:
+
+- fifo: por fecha_solicitud, la más antigua primero.
+- proporcional: cada línea recibe la misma fracción de lo que pidió
+  (reparto justo); el resto entero se entrega por mayor fracción.
+- prioridad_local: por Local.prioridad (mayor primero) y luego FIFO; las
+  solicitudes sin local de destino van al final.
+
+Solo se reparte lo que no está reservado por solicitudes pendientes fuera
+de la selección (solicitud_ids).
+
+Cada línea recibe cantidad_aprobada (0..cantidad). Una solicitud con al
+menos una línea asignada queda aprobada; si falta algo, lo no entregado pasa
+a una solicitud nueva pendiente (saldo, con la misma fecha de solicitud y
+solicitud_origen apuntando a la original), que conserva su reserva y su
+lugar en la cola. Si no recibe nada sigue pendiente.
+"""
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Solicitud, DetalleSolicitud, Inventario, Movimiento
+from core.services import stock_service
+from core.services.notificaciones_service import notificar_lote
+
+logger = logging.getLogger(__name__)
+
+POLITICAS = {
+    'fifo': 'FIFO (más antiguas primero)',
+    'proporcional': 'Reparto proporcional',
+    'prioridad_local': 'Prioridad por local',
+}
+
+
+# ==================== POLÍTICAS ====================
+
+def _orden_fifo(detalle):
+    solicitud = detalle.solicitud
+    return (solicitud.fecha_solicitud, solicitud.pk)
+
+
+def _orden_prioridad_local(detalle):
+    solicitud = detalle.solicitud
+    local = solicitud.local_destino
+    # Sin local de destino: después de todos los locales
+    return (local is None, -local.prioridad if local else 0, solicitud.fecha_solicitud, solicitud.pk)
+
+
+def _repartir_en_orden(detalles, disponible, clave):
+    asignado = {}
+    for detalle in sorted(detalles, key=clave):
+        cantidad = min(detalle.cantidad, disponible)
+        asignado[detalle.pk] = cantidad
+        disponible -= cantidad
+    return asignado
+
+
+def _repartir_proporcional(detalles, disponible):
+    demanda = sum(d.cantidad for d in detalles)
+    if demanda <= disponible:
+        return {d.pk: d.cantidad for d in detalles}
+
+    asignado = {}
+    fracciones = []
+    for d in detalles:
+        exacto = d.cantidad * disponible / demanda
+        asignado[d.pk] = int(exacto)
+        fracciones.append((exacto - int(exacto), d))
+
+    # Unidades sobrantes del redondeo: mayor fracción primero, empate FIFO
+    sobrante = disponible - sum(asignado.values())
+    fracciones.sort(key=lambda f: (-f[0],) + _orden_fifo(f[1]))
+    for _, d in fracciones[:sobrante]:
+        asignado[d.pk] += 1
+    return asignado
+
+
+def repartir(detalles, disponible, politica):
+    """Reparte `disponible` entre las líneas de un material. Retorna {detalle_id: cantidad}."""
+    disponible = max(disponible, 0)
+    if politica == 'proporcional':
+        return _repartir_proporcional(detalles, disponible)
+    if politica == 'prioridad_local':
+        return _repartir_en_orden(detalles, disponible, _orden_prioridad_local)
+    return _repartir_en_orden(detalles, disponible, _orden_fifo)
+
+
+# ==================== ASIGNACIÓN ====================
+
+def asignar_stock(usuario, politica='fifo', solicitud_ids=None, simular=False):
+    """
+    Asigna el stock disponible a las solicitudes pendientes (todas o
+    solicitud_ids). Con simular=True calcula el plan sin escribir nada.
+    Retorna lista de (solicitud_id, estado, asignado, solicitado) donde
+    estado es 'aprobada', 'parcial' o 'pendiente'.
+    """
+    if politica not in POLITICAS:
+        raise ValueError(f"Política desconocida: {politica}")
+
+    with transaction.atomic():
+        pendientes = Solicitud.objects.filter(estado='pendiente')
+        if solicitud_ids is not None:
+            pendientes = pendientes.filter(pk__in=solicitud_ids)
+        if not simular:
+            pendientes = pendientes.select_for_update()
+        solicitudes = {s.pk: s for s in pendientes.select_related('local_destino').order_by('pk')}
+        if not solicitudes:
+            return []
+
+        detalles = list(
+            DetalleSolicitud.objects.filter(solicitud_id__in=solicitudes).select_related('material')
+        )
+        for detalle in detalles:
+            detalle.solicitud = solicitudes[detalle.solicitud_id]
+
+        por_material = defaultdict(list)
+        for detalle in detalles:
+            por_material[detalle.material_id].append(detalle)
+
+        if simular:
+            inventarios = {
+                inv.material_id: inv
+                for inv in Inventario.objects.filter(material_id__in=por_material)
+            }
+        else:
+            inventarios = stock_service.bloquear_inventarios(por_material)
+
+        # Lo reservado por pendientes no seleccionadas no se puede repartir
+        propias = stock_service.sumar_por_material(detalles)
+        asignado = {}
+        for material_id, lineas in por_material.items():
+            inventario = inventarios.get(material_id)
+            if inventario is None:
+                disponible = 0
+            else:
+                ajeno = max(inventario.stock_reservado - propias[material_id], 0)
+                disponible = inventario.stock_actual - ajeno
+            asignado.update(repartir(lineas, disponible, politica))
+
+        # Resultado por solicitud
+        por_solicitud = defaultdict(list)
+        for detalle in detalles:
+            por_solicitud[detalle.solicitud_id].append(detalle)
+
+        resultados = []
+        for pk, solicitud in solicitudes.items():
+            lineas = por_solicitud[pk]
+            total_asignado = sum(asignado[d.pk] for d in lineas)
+            total_solicitado = sum(d.cantidad for d in lineas)
+            if total_asignado == 0:
+                estado = 'pendiente'
+            elif total_asignado < total_solicitado:
+                estado = 'parcial'
+            else:
+                estado = 'aprobada'
+            resultados.append((pk, estado, total_asignado, total_solicitado))
+
+        if simular:
+            return resultados
+
+        _aplicar(usuario, politica, solicitudes, detalles, inventarios, asignado, resultados)
+
+    logger.info(
+        f"Asignación '{politica}': "
+        f"{sum(1 for r in resultados if r[1] != 'pendiente')} de {len(resultados)} solicitudes atendidas"
+    )
+    return resultados
+
+
+def _aplicar(usuario, politica, solicitudes, detalles, inventarios, asignado, resultados):
+    """Escribe la asignación con operaciones en lote (dentro de la transacción)."""
+    ahora = timezone.now()
+    atendidas = {pk: estado for pk, estado, _, _ in resultados if estado != 'pendiente'}
+    if not atendidas:
+        return
+
+    lineas = [d for d in detalles if d.solicitud_id in atendidas]
+    for detalle in lineas:
+        detalle.cantidad_aprobada = asignado[detalle.pk]
+    DetalleSolicitud.objects.bulk_update(lineas, ['cantidad_aprobada'], batch_size=500)
+
+    # Lo no entregado de las parciales pasa a una solicitud de saldo
+    saldos = _crear_saldos(solicitudes, lineas, atendidas, ahora)
+
+    # Las solicitudes atendidas dejan de estar pendientes: se libera lo que
+    # reservaron, salvo lo que pasa a sus saldos
+    descuentos = defaultdict(int)
+    for detalle in lineas:
+        descuentos[detalle.material_id] += detalle.cantidad_aprobada
+    liberadas = stock_service.sumar_por_material(lineas)
+    for detalle in lineas:
+        if detalle.solicitud_id in saldos:
+            liberadas[detalle.material_id] -= detalle.cantidad - detalle.cantidad_aprobada
+    modificados = []
+    for material_id, liberada in liberadas.items():
+        inventario = inventarios.get(material_id)
+        if inventario is None:
+            continue
+        inventario.stock_actual -= descuentos[material_id]
+        inventario.stock_reservado -= liberada
+        if descuentos[material_id]:
+            inventario.version += 1
+        inventario.fecha_actualizacion = ahora
+        modificados.append(inventario)
+    Inventario.objects.bulk_update(
+        modificados, ['stock_actual', 'stock_reservado', 'version', 'fecha_actualizacion'], batch_size=500
+    )
+
+    Movimiento.objects.bulk_create([
+        Movimiento(
+            material=detalle.material,
+            usuario=usuario,
+            solicitud=detalle.solicitud,
+            tipo='salida',
+            cantidad=detalle.cantidad_aprobada,
+            variacion=-detalle.cantidad_aprobada,
+            detalle=f'Aprobación solicitud #{detalle.solicitud_id} ({POLITICAS[politica]})',
+            fecha=ahora,
+        )
+        for detalle in lineas
+        if detalle.cantidad_aprobada
+    ], batch_size=1000)
+
+    actualizar = []
+    for pk, estado in atendidas.items():
+        solicitud = solicitudes[pk]
+        solicitud.estado = 'aprobada'
+        solicitud.respondido_por = usuario
+        solicitud.fecha_respuesta = ahora
+        solicitud.fecha_actualizacion = ahora
+        if estado == 'parcial':
+            solicitud.observaciones = (
+                f'Aprobación parcial por stock insuficiente. '
+                f'Lo faltante quedó pendiente en la solicitud #{saldos[pk].pk}.'
+            )
+        actualizar.append(solicitud)
+    Solicitud.objects.bulk_update(
+        actualizar,
+        ['estado', 'respondido_por', 'fecha_respuesta', 'fecha_actualizacion', 'observaciones'],
+        batch_size=500,
+    )
+
+    materiales = {d.material_id: d.material for d in detalles}
+    descontados = [inv for inv in modificados if descuentos[inv.material_id]]
+    for inventario in descontados:
+        inventario.material = materiales[inventario.material_id]
+    stock_service.alertar_criticos(descontados)
+
+    notificar_lote([
+        (
+            solicitudes[pk].solicitante_id,
+            'solicitud_aprobada',
+            f'Tu solicitud #{pk} ha sido APROBADA'
+            + (f' PARCIALMENTE; lo faltante sigue pendiente en la #{saldos[pk].pk}' if estado == 'parcial' else ''),
+            f'/solicitud/{pk}/',
+        )
+        for pk, estado in atendidas.items()
+    ])
+
+
+def _crear_saldos(solicitudes, lineas, atendidas, ahora):
+    """
+    Crea una solicitud pendiente con lo no entregado de cada aprobación
+    parcial. Retorna {solicitud_original_id: saldo}.
+    """
+    faltantes = defaultdict(list)
+    for detalle in lineas:
+        if atendidas[detalle.solicitud_id] == 'parcial' and detalle.cantidad_aprobada < detalle.cantidad:
+            faltantes[detalle.solicitud_id].append(detalle)
+
+    saldos = {}
+    nuevas_lineas = []
+    for pk, pendientes in faltantes.items():
+        original = solicitudes[pk]
+        # Misma fecha de solicitud: el saldo mantiene su lugar en la cola
+        saldos[pk] = saldo = Solicitud.objects.create(
+            local_destino=original.local_destino,
+            solicitante_id=original.solicitante_id,
+            motivo=f'Saldo pendiente de la solicitud #{pk}: {original.motivo}',
+            fecha_solicitud=original.fecha_solicitud,
+            fecha_actualizacion=ahora,
+            solicitud_origen=original,
+        )
+        nuevas_lineas.extend(
+            DetalleSolicitud(
+                solicitud=saldo,
+                material_id=detalle.material_id,
+                cantidad=detalle.cantidad - detalle.cantidad_aprobada,
+            )
+            for detalle in pendientes
+        )
+    DetalleSolicitud.objects.bulk_create(nuevas_lineas, batch_size=500)
+    return saldos
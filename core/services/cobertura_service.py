@@ -0,0 +1,52 @@
+import logging
+from datetime import timedelta
+
+from django.utils import timezone
+
+from core.models import Inventario
+from core.services.ml_service import ultimos_resultados_ml
+
+logger = logging.getLogger(__name__)
+
+
+def calcular_cobertura(stock_actual, demanda_diaria, hoy):
+    """
+    Retorna (dias_cobertura, fecha_quiebre) para un inventario.
+    Sin demanda pronosticada no hay quiebre proyectado: (None, None).
+    """
+    if not demanda_diaria or demanda_diaria <= 0:
+        return None, None
+
+    dias = max(stock_actual, 0) / demanda_diaria
+    return round(dias, 2), hoy + timedelta(days=int(dias))
+
+
+def calcular_cobertura_global(batch_size=500):
+    """
+    Recalcula dias_cobertura y fecha_quiebre para todo el inventario.
+    Usa la demanda del último MLResult de cada material. Dos lecturas y
+    escrituras con bulk_update: no hay consultas por material ni signals.
+    """
+    hoy = timezone.localdate()
+
+    demanda_por_material = dict(
+        ultimos_resultados_ml().values_list('material_id', 'demanda_promedio')
+    )
+
+    inventarios = list(
+        Inventario.objects.only('id', 'material_id', 'stock_actual')
+    )
+    for inv in inventarios:
+        inv.dias_cobertura, inv.fecha_quiebre = calcular_cobertura(
+            inv.stock_actual,
+            demanda_por_material.get(inv.material_id),
+            hoy,
+        )
+        inv.sin_demanda = inv.dias_cobertura is None
+
+    Inventario.objects.bulk_update(
+        inventarios, ['dias_cobertura', 'fecha_quiebre', 'sin_demanda'], batch_size=batch_size
+    )
+
+    logger.info(f"Cobertura recalculada para {len(inventarios)} inventarios")
+    return len(inventarios)
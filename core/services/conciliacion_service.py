@@ -0,0 +1,170 @@
+"""
+Conciliación de Inventario.stock_actual contra el libro de movimientos.
+
+El stock esperado de un material es la suma de las variaciones de todos sus
+movimientos. Se calcula con un único GROUP BY por tramo de material_id, que
+el índice (material, fecha, variacion) resuelve sin leer la tabla, y los
+tramos se reparten entre procesos: cada uno abre su propia conexión.
+
+Los materiales con ajustes antiguos sin variación registrada no tienen un
+esperado confiable: se informan como indeterminados y no se corrigen.
+"""
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from django.db import connection, connections, transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.utils import timezone
+
+from core.models import Inventario, Movimiento
+from core.services.historico_service import generar_cortes
+from core.services.stock_service import bloquear_inventarios
+
+logger = logging.getLogger(__name__)
+
+TAMANO_TRAMO = 500
+
+
+def tramos(tamano=TAMANO_TRAMO):
+    """Rangos [desde, hasta) de material_id que cubren todo el inventario."""
+    limites = Inventario.objects.aggregate(minimo=Min('material_id'), maximo=Max('material_id'))
+    if limites['minimo'] is None:
+        return []
+    return [
+        (desde, desde + tamano)
+        for desde in range(limites['minimo'], limites['maximo'] + 1, tamano)
+    ]
+
+
+@contextmanager
+def _lectura_consistente():
+    """
+    Transacción de solo lectura con una única instantánea. Django deja MySQL
+    en READ COMMITTED (cada consulta ve lo último confirmado), así que se pide
+    REPEATABLE READ para esta transacción: el libro y el stock se leen del
+    mismo instante y un movimiento confirmado entre ambas lecturas no aparece
+    como descuadre.
+    """
+    # Solo al abrir la transacción: dentro de una ya iniciada no se puede cambiar
+    nueva = not connection.in_atomic_block
+    with transaction.atomic():
+        if nueva and connection.vendor in ('mysql', 'postgresql'):
+            with connection.cursor() as cursor:
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+        yield
+
+
+def _libro(movimientos):
+    """{material_id: {total, sin_signo}} de un queryset de movimientos."""
+    return {
+        fila['material_id']: fila
+        for fila in movimientos.values('material_id')
+        .annotate(total=Sum('variacion'), sin_signo=Count('id', filter=Q(variacion__isnull=True)))
+        .order_by()
+    }
+
+
+def _descuadres(libro, stocks):
+    """Compara pares (material_id, stock_actual) con el libro; solo los que no cuadran."""
+    descuadres = []
+    for material_id, stock_actual in stocks:
+        fila = libro.get(material_id, {})
+        esperado = fila.get('total') or 0
+        indeterminado = bool(fila.get('sin_signo'))
+        if indeterminado or esperado != stock_actual:
+            descuadres.append({
+                'material_id': material_id,
+                'stock_actual': stock_actual,
+                'esperado': esperado,
+                'diferencia': stock_actual - esperado,
+                'indeterminado': indeterminado,
+            })
+    return descuadres
+
+
+def conciliar_tramo(tramo):
+    """
+    Compara stock_actual con el libro para los materiales del tramo.
+    Retorna lista de dicts {material_id, stock_actual, esperado, diferencia,
+    indeterminado} solo con los materiales que no cuadran.
+    """
+    desde, hasta = tramo
+    with _lectura_consistente():
+        libro = _libro(Movimiento.objects.filter(material_id__gte=desde, material_id__lt=hasta))
+        stocks = list(
+            Inventario.objects.filter(material_id__gte=desde, material_id__lt=hasta)
+            .values_list('material_id', 'stock_actual')
+        )
+    return _descuadres(libro, stocks)
+
+
+def _iniciar_proceso():
+    # Con 'spawn' el proceso hijo arranca sin Django configurado
+    import django
+    django.setup()
+
+
+def _conciliar_en_proceso(tramo):
+    try:
+        return conciliar_tramo(tramo)
+    finally:
+        connections.close_all()
+
+
+def conciliar(tamano=TAMANO_TRAMO, procesos=1):
+    """Concilia todo el inventario. Retorna los descuadres ordenados por material_id."""
+    rangos = tramos(tamano)
+    if procesos <= 1 or len(rangos) <= 1:
+        resultados = map(conciliar_tramo, rangos)
+        return [d for descuadres in resultados for d in descuadres]
+
+    # Los hijos no deben heredar (y luego cerrar) las conexiones del padre
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_proceso) as pool:
+        resultados = list(pool.map(_conciliar_en_proceso, rangos))
+    return [d for descuadres in resultados for d in descuadres]
+
+
+def corregir(descuadres, usuario, batch_size=1000):
+    """
+    Registra un 'ajuste' por cada descuadre determinado para que el libro
+    cuadre con stock_actual (que no se modifica). Los descuadres vienen de
+    una lectura anterior, así que por lote se bloquean los inventarios y se
+    recalcula la diferencia antes de escribir: un material que ya cuadra no
+    recibe ajuste. Después deja un corte de stock, así las consultas
+    históricas posteriores parten de un punto ya corregido. Retorna la
+    cantidad de ajustes creados.
+    """
+    material_ids = sorted(
+        d['material_id'] for d in descuadres if not d['indeterminado'] and d['diferencia']
+    )
+    creados = 0
+    for i in range(0, len(material_ids), batch_size):
+        lote = material_ids[i:i + batch_size]
+        with transaction.atomic():
+            inventarios = bloquear_inventarios(lote)
+            vigentes = _descuadres(
+                _libro(Movimiento.objects.filter(material_id__in=lote)),
+                ((material_id, inv.stock_actual) for material_id, inv in inventarios.items()),
+            )
+            ahora = timezone.now()
+            ajustes = [
+                Movimiento(
+                    material_id=d['material_id'],
+                    usuario=usuario,
+                    tipo='ajuste',
+                    cantidad=abs(d['diferencia']),
+                    variacion=d['diferencia'],
+                    detalle=f"Conciliación de stock ({d['diferencia']:+d}): libro {d['esperado']}, stock {d['stock_actual']}",
+                    fecha=ahora,
+                )
+                for d in vigentes
+                if not d['indeterminado']
+            ]
+            Movimiento.objects.bulk_create(ajustes)
+        creados += len(ajustes)
+    if creados:
+        generar_cortes()
+    logger.info(f"Conciliación: {creados} ajustes registrados")
+    return creados
@@ -0,0 +1,80 @@
+"""Expresiones cron de 5 campos, sin dependencias externas."""
+from datetime import timedelta
+
+
+def _parsear_campo(campo, minimo, maximo):
+    """Convierte un campo cron ('*', '*/15', '1-5', '0,30', '5/10') en un set de enteros."""
+    valores = set()
+    for parte in campo.split(','):
+        rango, barra, paso = parte.partition('/')
+        paso = int(paso) if barra else 1
+
+        if rango == '*':
+            inicio, fin = minimo, maximo
+        elif '-' in rango:
+            inicio, fin = (int(v) for v in rango.split('-', 1))
+        elif barra:
+            # 'N/paso' equivale a 'N-máximo/paso'
+            inicio, fin = int(rango), maximo
+        else:
+            inicio = fin = int(rango)
+
+        if inicio < minimo or fin > maximo or inicio > fin or paso < 1:
+            raise ValueError(f"Campo cron fuera de rango: '{campo}'")
+        valores.update(range(inicio, fin + 1, paso))
+    return valores
+
+
+class ExpresionCron:
+    """
+    Expresión cron estándar de 5 campos: minuto hora día mes día_semana.
+    Día de semana: 0-7 (0 y 7 = domingo). Si día y día_semana están
+    restringidos, basta con que coincida uno de los dos (como en cron).
+    """
+
+    def __init__(self, expresion):
+        campos = expresion.split()
+        if len(campos) != 5:
+            raise ValueError(f"La expresión cron debe tener 5 campos: '{expresion}'")
+
+        self.minutos = _parsear_campo(campos[0], 0, 59)
+        self.horas = _parsear_campo(campos[1], 0, 23)
+        self.dias = _parsear_campo(campos[2], 1, 31)
+        self.meses = _parsear_campo(campos[3], 1, 12)
+        self.dias_semana = {d % 7 for d in _parsear_campo(campos[4], 0, 7)}
+        self.dia_restringido = campos[2] != '*'
+        self.dia_semana_restringido = campos[4] != '*'
+
+    def _coincide_dia(self, dt):
+        # isoweekday: lunes=1 ... domingo=7 -> cron: domingo=0
+        dia_semana = dt.isoweekday() % 7
+        if self.dia_restringido and self.dia_semana_restringido:
+            return dt.day in self.dias or dia_semana in self.dias_semana
+        return dt.day in self.dias and dia_semana in self.dias_semana
+
+    def coincide(self, dt):
+        return (
+            dt.minute in self.minutos
+            and dt.hour in self.horas
+            and dt.month in self.meses
+            and self._coincide_dia(dt)
+        )
+
+    def siguiente(self, desde):
+        """Primer instante (al minuto) estrictamente posterior a 'desde' que coincide."""
+        dt = desde.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limite = dt + timedelta(days=366 * 5)
+
+        while dt < limite:
+            if dt.month not in self.meses or not self._coincide_dia(dt):
+                dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if dt.hour not in self.horas:
+                dt = (dt + timedelta(hours=1)).replace(minute=0)
+                continue
+            if dt.minute not in self.minutos:
+                dt += timedelta(minutes=1)
+                continue
+            return dt
+
+        raise ValueError("La expresión cron no tiene ejecuciones próximas")
@@ -0,0 +1,209 @@
+"""
+Exportación columnar (Parquet) del historial de movimientos y demanda.
+
+Los datos se leen con .iterator(chunk_size=...) y se escriben por lotes con
+pyarrow, así la memoria no depende del tamaño de la tabla. En disco se
+particiona al estilo Hive (anio=2025/mes=3/), que pandas, duckdb y pyarrow
+leen directamente.
+"""
+import logging
+import os
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Sum, Value, CharField
+from django.db.models.functions import TruncDate
+
+from core.models import Movimiento, DetalleSolicitud
+
+logger = logging.getLogger(__name__)
+
+COMPRESION = 'zstd'
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("La exportación Parquet requiere pyarrow (pip install pyarrow)") from e
+    return pa, pq
+
+
+# ==================== DATASETS ====================
+# Cada dataset define: queryset de tuplas, esquema (nombre, tipo) y columna de fecha.
+
+def _dataset_movimientos(pa, desde=None, hasta=None):
+    qs = Movimiento.objects.order_by()
+    if desde:
+        qs = qs.filter(fecha__date__gte=desde)
+    if hasta:
+        qs = qs.filter(fecha__date__lte=hasta)
+    columnas = [
+        ('id', pa.int64()),
+        ('fecha', pa.timestamp('us', tz='UTC')),
+        ('material_id', pa.int64()),
+        ('codigo', pa.string()),
+        ('tipo', pa.dictionary(pa.int8(), pa.string())),
+        ('cantidad', pa.int32()),
+        ('usuario_id', pa.int64()),
+        ('solicitud_id', pa.int64()),
+    ]
+    qs = qs.values_list(
+        'id', 'fecha', 'material_id', 'material__codigo', 'tipo',
+        'cantidad', 'usuario_id', 'solicitud_id',
+    )
+    return qs, columnas, 'fecha'
+
+
+def _dataset_detalles_solicitud(pa, desde=None, hasta=None):
+    qs = DetalleSolicitud.objects.order_by()
+    if desde:
+        qs = qs.filter(solicitud__fecha_solicitud__date__gte=desde)
+    if hasta:
+        qs = qs.filter(solicitud__fecha_solicitud__date__lte=hasta)
+    columnas = [
+        ('id', pa.int64()),
+        ('solicitud_id', pa.int64()),
+        ('fecha_solicitud', pa.timestamp('us', tz='UTC')),
+        ('estado', pa.dictionary(pa.int8(), pa.string())),
+        ('local_id', pa.int64()),
+        ('solicitante_id', pa.int64()),
+        ('material_id', pa.int64()),
+        ('codigo', pa.string()),
+        ('cantidad', pa.int32()),
+        ('cantidad_aprobada', pa.int32()),
+    ]
+    qs = qs.values_list(
+        'id', 'solicitud_id', 'solicitud__fecha_solicitud', 'solicitud__estado',
+        'solicitud__local_destino_id', 'solicitud__solicitante_id',
+        'material_id', 'material__codigo', 'cantidad', 'cantidad_aprobada',
+    )
+    return qs, columnas, 'fecha_solicitud'
+
+
+def _dataset_demanda_diaria(pa, desde=None, hasta=None):
+    """Demanda diaria por material con las mismas fuentes que usa ml_service."""
+    salidas = Movimiento.objects.filter(tipo='salida')
+    aprobadas = DetalleSolicitud.objects.filter(solicitud__estado='aprobada')
+    if desde:
+        salidas = salidas.filter(fecha__date__gte=desde)
+        aprobadas = aprobadas.filter(solicitud__fecha_solicitud__date__gte=desde)
+    if hasta:
+        salidas = salidas.filter(fecha__date__lte=hasta)
+        aprobadas = aprobadas.filter(solicitud__fecha_solicitud__date__lte=hasta)
+
+    salidas = salidas.annotate(
+        dia=TruncDate('fecha'), origen=Value('movimiento', output_field=CharField())
+    ).values('dia', 'material_id', 'origen').annotate(cantidad=Sum('cantidad')).order_by()
+    aprobadas = aprobadas.annotate(
+        dia=TruncDate('solicitud__fecha_solicitud'), origen=Value('solicitud', output_field=CharField())
+    ).values('dia', 'material_id', 'origen').annotate(cantidad=Sum('cantidad')).order_by()
+
+    columnas = [
+        ('dia', pa.date32()),
+        ('material_id', pa.int64()),
+        ('origen', pa.dictionary(pa.int8(), pa.string())),
+        ('cantidad', pa.int64()),
+    ]
+    qs = salidas.union(aprobadas, all=True).values_list('dia', 'material_id', 'origen', 'cantidad')
+    return qs, columnas, 'dia'
+
+
+DATASETS = {
+    'movimientos': _dataset_movimientos,
+    'detalles_solicitud': _dataset_detalles_solicitud,
+    'demanda_diaria': _dataset_demanda_diaria,
+}
+
+
+# ==================== ESCRITURA ====================
+
+def _lotes(qs, chunk_size):
+    """Agrupa las tuplas del iterador en listas de chunk_size filas."""
+    lote = []
+    for fila in qs.iterator(chunk_size=chunk_size):
+        lote.append(fila)
+        if len(lote) >= chunk_size:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _a_record_batch(pa, schema, filas):
+    columnas = list(zip(*filas))
+    arrays = []
+    for campo, valores in zip(schema, columnas):
+        if pa.types.is_dictionary(campo.type):
+            arrays.append(pa.array(valores, type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(valores, type=campo.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _meses_completos(desde, hasta):
+    """Lleva desde al primer día de su mes y hasta al último del suyo."""
+    if desde:
+        desde = desde.replace(day=1)
+    if hasta:
+        hasta = (hasta.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return desde, hasta
+
+
+def exportar_dataset_particionado(nombre, destino, chunk_size=50000, desde=None, hasta=None):
+    """
+    Escribe el dataset en destino/<nombre>/anio=YYYY/mes=M/part-0.parquet.
+    Cada partición tocada se reescribe entera, así que desde/hasta se
+    extienden a meses completos: un --desde a mitad de mes no deja el mes
+    solo con sus últimos días. Retorna (filas, archivos).
+    """
+    pa, pq = _pyarrow()
+    desde, hasta = _meses_completos(desde, hasta)
+    qs, columnas, columna_fecha = DATASETS[nombre](pa, desde, hasta)
+    schema = pa.schema(columnas)
+    indice_fecha = [c[0] for c in columnas].index(columna_fecha)
+
+    raiz = os.path.join(destino, nombre)
+    escritores = {}
+    filas_totales = 0
+
+    try:
+        for lote in _lotes(qs, chunk_size):
+            por_particion = defaultdict(list)
+            for fila in lote:
+                fecha = fila[indice_fecha]
+                por_particion[(fecha.year, fecha.month)].append(fila)
+
+            for (anio, mes), filas in por_particion.items():
+                escritor = escritores.get((anio, mes))
+                if escritor is None:
+                    carpeta = os.path.join(raiz, f"anio={anio}", f"mes={mes}")
+                    os.makedirs(carpeta, exist_ok=True)
+                    escritor = pq.ParquetWriter(
+                        os.path.join(carpeta, 'part-0.parquet'), schema, compression=COMPRESION
+                    )
+                    escritores[(anio, mes)] = escritor
+                escritor.write_batch(_a_record_batch(pa, schema, filas))
+
+            filas_totales += len(lote)
+    finally:
+        for escritor in escritores.values():
+            escritor.close()
+
+    logger.info(f"Parquet '{nombre}': {filas_totales} filas en {len(escritores)} particiones")
+    return filas_totales, len(escritores)
+
+
+def exportar_dataset_archivo(nombre, archivo, chunk_size=50000, desde=None, hasta=None):
+    """Escribe el dataset completo (sin particionar) en un archivo abierto en modo binario."""
+    pa, pq = _pyarrow()
+    qs, columnas, _ = DATASETS[nombre](pa, desde, hasta)
+    schema = pa.schema(columnas)
+
+    filas_totales = 0
+    with pq.ParquetWriter(archivo, schema, compression=COMPRESION) as escritor:
+        for lote in _lotes(qs, chunk_size):
+            escritor.write_batch(_a_record_batch(pa, schema, lote))
+            filas_totales += len(lote)
+    return filas_totales
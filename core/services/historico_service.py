@@ -0,0 +1,254 @@
+"""
+Stock de un material en una fecha pasada.
+
+Cada Movimiento guarda su variación con signo, y generar_cortes deja
+periódicamente un CorteStock por material. El stock en una fecha D es el
+corte más cercano a D ajustado con las variaciones entre ambos:
+
+    corte anterior:   stock(D) = corte.stock + Σ variacion en (corte.fecha, D]
+    corte posterior:  stock(D) = corte.stock - Σ variacion en (D, corte.fecha]
+
+así se escanea un tramo corto de movimientos (índice material, fecha) y no
+toda la historia. Los ajustes antiguos sin variación registrada se ignoran
+y el resultado se marca como no exacto.
+
+Para gráficos, registrar_inventario_diario guarda una foto de cierre por
+material y día en InventarioDiario, y serie_stock la devuelve reducida con
+LTTB (Largest-Triangle-Three-Buckets) cuando el rango tiene más puntos de
+los que vale la pena dibujar.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.utils import timezone
+
+from core.models import CorteStock, Inventario, InventarioDiario, Movimiento
+
+logger = logging.getLogger(__name__)
+
+
+def generar_cortes(fecha=None):
+    """
+    Guarda el stock actual de todos los materiales como corte en `fecha`
+    (por defecto ahora). La lectura del inventario se hace en una
+    transacción para que todos los cortes sean de un mismo instante.
+    Retorna la cantidad de cortes creados.
+    """
+    fecha = fecha or timezone.now()
+    with transaction.atomic():
+        cortes = [
+            CorteStock(material_id=material_id, fecha=fecha, stock=stock)
+            for material_id, stock in Inventario.objects.values_list('material_id', 'stock_actual')
+        ]
+        CorteStock.objects.bulk_create(cortes, batch_size=1000, ignore_conflicts=True)
+    logger.info(f"Cortes de stock: {len(cortes)} materiales al {fecha:%Y-%m-%d %H:%M}")
+    return len(cortes)
+
+
+def _cortes_cercanos(material_ids, fecha):
+    """{material_id: CorteStock} con el corte más cercano a `fecha` (antes o después)."""
+    anteriores = dict(
+        CorteStock.objects.filter(material_id__in=material_ids, fecha__lte=fecha)
+        .values('material_id').annotate(f=Max('fecha')).values_list('material_id', 'f')
+    )
+    posteriores = dict(
+        CorteStock.objects.filter(material_id__in=material_ids, fecha__gt=fecha)
+        .values('material_id').annotate(f=Min('fecha')).values_list('material_id', 'f')
+    )
+
+    elegidos = {}
+    for material_id in material_ids:
+        antes, despues = anteriores.get(material_id), posteriores.get(material_id)
+        if antes and (not despues or fecha - antes <= despues - fecha):
+            elegidos[material_id] = antes
+        elif despues:
+            elegidos[material_id] = despues
+    if not elegidos:
+        return {}
+
+    filtro = Q()
+    for material_id, fecha_corte in elegidos.items():
+        filtro |= Q(material_id=material_id, fecha=fecha_corte)
+    return {c.material_id: c for c in CorteStock.objects.filter(filtro)}
+
+
+def stock_en_lote(material_ids, fecha):
+    """
+    Stock de varios materiales en `fecha`.
+    Retorna {material_id: {'stock', 'exacto', 'corte'}}; los materiales sin
+    ningún corte no aparecen.
+    """
+    material_ids = list(material_ids)
+    cortes = _cortes_cercanos(material_ids, fecha)
+
+    # Los cortes se generan en lote: casi todos los materiales comparten
+    # fecha de corte y el tramo se suma con una consulta por fecha distinta.
+    por_fecha = defaultdict(list)
+    for material_id, corte in cortes.items():
+        por_fecha[corte.fecha].append(material_id)
+
+    resultado = {}
+    for fecha_corte, ids in por_fecha.items():
+        if fecha_corte <= fecha:
+            tramo, signo = Q(fecha__gt=fecha_corte, fecha__lte=fecha), 1
+        else:
+            tramo, signo = Q(fecha__gt=fecha, fecha__lte=fecha_corte), -1
+        sumas = {
+            fila['material_id']: fila
+            for fila in Movimiento.objects.filter(tramo, material_id__in=ids)
+            .values('material_id')
+            .annotate(total=Sum('variacion'), sin_signo=Count('id', filter=Q(variacion__isnull=True)))
+            .order_by()
+        }
+        for material_id in ids:
+            fila = sumas.get(material_id, {})
+            resultado[material_id] = {
+                'stock': cortes[material_id].stock + signo * (fila.get('total') or 0),
+                'exacto': not fila.get('sin_signo'),
+                'corte': fecha_corte,
+            }
+    return resultado
+
+
+def stock_en(material_id, fecha):
+    """Stock de un material en `fecha` ({'stock', 'exacto', 'corte'}) o None si no hay cortes."""
+    return stock_en_lote([material_id], fecha).get(material_id)
+
+
+# ==================== INVENTARIO DIARIO ====================
+
+MAX_PUNTOS_SERIE = 400
+
+
+def _guardar_dias(filas):
+    """
+    Upsert de filas InventarioDiario sobre (material, dia). MySQL no acepta
+    unique_fields (su ON DUPLICATE KEY UPDATE usa cualquier clave única, aquí
+    la de material y día); PostgreSQL y SQLite lo exigen.
+    """
+    opciones = {}
+    if connection.features.supports_update_conflicts_with_target:
+        opciones['unique_fields'] = ['material', 'dia']
+    InventarioDiario.objects.bulk_create(
+        filas,
+        batch_size=1000,
+        update_conflicts=True,
+        update_fields=['stock_actual', 'stock_seguridad'],
+        **opciones,
+    )
+
+
+def registrar_inventario_diario(dia=None):
+    """
+    Foto de cierre de todos los inventarios para `dia` (por defecto hoy).
+    Si `dia` ya terminó (la tarea corrió pasada la medianoche), el cierre es
+    el stock actual menos las variaciones posteriores al fin de ese día.
+    Si ya existía se sobrescribe. Retorna la cantidad de filas.
+    """
+    dia = dia or timezone.localdate()
+    posteriores = {}
+    with transaction.atomic():
+        inventarios = list(Inventario.objects.values_list('material_id', 'stock_actual', 'stock_seguridad'))
+        if dia < timezone.localdate():
+            cierre = timezone.make_aware(datetime.combine(dia, datetime.max.time()))
+            posteriores = dict(
+                Movimiento.objects.filter(fecha__gt=cierre)
+                .values('material_id').annotate(total=Sum('variacion'))
+                .order_by().values_list('material_id', 'total')
+            )
+    filas = [
+        InventarioDiario(
+            material_id=material_id, dia=dia,
+            stock_actual=stock - (posteriores.get(material_id) or 0), stock_seguridad=seguridad,
+        )
+        for material_id, stock, seguridad in inventarios
+    ]
+    _guardar_dias(filas)
+    logger.info(f"Inventario diario {dia}: {len(filas)} materiales")
+    return len(filas)
+
+
+def reconstruir_inventario_diario(desde, hasta=None):
+    """
+    Rellena días pasados con el stock al cierre calculado desde los cortes
+    y los movimientos (stock_seguridad: el valor actual). Retorna días escritos.
+    """
+    hasta = hasta or timezone.localdate() - timedelta(days=1)
+    seguridad = dict(Inventario.objects.values_list('material_id', 'stock_seguridad'))
+    material_ids = list(seguridad)
+
+    dias = 0
+    dia = desde
+    while dia <= hasta:
+        cierre = timezone.make_aware(datetime.combine(dia, datetime.max.time()))
+        stocks = stock_en_lote(material_ids, cierre)
+        _guardar_dias([
+            InventarioDiario(
+                material_id=material_id, dia=dia,
+                stock_actual=dato['stock'], stock_seguridad=seguridad[material_id],
+            )
+            for material_id, dato in stocks.items()
+        ])
+        dias += 1
+        dia += timedelta(days=1)
+    return dias
+
+
+def _lttb(puntos, umbral):
+    """
+    Reduce `puntos` [(x, y, ...)] a `umbral` puntos conservando la forma:
+    de cada tramo se elige el punto que forma el triángulo más grande con
+    el elegido anterior y el promedio del tramo siguiente.
+    """
+    n = len(puntos)
+    if umbral >= n or umbral < 3:
+        return puntos
+
+    elegidos = [puntos[0]]
+    tramo = (n - 2) / (umbral - 2)
+    a = 0
+    for i in range(umbral - 2):
+        inicio, fin = int(i * tramo) + 1, int((i + 1) * tramo) + 1
+        sig_inicio, sig_fin = fin, min(int((i + 2) * tramo) + 1, n)
+        siguiente = puntos[sig_inicio:sig_fin]
+        prom_x = sum(p[0] for p in siguiente) / len(siguiente)
+        prom_y = sum(p[1] for p in siguiente) / len(siguiente)
+
+        ax, ay = puntos[a][0], puntos[a][1]
+        mayor, elegido = -1, inicio
+        for j in range(inicio, fin):
+            area = abs((ax - prom_x) * (puntos[j][1] - ay) - (ax - puntos[j][0]) * (prom_y - ay))
+            if area > mayor:
+                mayor, elegido = area, j
+        elegidos.append(puntos[elegido])
+        a = elegido
+    elegidos.append(puntos[-1])
+    return elegidos
+
+
+def serie_stock(material_id, desde=None, hasta=None, max_puntos=MAX_PUNTOS_SERIE):
+    """
+    Serie diaria de stock de un material. Retorna
+    {'dias', 'stock', 'seguridad', 'total', 'muestreado'} con listas paralelas
+    de a lo más max_puntos elementos.
+    """
+    qs = InventarioDiario.objects.filter(material_id=material_id)
+    if desde:
+        qs = qs.filter(dia__gte=desde)
+    if hasta:
+        qs = qs.filter(dia__lte=hasta)
+    filas = [
+        (dia.toordinal(), stock, seguridad, dia)
+        for dia, stock, seguridad in qs.order_by('dia').values_list('dia', 'stock_actual', 'stock_seguridad')
+    ]
+    puntos = _lttb(filas, max_puntos)
+    return {
+        'dias': [p[3].isoformat() for p in puntos],
+        'stock': [p[1] for p in puntos],
+        'seguridad': [p[2] for p in puntos],
+        'total': len(filas),
+        'muestreado': len(puntos) < len(filas),
+    }
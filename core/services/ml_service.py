@@ -3,11 +3,12 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from django.utils import timezone
-from django.db.models import Sum
+from django.db.models import Sum, OuterRef, Subquery
 from django.db.models.functions import TruncDate
 import logging
 
 from core.models import Material, DetalleSolicitud, Movimiento, MLResult, Inventario
+from core.services.serie_compacta import serie_semanal, codificar_serie
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +44,13 @@ def obtener_meses_por_estacion(estacion: str) -> list:
     }
     return meses_map.get(estacion, [])
 
+def ultimos_resultados_ml():
+    """Queryset con el MLResult más reciente de cada material (una sola consulta)."""
+    mas_reciente = MLResult.objects.filter(
+        material=OuterRef('material')
+    ).order_by('-fecha_calculo', '-id').values('id')[:1]
+    return MLResult.objects.filter(id=Subquery(mas_reciente))
+
 # ==================== CALCULADORA DE STOCK CRÍTICO ====================
 
 class StockCriticoCalculatorMejorado:
@@ -167,12 +175,14 @@ class StockCriticoCalculatorMejorado:
             coeficiente_variacion = 0.0
             stock_seguridad_valor = 0.0
             metodo = "Desconocido"
+            df_serie = df_demanda
 
             # 3. Validar datos (Ahora permitimos calcular aunque sea con pocos datos si es simulación)
             if df_demanda.empty:
                 # Si no hay datos en esa estación específica, intentamos obtener un promedio general y aplicar factor
                 logger.warning(f"Sin datos históricos para {self.estacion} en {self.material.codigo}. Usando general con factor.")
                 df_general = self.obtener_demanda_historica()
+                df_serie = df_general
                 
                 if not df_general.empty:
                      # Usamos datos generales pero aplicamos un factor manual según la estación teórica
@@ -235,7 +245,8 @@ class StockCriticoCalculatorMejorado:
                 fecha_calculo=timezone.now(),
                 stock_seguridad=round(stock_seguridad_valor, 2),
                 coeficiente_variacion=round(coeficiente_variacion, 2),
-                metodo_utilizado=metodo 
+                metodo_utilizado=metodo,
+                serie_demanda=codificar_serie(serie_semanal(df_serie)),
             )
 
             try:
@@ -0,0 +1,622 @@
+"""
+Despacho de notificaciones.
+
+Todos los productores (signals y vistas) pasan por aquí: los destinatarios
+se resuelven con una consulta y las filas se escriben con un único
+bulk_create, sin importar cuántos usuarios reciban la notificación.
+
+Con settings.NOTIFICACIONES_DIFERIDAS los productores solo insertan un
+EventoNotificacion (outbox) dentro de su transacción; procesar_eventos lo
+expande después por lotes, fuera de las transacciones que bloquean stock.
+
+También mantiene ContadorNotificaciones (no leídas por usuario y tipo) con
+UPDATE ... F(), así que crear, leer o eliminar notificaciones debe pasar por
+este módulo para que los contadores no se desfasen. El resumen del navbar
+se guarda en caché bajo una clave con la versión de las no leídas, así que
+no hace falta invalidarlo al escribir.
+"""
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from core.models import (
+    Notificacion, Usuario, Material, ContadorNotificaciones, NotificacionArchivada, EventoNotificacion
+)
+
+logger = logging.getLogger(__name__)
+
+# Tipos que ve un técnico (notificaciones sobre sus propias solicitudes)
+TIPOS_TECNICO = ['solicitud_aprobada', 'solicitud_rechazada']
+
+# Resumen del navbar por usuario y versión de sus no leídas
+CACHE_NAVBAR_SEGUNDOS = 300
+
+# Códigos listados en el mensaje del digest de stock crítico
+MAX_CODIGOS_DIGEST = 10
+
+
+def ids_bodega():
+    """IDs de los encargados de bodega activos."""
+    return list(
+        Usuario.objects.filter(rol='BODEGA', is_active=True).values_list('id', flat=True)
+    )
+
+
+def notificar(usuario_ids, tipo, mensaje, url=None, material=None):
+    """Crea la misma notificación para cada usuario con un solo INSERT."""
+    ahora = timezone.now()
+    notificaciones = [
+        Notificacion(
+            usuario_id=usuario_id,
+            tipo=tipo,
+            mensaje=mensaje,
+            url=url,
+            material=material,
+            creada_en=ahora,
+            actualizada_en=ahora,
+        )
+        for usuario_id in usuario_ids
+    ]
+    if notificaciones:
+        with transaction.atomic():
+            # Contador primero: marcar_todas_leidas bloquea estas filas, así
+            # no puede intercalarse entre el INSERT y el incremento.
+            _incrementar(usuario_ids, tipo)
+            Notificacion.objects.bulk_create(notificaciones)
+    return notificaciones
+
+
+def _diferidas():
+    return getattr(settings, 'NOTIFICACIONES_DIFERIDAS', False)
+
+
+def notificar_usuario(usuario, tipo, mensaje, url=None, material=None):
+    if _diferidas():
+        return EventoNotificacion.objects.create(
+            destino='usuario', usuario=usuario, tipo=tipo, mensaje=mensaje, url=url, material=material
+        )
+    return notificar([usuario.pk], tipo, mensaje, url, material)
+
+
+def notificar_bodega(tipo, mensaje, url=None, material=None):
+    if _diferidas():
+        return EventoNotificacion.objects.create(
+            destino='bodega', tipo=tipo, mensaje=mensaje, url=url, material=material
+        )
+    return notificar(ids_bodega(), tipo, mensaje, url, material)
+
+
+def notificar_lote(filas):
+    """
+    Varias notificaciones distintas de una vez.
+    filas: tuplas (usuario_id, tipo, mensaje, url).
+    """
+    if not filas:
+        return
+    if _diferidas():
+        EventoNotificacion.objects.bulk_create([
+            EventoNotificacion(destino='usuario', usuario_id=usuario_id, tipo=tipo, mensaje=mensaje, url=url)
+            for usuario_id, tipo, mensaje, url in filas
+        ])
+        return
+    ahora = timezone.now()
+    with transaction.atomic():
+        _entregar([], [([usuario_id], tipo, mensaje, url, None, ahora)
+                       for usuario_id, tipo, mensaje, url in filas], ahora)
+
+
+def notificar_bodega_lote(filas):
+    """
+    Varias notificaciones para todo BODEGA de una vez.
+    filas: tuplas (tipo, mensaje, url, material_id).
+    """
+    if not filas:
+        return
+    if _diferidas():
+        EventoNotificacion.objects.bulk_create([
+            EventoNotificacion(destino='bodega', tipo=tipo, mensaje=mensaje, url=url, material_id=material_id)
+            for tipo, mensaje, url, material_id in filas
+        ])
+        return
+    ahora = timezone.now()
+    usuario_ids = ids_bodega()
+    with transaction.atomic():
+        _entregar([], [(usuario_ids, tipo, mensaje, url, material_id, ahora)
+                       for tipo, mensaje, url, material_id in filas], ahora)
+
+
+def notificado_recientemente(tipo, material, desde):
+    """Búsqueda indexada en (tipo, material, fecha), incluyendo el outbox."""
+    return (
+        EventoNotificacion.objects.filter(tipo=tipo, material=material, creado_en__gte=desde).exists()
+        or Notificacion.objects.filter(tipo=tipo, material=material, creada_en__gte=desde).exists()
+    )
+
+
+def materiales_notificados(tipo, material_ids, desde):
+    """Como notificado_recientemente, para varios materiales con dos consultas. Retorna un set de ids."""
+    return set(
+        EventoNotificacion.objects.filter(tipo=tipo, material_id__in=material_ids, creado_en__gte=desde)
+        .values_list('material_id', flat=True)
+    ) | set(
+        Notificacion.objects.filter(tipo=tipo, material_id__in=material_ids, creada_en__gte=desde)
+        .values_list('material_id', flat=True)
+    )
+
+
+# ==================== OUTBOX ====================
+
+def _ventana_digest():
+    """Ventana de consolidación de alertas de stock crítico (None = sin digest)."""
+    minutos = getattr(settings, 'NOTIFICACIONES_DIGEST_STOCK_MINUTOS', 0)
+    return timedelta(minutes=minutos) if minutos and _diferidas() else None
+
+
+def _entregar(eventos, filas, ahora):
+    """
+    Escribe las notificaciones de un lote de eventos: un bulk_create, un
+    UPDATE de contadores por (tipo, cantidad) y un UPDATE que marca los
+    eventos. filas: tuplas (usuario_ids, tipo, mensaje, url, material_id, creada_en).
+    Retorna la cantidad de notificaciones creadas.
+    """
+    notificaciones = []
+    por_usuario_tipo = defaultdict(int)
+    for usuario_ids, tipo, mensaje, url, material_id, creada_en in filas:
+        for usuario_id in usuario_ids:
+            notificaciones.append(Notificacion(
+                usuario_id=usuario_id,
+                tipo=tipo,
+                mensaje=mensaje,
+                url=url,
+                material_id=material_id,
+                creada_en=creada_en,
+                actualizada_en=ahora,
+            ))
+            por_usuario_tipo[(usuario_id, tipo)] += 1
+
+    grupos = defaultdict(list)
+    for (usuario_id, tipo), cantidad in por_usuario_tipo.items():
+        grupos[(tipo, cantidad)].append(usuario_id)
+    for (tipo, cantidad), usuario_ids in grupos.items():
+        _incrementar(usuario_ids, tipo, cantidad)
+
+    Notificacion.objects.bulk_create(notificaciones, batch_size=1000)
+    if eventos:
+        EventoNotificacion.objects.filter(pk__in=[e.pk for e in eventos]).update(procesado_en=ahora)
+    return len(notificaciones)
+
+
+def procesar_eventos(lote=200):
+    """
+    Expande hasta `lote` eventos pendientes en notificaciones por usuario.
+    Con skip_locked varios workers no se pisan. Las alertas de stock crítico
+    en modo digest se dejan para procesar_digest_stock.
+    Retorna (eventos, notificaciones).
+    """
+    with transaction.atomic():
+        pendientes = EventoNotificacion.objects.select_for_update(skip_locked=True).filter(
+            procesado_en__isnull=True
+        )
+        if _ventana_digest():
+            pendientes = pendientes.exclude(tipo='stock_critico', destino='bodega')
+        eventos = list(pendientes.order_by('id')[:lote])
+        if not eventos:
+            return 0, 0
+
+        bodega = ids_bodega() if any(e.destino == 'bodega' for e in eventos) else []
+        filas = [
+            (
+                bodega if e.destino == 'bodega' else [e.usuario_id],
+                e.tipo, e.mensaje, e.url, e.material_id, e.creado_en,
+            )
+            for e in eventos
+        ]
+        creadas = _entregar(eventos, filas, timezone.now())
+
+    return len(eventos), creadas
+
+
+def procesar_digest_stock(ahora=None):
+    """
+    Consolida las alertas de stock crítico pendientes en UNA notificación
+    por encargado de bodega, una vez que la más antigua cumplió la ventana
+    (NOTIFICACIONES_DIGEST_STOCK_MINUTOS). Tras un ajuste masivo o un cálculo
+    ML se escribe una fila por usuario en vez de una por material.
+    Retorna (eventos, notificaciones).
+    """
+    ventana = _ventana_digest()
+    if not ventana:
+        return 0, 0
+    ahora = ahora or timezone.now()
+
+    with transaction.atomic():
+        pendientes = EventoNotificacion.objects.select_for_update(skip_locked=True).filter(
+            procesado_en__isnull=True, tipo='stock_critico', destino='bodega'
+        )
+        eventos = list(pendientes.order_by('id'))
+        if not eventos or eventos[0].creado_en > ahora - ventana:
+            return 0, 0
+
+        if len(eventos) == 1:
+            evento = eventos[0]
+            fila = (evento.mensaje, evento.url, evento.material_id)
+        else:
+            material_ids = {e.material_id for e in eventos if e.material_id}
+            codigos = sorted(
+                Material.objects.filter(id__in=material_ids).values_list('codigo', flat=True)
+            )
+            listado = ', '.join(codigos[:MAX_CODIGOS_DIGEST])
+            if len(codigos) > MAX_CODIGOS_DIGEST:
+                listado += f" y {len(codigos) - MAX_CODIGOS_DIGEST} más"
+            fila = (
+                f"Stock crítico en {len(codigos)} materiales: {listado}",
+                '/inventario/?quiebre=critico&orden=urgencia',
+                None,
+            )
+
+        mensaje, url, material_id = fila
+        creadas = _entregar(eventos, [(ids_bodega(), 'stock_critico', mensaje, url, material_id, ahora)], ahora)
+
+    logger.info(f"Digest de stock crítico: {len(eventos)} alertas consolidadas")
+    return len(eventos), creadas
+
+
+# ==================== LECTURA / ELIMINACIÓN ====================
+
+def marcar_leida(notificacion):
+    """Marca como leída y descuenta el contador solo si estaba sin leer."""
+    actualizadas = Notificacion.objects.filter(pk=notificacion.pk, leida=False).update(
+        leida=True, actualizada_en=timezone.now()
+    )
+    if actualizadas:
+        _descontar(notificacion.usuario_id, notificacion.tipo, actualizadas)
+    notificacion.leida = True
+    return bool(actualizadas)
+
+
+def marcar_todas_leidas(usuario):
+    with transaction.atomic():
+        list(ContadorNotificaciones.objects.select_for_update().filter(usuario=usuario))
+        count = Notificacion.objects.filter(usuario=usuario, leida=False).update(
+            leida=True, actualizada_en=timezone.now()
+        )
+        ContadorNotificaciones.objects.filter(usuario=usuario).update(
+            no_leidas=0, version=F('version') + 1
+        )
+    return count
+
+
+def eliminar(notificacion):
+    no_leidas, _ = Notificacion.objects.filter(pk=notificacion.pk, leida=False).delete()
+    if no_leidas:
+        _descontar(notificacion.usuario_id, notificacion.tipo, no_leidas)
+    else:
+        Notificacion.objects.filter(pk=notificacion.pk).delete()
+
+
+# ==================== CONTADORES ====================
+
+def _incrementar(usuario_ids, tipo, cantidad=1):
+    ContadorNotificaciones.objects.bulk_create(
+        [ContadorNotificaciones(usuario_id=usuario_id, tipo=tipo) for usuario_id in usuario_ids],
+        ignore_conflicts=True,
+    )
+    ContadorNotificaciones.objects.filter(usuario_id__in=usuario_ids, tipo=tipo).update(
+        no_leidas=F('no_leidas') + cantidad, version=F('version') + 1
+    )
+
+
+def _descontar(usuario_id, tipo, cantidad=1):
+    ContadorNotificaciones.objects.filter(usuario_id=usuario_id, tipo=tipo).update(
+        no_leidas=Greatest(F('no_leidas') - cantidad, 0), version=F('version') + 1
+    )
+
+
+def firmas_no_leidas(usuario_ids):
+    """
+    {usuario_id: (no_leidas, version)} con una consulta agrupada sobre los
+    contadores (no toca Notificacion). Toda escritura que cambia las no
+    leídas de un usuario sube la suma de sus versiones, así que la firma
+    cambia al crear, leer o eliminar una no leída.
+    """
+    firmas = {usuario_id: (0, 0) for usuario_id in usuario_ids}
+    filas = (
+        ContadorNotificaciones.objects.filter(usuario_id__in=usuario_ids)
+        .values('usuario_id')
+        .annotate(total=Sum('no_leidas'), version=Sum('version'))
+        .order_by()
+    )
+    for fila in filas:
+        firmas[fila['usuario_id']] = (fila['total'] or 0, fila['version'] or 0)
+    return firmas
+
+
+def contar_no_leidas(usuario, tipos=None):
+    """Total de no leídas desde los contadores (no toca Notificacion)."""
+    contadores = ContadorNotificaciones.objects.filter(usuario=usuario)
+    if tipos is not None:
+        contadores = contadores.filter(tipo__in=tipos)
+    return contadores.aggregate(total=Sum('no_leidas'))['total'] or 0
+
+
+def no_leidas_por_tipo(usuario):
+    return dict(
+        ContadorNotificaciones.objects.filter(usuario=usuario, no_leidas__gt=0)
+        .values_list('tipo', 'no_leidas')
+    )
+
+
+def recalcular_contadores(usuario_ids=None):
+    """Reconstruye los contadores desde Notificacion (todos o solo usuario_ids)."""
+    no_leidas = Notificacion.objects.filter(leida=False)
+    contadores = ContadorNotificaciones.objects.all()
+    if usuario_ids is not None:
+        no_leidas = no_leidas.filter(usuario_id__in=usuario_ids)
+        contadores = contadores.filter(usuario_id__in=usuario_ids)
+
+    filas = [
+        ContadorNotificaciones(usuario_id=fila['usuario_id'], tipo=fila['tipo'], no_leidas=fila['total'])
+        for fila in no_leidas.values('usuario_id', 'tipo').annotate(total=Count('id')).order_by()
+    ]
+
+    with transaction.atomic():
+        # La versión del usuario no puede retroceder: su primera fila nueva
+        # lleva la suma anterior + 1 (firmas_no_leidas)
+        versiones = dict(
+            contadores.values('usuario_id').annotate(total=Sum('version')).order_by()
+            .values_list('usuario_id', 'total')
+        )
+        for fila in filas:
+            if fila.usuario_id in versiones:
+                fila.version = versiones.pop(fila.usuario_id) + 1
+        contadores.delete()
+        ContadorNotificaciones.objects.bulk_create(filas, batch_size=1000)
+    return len(filas)
+
+
+# ==================== RETENCIÓN ====================
+
+CAMPOS_ARCHIVO = ['id', 'usuario_id', 'tipo', 'material_id', 'mensaje', 'leida',
+                  'url', 'creada_en', 'actualizada_en']
+
+
+def _purgar_lote(ids, archivar):
+    """Archiva (opcional) y elimina un lote de IDs en una transacción corta."""
+    with transaction.atomic():
+        filas = list(
+            Notificacion.objects.filter(pk__in=ids).select_for_update().values(*CAMPOS_ARCHIVO)
+        )
+        if archivar:
+            ahora = timezone.now()
+            NotificacionArchivada.objects.bulk_create(
+                [
+                    NotificacionArchivada(id_original=fila.pop('id'), archivada_en=ahora, **fila)
+                    for fila in filas
+                ],
+                ignore_conflicts=True,
+            )
+        Notificacion.objects.filter(pk__in=ids).delete()
+
+        # Las no leídas eliminadas salen de los contadores
+        descontar = defaultdict(int)
+        for fila in filas:
+            if not fila['leida']:
+                descontar[(fila['usuario_id'], fila['tipo'])] += 1
+        for (usuario_id, tipo), cantidad in descontar.items():
+            _descontar(usuario_id, tipo, cantidad)
+    return len(filas)
+
+
+def purgar_notificaciones(dias_leidas=30, dias_no_leidas=180, archivar=True,
+                          lote=1000, pausa=0, simular=False):
+    """
+    Elimina (o mueve a NotificacionArchivada) las leídas con más de
+    dias_leidas días y las no leídas con más de dias_no_leidas.
+
+    Recorre la tabla por PK en lotes de `lote` filas, cada uno en su propia
+    transacción, así nunca se bloquean muchas filas a la vez. `pausa`
+    (segundos) entre lotes deja respirar a la réplica en MySQL.
+    Retorna la cantidad de filas afectadas.
+    """
+    ahora = timezone.now()
+    candidatas = Notificacion.objects.filter(
+        Q(leida=True, creada_en__lt=ahora - timedelta(days=dias_leidas))
+        | Q(leida=False, creada_en__lt=ahora - timedelta(days=dias_no_leidas))
+    )
+    if simular:
+        return candidatas.count()
+
+    total = 0
+    ultimo_id = 0
+    while True:
+        ids = list(
+            candidatas.filter(pk__gt=ultimo_id).order_by('pk').values_list('pk', flat=True)[:lote]
+        )
+        if not ids:
+            break
+        total += _purgar_lote(ids, archivar)
+        ultimo_id = ids[-1]
+        logger.info(f"Retención: {total} notificaciones procesadas (hasta id {ultimo_id})")
+        if pausa:
+            time.sleep(pausa)
+
+    # Eventos del outbox ya procesados: mismo plazo que las leídas
+    procesados = EventoNotificacion.objects.filter(
+        procesado_en__lt=ahora - timedelta(days=dias_leidas)
+    )
+    while True:
+        ids = list(procesados.order_by('pk').values_list('pk', flat=True)[:lote])
+        if not ids:
+            break
+        EventoNotificacion.objects.filter(pk__in=ids).delete()
+        if pausa:
+            time.sleep(pausa)
+    return total
+
+
+# ==================== DROPDOWN DEL NAVBAR ====================
+
+ICONOS = {
+    'stock_critico': 'fa-exclamation-triangle',
+    'solicitud_pendiente': 'fa-clipboard-list',
+    'material_nuevo': 'fa-box',
+    'aprobacion': 'fa-check-circle',
+    'solicitud_aprobada': 'fa-check-circle',      # Para técnicos
+    'solicitud_rechazada': 'fa-times-circle',     # Para técnicos
+}
+
+
+def icono_notificacion(tipo):
+    """Retorna el ícono FontAwesome según el tipo de notificación"""
+    return ICONOS.get(tipo, 'fa-bell')
+
+
+def notificaciones_visibles(usuario):
+    """
+    Notificaciones que el usuario puede ver según su rol.
+    TÉCNICO solo ve sus solicitudes; BODEGA/GERENCIA ven todo.
+    Retorna (queryset, tipos) con tipos=None si no hay filtro por tipo.
+    """
+    if usuario.rol == 'TECNICO':
+        tipos = TIPOS_TECNICO
+    elif usuario.rol in ['BODEGA', 'GERENCIA']:
+        tipos = None
+    else:
+        return Notificacion.objects.none(), []
+
+    notificaciones = Notificacion.objects.filter(usuario=usuario)
+    if tipos is not None:
+        notificaciones = notificaciones.filter(tipo__in=tipos)
+    return notificaciones, tipos
+
+
+def resumen_dropdown(usuario, limite=10, siguiente=None):
+    """
+    Payload del dropdown (API JSON y SSE). `siguiente` es el cursor
+    retornado por la página anterior (keyset sobre creada_en, id).
+    """
+    notificaciones, tipos = notificaciones_visibles(usuario)
+    pagina = paginar_keyset(notificaciones.filter(leida=False), siguiente=siguiente, limite=limite)
+
+    return {
+        'count': contar_no_leidas(usuario, tipos=tipos),
+        'siguiente': pagina['siguiente'],
+        'notificaciones': [
+            {
+                'id': n.id,
+                'tipo': n.tipo,
+                'mensaje': n.mensaje,
+                'url': n.url or '',
+                'fecha': n.creada_en.strftime('%d/%m/%Y %H:%M'),
+                'icono': icono_notificacion(n.tipo),
+            }
+            for n in pagina['items']
+        ],
+    }
+
+
+# ==================== PAGINACIÓN KEYSET ====================
+# Las páginas se piden relativas a la última fila vista, (creada_en, id),
+# en vez de OFFSET: una página profunda cuesta lo mismo que la primera
+# (índice usuario + creada_en). El cursor es "<microsegundos>-<id>".
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def cursor_de(notificacion):
+    micro = (notificacion.creada_en - EPOCH) // timedelta(microseconds=1)
+    return f"{micro}-{notificacion.pk}"
+
+
+def leer_cursor(cursor):
+    """Retorna (creada_en, id) o None si el cursor no es válido."""
+    try:
+        micro, pk = cursor.split('-')
+        return EPOCH + timedelta(microseconds=int(micro)), int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def paginar_keyset(qs, siguiente=None, anterior=None, limite=20):
+    """
+    Página de `qs` en orden (-creada_en, -id). `siguiente` avanza hacia las
+    más antiguas y `anterior` retrocede hacia las más nuevas.
+    Retorna {'items', 'siguiente', 'anterior'} con los cursores o None.
+    """
+    siguiente = leer_cursor(siguiente) if siguiente else None
+    anterior = leer_cursor(anterior) if anterior else None
+
+    if anterior:
+        fecha, pk = anterior
+        filas = list(
+            qs.filter(Q(creada_en__gt=fecha) | Q(creada_en=fecha, pk__gt=pk))
+            .order_by('creada_en', 'id')[:limite + 1]
+        )
+        hay_nuevas = len(filas) > limite
+        filas = filas[:limite][::-1]
+        hay_antiguas = True
+    else:
+        if siguiente:
+            fecha, pk = siguiente
+            qs = qs.filter(Q(creada_en__lt=fecha) | Q(creada_en=fecha, pk__lt=pk))
+        filas = list(qs.order_by('-creada_en', '-id')[:limite + 1])
+        hay_antiguas = len(filas) > limite
+        filas = filas[:limite]
+        hay_nuevas = siguiente is not None
+
+    return {
+        'items': filas,
+        'siguiente': cursor_de(filas[-1]) if filas and hay_antiguas else None,
+        'anterior': cursor_de(filas[0]) if filas and hay_nuevas else None,
+    }
+
+
+def estadisticas(qs):
+    """Total, no leídas y leídas con una sola agregación condicional."""
+    stats = qs.aggregate(
+        total=Count('id'),
+        no_leidas=Count('id', filter=Q(leida=False)),
+    )
+    stats['leidas'] = stats['total'] - stats['no_leidas']
+    return stats
+
+
+def etag_dropdown(usuario):
+    """
+    ETag del payload de resumen_dropdown desde los contadores del usuario
+    (firmas_no_leidas): cambia al crear, leer o eliminar una no leída y no
+    consulta Notificacion.
+    """
+    no_leidas, version = firmas_no_leidas([usuario.pk])[usuario.pk]
+    return f"{usuario.pk}-{usuario.rol}-{version}-{no_leidas}"
+
+
+# ==================== CACHÉ DEL NAVBAR ====================
+
+def datos_navbar(usuario):
+    """
+    Últimas 5 no leídas y total. La clave lleva la firma de los contadores
+    (firmas_no_leidas), así que cualquier proceso (otro worker web,
+    procesar_notificaciones) que escriba notificaciones deja obsoleta la
+    entrada de la caché local. Con la caché vigente no se consulta Notificacion.
+    """
+    no_leidas, version = firmas_no_leidas([usuario.pk])[usuario.pk]
+    clave = f'notificaciones:navbar:{usuario.pk}:{version}'
+    datos = cache.get(clave)
+    if datos is None:
+        datos = {
+            'notificaciones': list(
+                Notificacion.objects.filter(usuario=usuario, leida=False).order_by('-creada_en')[:5]
+            ),
+            'count': no_leidas,
+        }
+        cache.set(clave, datos, CACHE_NAVBAR_SEGUNDOS)
+    return datos
@@ -0,0 +1,117 @@
+"""
+Difusión de notificaciones por Server-Sent Events (solo bajo ASGI).
+
+Un único loop por proceso consulta la BD cada INTERVALO segundos con una
+sola consulta agrupada sobre ContadorNotificaciones (no leídas y versión
+por usuario) para todos los usuarios conectados, sin tocar Notificacion.
+Solo a los usuarios cuya firma cambió se les recalcula resumen_dropdown y se les empuja el evento, así
+que el costo no depende de cuántas pestañas haya abiertas.
+
+Consultar la BD (en vez de avisar en memoria desde notificaciones_service)
+hace que también lleguen las notificaciones creadas por otros procesos:
+workers WSGI, comandos y el scheduler.
+"""
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+from core.services.notificaciones_service import firmas_no_leidas, resumen_dropdown
+
+logger = logging.getLogger(__name__)
+
+INTERVALO = 3        # segundos entre consultas del loop
+KEEPALIVE = 25       # comentario SSE para que proxies no corten la conexión
+REINTENTO_MS = 10000  # 'retry' sugerido al navegador tras un corte
+
+_SIN_FIRMA = object()
+
+
+def _evento(datos):
+    return f"data: {json.dumps(datos)}\n\n"
+
+
+def _firmas(usuario_ids):
+    """Firma por usuario desde los contadores: cambia si se crea, lee o elimina una no leída."""
+    close_old_connections()
+    return firmas_no_leidas(usuario_ids)
+
+
+def _resumen(usuario):
+    close_old_connections()
+    return resumen_dropdown(usuario)
+
+
+class DifusorNotificaciones:
+    """Suscripciones por usuario y el loop de consulta compartido."""
+
+    def __init__(self):
+        self.suscriptores = {}   # usuario_id -> {'usuario', 'colas', 'firma'}
+        self._tarea = None
+
+    def _suscribir(self, usuario):
+        cola = asyncio.Queue(maxsize=1)
+        entrada = self.suscriptores.setdefault(
+            usuario.pk, {'usuario': usuario, 'colas': set(), 'firma': _SIN_FIRMA}
+        )
+        entrada['colas'].add(cola)
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.get_running_loop().create_task(self._loop())
+        return cola
+
+    def _desuscribir(self, usuario, cola):
+        entrada = self.suscriptores.get(usuario.pk)
+        if entrada is None:
+            return
+        entrada['colas'].discard(cola)
+        if not entrada['colas']:
+            del self.suscriptores[usuario.pk]
+
+    @staticmethod
+    def _publicar(cola, datos):
+        # Solo importa el último estado: se reemplaza el que no se alcanzó a enviar
+        if cola.full():
+            cola.get_nowait()
+        cola.put_nowait(datos)
+
+    async def _loop(self):
+        while self.suscriptores:
+            try:
+                firmas = await sync_to_async(_firmas)(list(self.suscriptores))
+                for usuario_id, firma in firmas.items():
+                    entrada = self.suscriptores.get(usuario_id)
+                    if entrada is None or entrada['firma'] == firma:
+                        continue
+                    entrada['firma'] = firma
+                    datos = await sync_to_async(_resumen)(entrada['usuario'])
+                    for cola in list(entrada['colas']):
+                        self._publicar(cola, datos)
+            except Exception as e:
+                logger.error(f"Error en difusión de notificaciones: {str(e)}")
+            await asyncio.sleep(INTERVALO)
+
+    async def eventos(self, usuario):
+        """Iterador asíncrono para StreamingHttpResponse."""
+        cola = self._suscribir(usuario)
+        try:
+            yield f"retry: {REINTENTO_MS}\n\n"
+            # Firma antes del resumen: lo que cambie después lo empuja el loop
+            firma = (await sync_to_async(_firmas)([usuario.pk]))[usuario.pk]
+            entrada = self.suscriptores[usuario.pk]
+            if entrada['firma'] is _SIN_FIRMA:
+                entrada['firma'] = firma
+            yield _evento(await sync_to_async(_resumen)(usuario))
+            while True:
+                try:
+                    datos = await asyncio.wait_for(cola.get(), timeout=KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield _evento(datos)
+        finally:
+            self._desuscribir(usuario, cola)
+
+
+difusor_notificaciones = DifusorNotificaciones()
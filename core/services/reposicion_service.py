@@ -0,0 +1,94 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import SugerenciaCompra
+from core.services.ml_service import ultimos_resultados_ml
+
+logger = logging.getLogger(__name__)
+
+
+def calcular_sugerencias_compra(
+    metodo: str = 'order_up_to',
+    dias_revision: int = 7,
+    costo_pedido: float = 50.0,
+    costo_mantencion: float = 1.0,
+):
+    """
+    Calcula la cantidad a comprar para todo el catálogo en una sola pasada.
+
+    - Se pide solo si stock_actual <= punto de pedido (stock crítico ML).
+    - order_up_to: repone hasta demanda·(leadtime + revisión) + stock de seguridad.
+    - eoq: pide el lote económico, o lo necesario para volver al punto de pedido si es mayor.
+
+    Una lectura (último MLResult + inventario) y una escritura (bulk_create).
+    Reemplaza la tabla SugerenciaCompra completa y retorna las filas creadas.
+    """
+    # Con mantención 0 o un costo negativo el lote económico es inf/NaN
+    if costo_mantencion <= 0:
+        raise ValueError(f"costo_mantencion debe ser mayor que 0: {costo_mantencion}")
+    if costo_pedido < 0:
+        raise ValueError(f"costo_pedido no puede ser negativo: {costo_pedido}")
+
+    filas = list(
+        ultimos_resultados_ml()
+        .filter(material__inventario__isnull=False)
+        .values(
+            'material_id', 'demanda_promedio', 'leadtime_dias',
+            'stock_min_calculado', 'stock_seguridad',
+            'material__inventario__stock_actual',
+        )
+    )
+    if not filas:
+        with transaction.atomic():
+            SugerenciaCompra.objects.all().delete()
+        return []
+
+    df = pd.DataFrame(filas).rename(columns={'material__inventario__stock_actual': 'stock_actual'})
+    demanda = df['demanda_promedio'].clip(lower=0)
+
+    df['nivel_objetivo'] = np.ceil(
+        demanda * (df['leadtime_dias'] + dias_revision) + df['stock_seguridad']
+    ).astype(int)
+    df['lote_economico'] = np.ceil(
+        np.sqrt(2 * demanda * 365 * costo_pedido / costo_mantencion)
+    ).astype(int)
+
+    faltante_objetivo = (df['nivel_objetivo'] - df['stock_actual']).clip(lower=0)
+    if metodo == 'eoq':
+        faltante_pedido = (df['stock_min_calculado'] - df['stock_actual']).clip(lower=0)
+        cantidad = np.maximum(df['lote_economico'], faltante_pedido)
+    else:
+        cantidad = faltante_objetivo
+
+    df['cantidad_sugerida'] = np.where(
+        df['stock_actual'] <= df['stock_min_calculado'], cantidad, 0
+    ).astype(int)
+    df = df[df['cantidad_sugerida'] > 0]
+
+    ahora = timezone.now()
+    sugerencias = [
+        SugerenciaCompra(
+            material_id=fila.material_id,
+            stock_actual=fila.stock_actual,
+            demanda_diaria=round(fila.demanda_promedio, 2),
+            leadtime_dias=fila.leadtime_dias,
+            punto_pedido=fila.stock_min_calculado,
+            nivel_objetivo=fila.nivel_objetivo,
+            lote_economico=fila.lote_economico,
+            cantidad_sugerida=fila.cantidad_sugerida,
+            metodo=metodo,
+            fecha_calculo=ahora,
+        )
+        for fila in df.itertuples(index=False)
+    ]
+
+    with transaction.atomic():
+        SugerenciaCompra.objects.all().delete()
+        SugerenciaCompra.objects.bulk_create(sugerencias, batch_size=500)
+
+    logger.info(f"Sugerencias de compra ({metodo}): {len(sugerencias)} de {len(filas)} materiales")
+    return sugerencias
@@ -0,0 +1,144 @@
+import logging
+import os
+import shlex
+import subprocess
+import sys
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import TareaProgramada, EjecucionTarea
+from core.services.cron import ExpresionCron
+
+logger = logging.getLogger(__name__)
+
+# Un bloqueo más antiguo que tiempo_maximo + este margen es huérfano: el
+# proceso de la tarea ya se habría terminado por tiempo (planificador caído)
+MARGEN_BLOQUEO = timedelta(minutes=5)
+
+# Ejecuciones que se conservan por tarea (cada una guarda hasta 10 KB de salida)
+MAX_EJECUCIONES_POR_TAREA = 200
+
+# Variable de entorno con la hora programada (ISO, hora local) que recibe el
+# proceso de la tarea: los comandos que trabajan "del día" la usan en vez de
+# la hora real, que puede haber pasado la medianoche si la tarea se atrasó
+VARIABLE_PROGRAMADA = 'STOCKER_TAREA_PROGRAMADA'
+
+
+# ==================== EJECUCIÓN ====================
+
+def programar_siguiente(tarea, desde=None):
+    desde = desde or timezone.localtime()
+    tarea.proxima_ejecucion = ExpresionCron(tarea.cron).siguiente(desde)
+    TareaProgramada.objects.filter(pk=tarea.pk).update(proxima_ejecucion=tarea.proxima_ejecucion)
+
+
+def tareas_vencidas(ahora=None):
+    ahora = ahora or timezone.now()
+    return TareaProgramada.objects.filter(
+        activa=True, proxima_ejecucion__lte=ahora
+    ).order_by('proxima_ejecucion')
+
+
+def tomar_tarea(tarea, ahora=None):
+    """
+    Marca la tarea como en ejecución con un UPDATE condicional.
+    Retorna False si otro proceso ya la está ejecutando.
+    """
+    ahora = ahora or timezone.now()
+    huerfano = ahora - timedelta(seconds=tarea.tiempo_maximo) - MARGEN_BLOQUEO
+    tomadas = TareaProgramada.objects.filter(pk=tarea.pk).filter(
+        Q(en_ejecucion=False) | Q(inicio_ejecucion__lt=huerfano)
+    ).update(en_ejecucion=True, inicio_ejecucion=ahora)
+    return tomadas == 1
+
+
+def _texto(salida):
+    # TimeoutExpired entrega bytes aunque el proceso se haya abierto en modo texto
+    if isinstance(salida, bytes):
+        return salida.decode('utf-8', errors='replace')
+    return salida or ''
+
+
+def _podar_ejecuciones(tarea):
+    """Deja solo las últimas MAX_EJECUCIONES_POR_TAREA ejecuciones de la tarea."""
+    corte = (
+        EjecucionTarea.objects.filter(tarea=tarea)
+        .order_by('-pk').values_list('pk', flat=True)[MAX_EJECUCIONES_POR_TAREA:MAX_EJECUCIONES_POR_TAREA + 1]
+    )
+    if corte:
+        EjecucionTarea.objects.filter(tarea=tarea, pk__lte=corte[0]).delete()
+
+
+def ejecutar_tarea(tarea):
+    """
+    Ejecuta el comando de la tarea en un proceso aparte (manage.py), que se
+    termina si supera tarea.tiempo_maximo, y registra duración, salida y
+    error en EjecucionTarea. El proceso recibe la hora programada en
+    VARIABLE_PROGRAMADA. Retorna la ejecución, o None si la tarea ya
+    estaba corriendo. Si el planificador se interrumpe (KeyboardInterrupt,
+    SystemExit) la ejecución igual queda registrada como fallida antes de
+    propagar la excepción.
+    """
+    if not tomar_tarea(tarea):
+        logger.warning(f"Tarea '{tarea.nombre}' ya en ejecución, se omite")
+        return None
+
+    inicio = timezone.now()
+    t0 = time.monotonic()
+    salida = ''
+    error = ''
+    exito = False
+    comando = [sys.executable, str(settings.BASE_DIR / 'manage.py'), tarea.comando, *shlex.split(tarea.argumentos)]
+    entorno = dict(os.environ)
+    programada = tarea.proxima_ejecucion
+    if programada and programada <= inicio:
+        entorno[VARIABLE_PROGRAMADA] = timezone.localtime(programada).isoformat()
+
+    try:
+        proceso = subprocess.run(
+            comando, capture_output=True, text=True, timeout=tarea.tiempo_maximo, cwd=settings.BASE_DIR,
+            env=entorno,
+        )
+        salida = proceso.stdout + proceso.stderr
+        exito = proceso.returncode == 0
+        if not exito:
+            error = proceso.stderr[-10000:] or f"Código de salida {proceso.returncode}"
+    except subprocess.TimeoutExpired as e:
+        salida = _texto(e.stdout) + _texto(e.stderr)
+        error = f"Tiempo máximo excedido ({tarea.tiempo_maximo}s): proceso terminado"
+    except Exception:
+        error = traceback.format_exc()
+    except BaseException:
+        error = f"Ejecución interrumpida\n{traceback.format_exc()}"
+        raise
+    finally:
+        duracion = round(time.monotonic() - t0, 3)
+        fin = timezone.now()
+        if not exito:
+            logger.error(f"Tarea '{tarea.nombre}' falló: {error}")
+        TareaProgramada.objects.filter(pk=tarea.pk).update(
+            en_ejecucion=False,
+            inicio_ejecucion=None,
+            ultima_ejecucion=inicio,
+            ultima_duracion=duracion,
+            ultimo_exito=exito,
+        )
+        ejecucion = EjecucionTarea.objects.create(
+            tarea=tarea,
+            inicio=inicio,
+            fin=fin,
+            duracion=duracion,
+            exito=exito,
+            salida=salida[-10000:],
+            error=error,
+        )
+        programar_siguiente(tarea, timezone.localtime(fin))
+        _podar_ejecuciones(tarea)
+
+    logger.info(f"Tarea '{tarea.nombre}' {'OK' if exito else 'ERROR'} en {duracion}s")
+    return ejecucion
@@ -0,0 +1,266 @@
+"""
+Respuesta a solicitudes de materiales (aprobar, rechazar, cancelar).
+
+El flujo completo (bloqueo de inventarios, validación, descuento,
+movimientos y notificación) usa un número constante de consultas sin
+importar cuántas líneas tenga la solicitud. Cada salida de 'pendiente'
+libera la reserva de stock que hizo la solicitud al crearse.
+"""
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import Solicitud, DetalleSolicitud, Inventario, Movimiento
+from core.services import stock_service
+from core.services.notificaciones_service import notificar_usuario, notificar_lote
+
+logger = logging.getLogger(__name__)
+
+
+class SolicitudNoPendiente(Exception):
+    pass
+
+
+def aprobar(solicitud, usuario):
+    """
+    Aprueba la solicitud y descuenta el stock de todas sus líneas.
+    Lanza SolicitudNoPendiente si otro usuario ya la respondió y
+    StockInsuficiente (con todo revertido) si alguna línea no alcanza.
+    """
+    with transaction.atomic():
+        # UPDATE condicional: bloquea la solicitud y evita aprobarla dos veces
+        ahora = timezone.now()
+        tomadas = Solicitud.objects.filter(pk=solicitud.pk, estado='pendiente').update(
+            estado='aprobada',
+            respondido_por=usuario,
+            fecha_respuesta=ahora,
+            fecha_actualizacion=ahora,
+        )
+        if not tomadas:
+            raise SolicitudNoPendiente(f"La solicitud #{solicitud.pk} ya fue respondida")
+
+        detalles = list(solicitud.detalles.select_related('material'))
+        inventarios = stock_service.descontar_lote(
+            stock_service.sumar_por_material(detalles), solicitud=solicitud
+        )
+        solicitud.detalles.update(cantidad_aprobada=F('cantidad'))
+
+        Movimiento.objects.bulk_create([
+            Movimiento(
+                material=detalle.material,
+                usuario=usuario,
+                solicitud=solicitud,
+                tipo='salida',
+                cantidad=detalle.cantidad,
+                variacion=-detalle.cantidad,
+                detalle=f'Aprobación solicitud #{solicitud.pk}',
+                fecha=ahora,
+            )
+            for detalle in detalles
+        ])
+
+        materiales = {detalle.material_id: detalle.material for detalle in detalles}
+        for inventario in inventarios:
+            inventario.material = materiales[inventario.material_id]
+        stock_service.alertar_criticos(inventarios)
+
+        notificar_usuario(
+            solicitud.solicitante,
+            tipo='solicitud_aprobada',
+            mensaje=f'Tu solicitud #{solicitud.pk} ha sido APROBADA',
+            url=f'/solicitud/{solicitud.pk}/'
+        )
+
+    solicitud.estado = 'aprobada'
+    solicitud.respondido_por = usuario
+    solicitud.fecha_respuesta = ahora
+    logger.info(f"Solicitud #{solicitud.pk} aprobada ({len(detalles)} líneas)")
+    return solicitud
+
+
+def aprobar_lote(solicitud_ids, usuario):
+    """
+    Aprueba muchas solicitudes en una transacción. Se procesan por
+    fecha_solicitud (las más antiguas primero) contra el stock restante:
+    una solicitud se aprueba completa o queda pendiente. Lo reservado por
+    solicitudes pendientes más antiguas (fuera del lote o que no alcanzaron)
+    no se puede tomar.
+
+    Consultas constantes: bloqueo de solicitudes, detalles, bloqueo de
+    inventarios, bulk_update, bulk_create de movimientos, UPDATE de
+    estado y un lote de notificaciones.
+    Retorna lista de (solicitud_id, aprobada, mensaje) en el orden procesado.
+    """
+    resultados = []
+    with transaction.atomic():
+        solicitudes = list(
+            Solicitud.objects.select_for_update()
+            .filter(pk__in=solicitud_ids, estado='pendiente')
+            .order_by('pk')
+        )
+        solicitudes.sort(key=lambda s: (s.fecha_solicitud, s.pk))
+        omitidas = set(solicitud_ids) - {s.pk for s in solicitudes}
+        resultados.extend((pk, False, 'No está pendiente') for pk in sorted(omitidas))
+        if not solicitudes:
+            return resultados
+
+        detalles_por_solicitud = defaultdict(list)
+        for detalle in DetalleSolicitud.objects.filter(
+            solicitud__in=solicitudes
+        ).select_related('material'):
+            detalles_por_solicitud[detalle.solicitud_id].append(detalle)
+
+        inventarios = stock_service.bloquear_inventarios(
+            {d.material_id for detalles in detalles_por_solicitud.values() for d in detalles}
+        )
+        restante = {material_id: inv.stock_actual for material_id, inv in inventarios.items()}
+
+        # Pendientes fuera del lote, hasta la más nueva del lote: al pasar por
+        # cada una en orden su reserva queda comprometida para las siguientes
+        ultima = solicitudes[-1]
+        externas = defaultdict(list)
+        for fila in DetalleSolicitud.objects.filter(
+            material_id__in=inventarios, solicitud__estado='pendiente',
+            solicitud__fecha_solicitud__lte=ultima.fecha_solicitud,
+        ).exclude(solicitud__in=solicitudes).values(
+            'solicitud_id', 'solicitud__fecha_solicitud', 'material_id', 'cantidad'
+        ):
+            externas[(fila['solicitud__fecha_solicitud'], fila['solicitud_id'])].append(fila)
+        orden = [((s.fecha_solicitud, s.pk), s) for s in solicitudes]
+        orden += [(clave, None) for clave in externas]
+        orden.sort(key=lambda item: item[0])
+
+        comprometido = defaultdict(int)
+
+        def libre(material_id):
+            return restante.get(material_id, 0) - comprometido[material_id]
+
+        aprobadas = []
+        for clave, solicitud in orden:
+            if solicitud is None:
+                for fila in externas[clave]:
+                    comprometido[fila['material_id']] += fila['cantidad']
+                continue
+            detalles = detalles_por_solicitud[solicitud.pk]
+            faltante = next((d for d in detalles if libre(d.material_id) < d.cantidad), None)
+            if faltante:
+                resultados.append((
+                    solicitud.pk, False,
+                    f'Stock insuficiente: {faltante.material.descripcion} '
+                    f'(Disp: {max(libre(faltante.material_id), 0)})'
+                ))
+                # Sigue pendiente: su reserva se respeta para las siguientes
+                for d in detalles:
+                    comprometido[d.material_id] += d.cantidad
+                continue
+            for d in detalles:
+                restante[d.material_id] -= d.cantidad
+            aprobadas.append(solicitud)
+            resultados.append((solicitud.pk, True, 'Aprobada'))
+
+        if not aprobadas:
+            return resultados
+
+        ahora = timezone.now()
+        liberadas = stock_service.sumar_por_material(
+            d for solicitud in aprobadas for d in detalles_por_solicitud[solicitud.pk]
+        )
+        modificados = [inv for material_id, inv in inventarios.items() if inv.stock_actual != restante[material_id]]
+        for inv in modificados:
+            inv.stock_actual = restante[inv.material_id]
+            inv.stock_reservado -= liberadas[inv.material_id]
+            inv.version += 1
+            inv.fecha_actualizacion = ahora
+        Inventario.objects.bulk_update(
+            modificados, ['stock_actual', 'stock_reservado', 'version', 'fecha_actualizacion'], batch_size=500
+        )
+
+        Movimiento.objects.bulk_create([
+            Movimiento(
+                material=d.material,
+                usuario=usuario,
+                solicitud=solicitud,
+                tipo='salida',
+                cantidad=d.cantidad,
+                variacion=-d.cantidad,
+                detalle=f'Aprobación solicitud #{solicitud.pk}',
+                fecha=ahora,
+            )
+            for solicitud in aprobadas
+            for d in detalles_por_solicitud[solicitud.pk]
+        ], batch_size=1000)
+
+        Solicitud.objects.filter(pk__in=[s.pk for s in aprobadas]).update(
+            estado='aprobada',
+            respondido_por=usuario,
+            fecha_respuesta=ahora,
+            fecha_actualizacion=ahora,
+        )
+        DetalleSolicitud.objects.filter(solicitud__in=aprobadas).update(cantidad_aprobada=F('cantidad'))
+
+        materiales = {
+            d.material_id: d.material for detalles in detalles_por_solicitud.values() for d in detalles
+        }
+        for inv in modificados:
+            inv.material = materiales[inv.material_id]
+        stock_service.alertar_criticos(modificados)
+
+        notificar_lote([
+            (s.solicitante_id, 'solicitud_aprobada', f'Tu solicitud #{s.pk} ha sido APROBADA', f'/solicitud/{s.pk}/')
+            for s in aprobadas
+        ])
+
+    logger.info(f"Aprobación en lote: {len(aprobadas)} de {len(solicitud_ids)} solicitudes")
+    return resultados
+
+
+def rechazar(solicitud, usuario, observaciones):
+    """
+    Rechaza la solicitud, libera su reserva y notifica al técnico.
+    Lanza SolicitudNoPendiente si otro usuario ya la respondió.
+    """
+    with transaction.atomic():
+        ahora = timezone.now()
+        tomadas = Solicitud.objects.filter(pk=solicitud.pk, estado='pendiente').update(
+            estado='rechazada',
+            respondido_por=usuario,
+            fecha_respuesta=ahora,
+            fecha_actualizacion=ahora,
+            observaciones=observaciones,
+        )
+        if not tomadas:
+            raise SolicitudNoPendiente(f"La solicitud #{solicitud.pk} ya fue respondida")
+
+        stock_service.liberar(stock_service.sumar_por_material(solicitud.detalles.all()))
+
+        notificar_usuario(
+            solicitud.solicitante,
+            tipo='solicitud_rechazada',
+            mensaje=f'Tu solicitud #{solicitud.pk} ha sido rechazada. Motivo: {observaciones[:100]}',
+            url=f'/solicitud/{solicitud.pk}/'
+        )
+
+    solicitud.estado = 'rechazada'
+    solicitud.respondido_por = usuario
+    solicitud.fecha_respuesta = ahora
+    solicitud.observaciones = observaciones
+    return solicitud
+
+
+def cancelar(solicitud):
+    """
+    Elimina una solicitud pendiente y libera su reserva.
+    Lanza SolicitudNoPendiente si ya fue respondida.
+    """
+    with transaction.atomic():
+        bloqueada = Solicitud.objects.select_for_update().filter(
+            pk=solicitud.pk, estado='pendiente'
+        ).first()
+        if bloqueada is None:
+            raise SolicitudNoPendiente(f"La solicitud #{solicitud.pk} ya fue respondida")
+
+        stock_service.liberar(stock_service.sumar_por_material(bloqueada.detalles.all()))
+        bloqueada.delete()
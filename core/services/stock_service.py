@@ -0,0 +1,319 @@
+"""
+Cambios de stock con UPDATE condicional.
+
+En vez de leer stock_actual, modificarlo en Python y llamar save() (que pierde
+actualizaciones cuando dos bodegueros operan a la vez y reescribe todas las
+columnas), cada cambio es un único UPDATE atómico:
+
+    UPDATE inventario SET stock_actual = stock_actual - n
+    WHERE material_id = X AND stock_actual >= n
+
+y el éxito se determina por la cantidad de filas afectadas. update() no
+dispara post_save, así que la alerta de stock crítico se evalúa aquí.
+
+stock_reservado se mantiene igual, de forma incremental: se suma al crear
+una solicitud y se resta cuando sale de 'pendiente' (aprobada, rechazada o
+cancelada), así el disponible para comprometer es una lectura de columna.
+Las salidas manuales solo pueden usar stock_actual - stock_reservado, y una
+aprobación no puede tomar lo que reservaron solicitudes pendientes más
+antiguas (reservado_anterior).
+
+Todo cambio de stock_actual incrementa Inventario.version. Las ediciones
+interactivas (ajustar) envían la versión que vio el usuario y solo se
+aplican si sigue vigente, sin bloquear la fila mientras el usuario piensa.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from core.models import DetalleSolicitud, Inventario, Material, Movimiento
+from core.services.notificaciones_service import notificar_bodega_lote, materiales_notificados
+
+logger = logging.getLogger(__name__)
+
+
+class StockInsuficiente(Exception):
+    def __init__(self, material_id, solicitado, disponible):
+        self.material_id = material_id
+        self.solicitado = solicitado
+        self.disponible = disponible
+        super().__init__(
+            f"Stock insuficiente para material {material_id}: "
+            f"solicitado {solicitado}, disponible {disponible}"
+        )
+
+
+class ConflictoVersion(Exception):
+    """El inventario cambió desde que se cargó el formulario. Lleva el inventario vigente."""
+    def __init__(self, inventario):
+        self.inventario = inventario
+        super().__init__(
+            f"Inventario de material {inventario.material_id} modificado "
+            f"(stock {inventario.stock_actual}, versión {inventario.version})"
+        )
+
+
+def descontar(material_id, cantidad):
+    """
+    Descuenta `cantidad` solo si alcanza el stock no reservado. Retorna el
+    stock resultante o lanza StockInsuficiente (sin modificar nada).
+    """
+    filas = Inventario.objects.filter(
+        material_id=material_id, stock_actual__gte=F('stock_reservado') + cantidad
+    ).update(
+        stock_actual=F('stock_actual') - cantidad,
+        version=F('version') + 1,
+        fecha_actualizacion=timezone.now(),
+    )
+    if not filas:
+        inventario = Inventario.objects.filter(material_id=material_id).first()
+        raise StockInsuficiente(material_id, cantidad, inventario.stock_disponible if inventario else None)
+    return _tras_cambio(material_id)
+
+
+def agregar(material_id, cantidad):
+    """Suma `cantidad` al stock. Retorna el stock resultante."""
+    filas = Inventario.objects.filter(material_id=material_id).update(
+        stock_actual=F('stock_actual') + cantidad,
+        version=F('version') + 1,
+        fecha_actualizacion=timezone.now(),
+    )
+    if not filas:
+        raise Inventario.DoesNotExist(f"Material {material_id} sin inventario")
+    return _tras_cambio(material_id)
+
+
+def ajustar(material_id, nuevo_stock, version):
+    """
+    Fija stock_actual en nuevo_stock solo si el inventario sigue en
+    `version` (la que tenía el formulario). Retorna el stock anterior o
+    lanza ConflictoVersion con el inventario vigente.
+    """
+    inventario = Inventario.objects.get(material_id=material_id)
+    if inventario.version == version:
+        filas = Inventario.objects.filter(material_id=material_id, version=version).update(
+            stock_actual=nuevo_stock,
+            version=F('version') + 1,
+            fecha_actualizacion=timezone.now(),
+        )
+        if filas:
+            _tras_cambio(material_id)
+            return inventario.stock_actual
+        inventario.refresh_from_db()
+    raise ConflictoVersion(inventario)
+
+
+def bloquear_inventarios(material_ids):
+    """
+    SELECT ... FOR UPDATE de los inventarios, ordenado por material_id:
+    todos los flujos bloquean en el mismo orden y no hay deadlocks.
+    Retorna {material_id: Inventario}.
+    """
+    return {
+        inv.material_id: inv
+        for inv in Inventario.objects.select_for_update()
+        .filter(material_id__in=material_ids)
+        .order_by('material_id')
+    }
+
+
+def reservado_anterior(solicitud, material_ids):
+    """
+    {material_id: cantidad} reservada por las solicitudes pendientes
+    anteriores a `solicitud` (fecha_solicitud, pk). Tienen prioridad sobre
+    el stock: una solicitud no puede tomar lo que reservó una más antigua.
+    """
+    anteriores = Q(solicitud__fecha_solicitud__lt=solicitud.fecha_solicitud) | Q(
+        solicitud__fecha_solicitud=solicitud.fecha_solicitud, solicitud_id__lt=solicitud.pk
+    )
+    return dict(
+        DetalleSolicitud.objects.filter(anteriores, material_id__in=material_ids, solicitud__estado='pendiente')
+        .values('material_id').annotate(total=Sum('cantidad')).order_by()
+        .values_list('material_id', 'total')
+    )
+
+
+def descontar_lote(cantidades, solicitud=None):
+    """
+    Descuenta varias líneas a la vez. cantidades: {material_id: cantidad}.
+
+    Bloquea todos los inventarios con un único SELECT ... FOR UPDATE
+    ordenado por material_id (orden global: dos aprobaciones concurrentes
+    no pueden bloquearse mutuamente), valida todo y aplica con un solo
+    bulk_update. Debe llamarse dentro de transaction.atomic().
+    Con `solicitud` las cantidades son las que reservó esa solicitud
+    pendiente: se liberan de stock_reservado y solo se descuenta el stock
+    que no reservaron solicitudes anteriores. Sin ella se respeta todo lo
+    reservado.
+    Lanza StockInsuficiente con la primera línea que no alcanza.
+    Retorna los inventarios actualizados.
+    """
+    bloqueados = bloquear_inventarios(cantidades)
+    inventarios = list(bloqueados.values())
+    previo = reservado_anterior(solicitud, cantidades) if solicitud is not None else None
+
+    for material_id in sorted(cantidades):
+        if material_id not in bloqueados:
+            raise StockInsuficiente(material_id, cantidades[material_id], 0)
+    for inv in inventarios:
+        if previo is None:
+            disponible = inv.stock_disponible
+        else:
+            disponible = inv.stock_actual - previo.get(inv.material_id, 0)
+        if disponible < cantidades[inv.material_id]:
+            raise StockInsuficiente(inv.material_id, cantidades[inv.material_id], max(disponible, 0))
+
+    ahora = timezone.now()
+    campos = ['stock_actual', 'version', 'fecha_actualizacion']
+    for inv in inventarios:
+        inv.stock_actual -= cantidades[inv.material_id]
+        inv.version += 1
+        inv.fecha_actualizacion = ahora
+        if solicitud is not None:
+            inv.stock_reservado -= cantidades[inv.material_id]
+    if solicitud is not None:
+        campos.append('stock_reservado')
+    Inventario.objects.bulk_update(inventarios, campos)
+    return inventarios
+
+
+def registrar_movimientos_lote(lineas, usuario, detalle=''):
+    """
+    Registra muchas entradas y salidas en una transacción.
+    lineas: [(material_id, tipo, cantidad)] con tipo 'entrada' o 'salida'.
+
+    Un bloqueo ordenado de los inventarios, validación con el neto por
+    material, un bulk_update, un bulk_create de movimientos y una sola
+    evaluación de stock crítico. Lanza StockInsuficiente (sin aplicar nada)
+    si las salidas de un material superan su stock no reservado más sus
+    entradas.
+    Retorna {material_id: stock resultante}.
+    """
+    entradas, salidas = defaultdict(int), defaultdict(int)
+    for material_id, tipo, cantidad in lineas:
+        (entradas if tipo == 'entrada' else salidas)[material_id] += cantidad
+    material_ids = set(entradas) | set(salidas)
+
+    with transaction.atomic():
+        bloqueados = bloquear_inventarios(material_ids)
+        for material_id in sorted(material_ids):
+            inv = bloqueados.get(material_id)
+            if inv is None:
+                raise Inventario.DoesNotExist(f"Material {material_id} sin inventario")
+            disponible = inv.stock_disponible + entradas[material_id]
+            if salidas[material_id] and salidas[material_id] > disponible:
+                raise StockInsuficiente(material_id, salidas[material_id], max(disponible, 0))
+
+        ahora = timezone.now()
+        modificados = []
+        for material_id, inv in bloqueados.items():
+            neto = entradas[material_id] - salidas[material_id]
+            if neto:
+                inv.stock_actual += neto
+                inv.version += 1
+                inv.fecha_actualizacion = ahora
+                modificados.append(inv)
+        Inventario.objects.bulk_update(
+            modificados, ['stock_actual', 'version', 'fecha_actualizacion'], batch_size=500
+        )
+
+        Movimiento.objects.bulk_create([
+            Movimiento(
+                material_id=material_id,
+                usuario=usuario,
+                tipo=tipo,
+                cantidad=cantidad,
+                variacion=cantidad if tipo == 'entrada' else -cantidad,
+                detalle=detalle,
+                fecha=ahora,
+            )
+            for material_id, tipo, cantidad in lineas
+        ], batch_size=1000)
+
+        alertar_criticos([inv for inv in modificados if salidas[inv.material_id]])
+
+    return {material_id: inv.stock_actual for material_id, inv in bloqueados.items()}
+
+
+# ==================== RESERVAS ====================
+
+def sumar_por_material(detalles):
+    """{material_id: cantidad total} de líneas de solicitud."""
+    cantidades = defaultdict(int)
+    for detalle in detalles:
+        cantidades[detalle.material_id] += detalle.cantidad
+    return dict(cantidades)
+
+
+def _mover_reserva(cantidades, signo):
+    # Un solo UPDATE con CASE para todas las líneas de la solicitud
+    if not cantidades:
+        return
+    Inventario.objects.filter(material_id__in=cantidades).update(
+        stock_reservado=F('stock_reservado') + Case(
+            *[When(material_id=material_id, then=Value(signo * cantidad))
+              for material_id, cantidad in sorted(cantidades.items())],
+            default=Value(0),
+        )
+    )
+
+
+def reservar(cantidades):
+    """Suma a stock_reservado lo pedido por una solicitud nueva. cantidades: {material_id: cantidad}."""
+    _mover_reserva(cantidades, 1)
+
+
+def liberar(cantidades):
+    """Resta de stock_reservado lo de una solicitud rechazada o cancelada."""
+    _mover_reserva(cantidades, -1)
+
+
+def _tras_cambio(material_id):
+    inventario = Inventario.objects.select_related('material').get(material_id=material_id)
+    alertar_si_critico(inventario)
+    return inventario.stock_actual
+
+
+# ==================== ALERTA DE STOCK CRÍTICO ====================
+
+def alertar_si_critico(inventario):
+    """Notifica a bodega si el inventario quedó en o bajo el stock de seguridad."""
+    alertar_criticos([inventario])
+
+
+def alertar_criticos(inventarios):
+    """
+    Evalúa varios inventarios de una vez: los que quedaron en o bajo el
+    stock de seguridad y no se notificaron en las últimas 24h generan una
+    alerta para bodega (consultas constantes, sin importar cuántos sean).
+    """
+    criticos = [inv for inv in inventarios if inv.stock_actual <= inv.stock_seguridad]
+    if not criticos:
+        return
+
+    # Evitar duplicar notificaciones para un material en menos de 24h
+    hace_24h = timezone.now() - timedelta(hours=24)
+    ids = [inv.material_id for inv in criticos]
+    avisados = materiales_notificados("stock_critico", ids, hace_24h)
+    criticos = [inv for inv in criticos if inv.material_id not in avisados]
+    if not criticos:
+        return
+
+    sin_material = [inv.material_id for inv in criticos if not Inventario.material.is_cached(inv)]
+    materiales = Material.objects.in_bulk(sin_material) if sin_material else {}
+
+    # Todos los encargados de bodega activos
+    filas = []
+    for inv in criticos:
+        material = materiales.get(inv.material_id) or inv.material
+        filas.append((
+            "stock_critico",
+            f"Stock crítico: {material.descripcion} ({material.codigo}) - Stock: {inv.stock_actual}",
+            f"/material/{material.id}/",
+            material.id,
+        ))
+    notificar_bodega_lote(filas)
@@ -1,48 +1,16 @@
-from datetime import timedelta
-
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.utils import timezone
 
-from .models import Inventario, Movimiento, Usuario, Notificacion, Material
+from .models import Inventario, Movimiento, Usuario, Material
+from .services.notificaciones_service import notificar_bodega
+from .services.stock_service import alertar_si_critico
 
 
 # ------------------ STOCK CRÍTICO ------------------ #
 @receiver(post_save, sender=Inventario)
 def verificar_stock_critico(sender, instance, **kwargs):
-   
-    if instance.stock_actual > instance.stock_seguridad:
-        return
-
-    material = instance.material
-
-    # Evitar duplicar notificaciones para este material en menos de 24h
-    hace_24h = timezone.now() - timedelta(hours=24)
-    notificaciones_recientes = Notificacion.objects.filter(
-        tipo="stock_critico",
-        mensaje__contains=material.codigo,
-        creada_en__gte=hace_24h,
-    ).count()
-
-    if notificaciones_recientes > 0:
-        return
-
-    # Todos los encargados de bodega activos
-    encargados_bodega = Usuario.objects.filter(
-        rol="BODEGA",
-        is_active=True,
-    )
-
-    for usuario in encargados_bodega:
-        Notificacion.objects.create(
-            usuario=usuario,
-            tipo="stock_critico",
-            mensaje=(
-                f"Stock crítico: {material.descripcion} "
-                f"({material.codigo}) - Stock: {instance.stock_actual}"
-            ),
-            url=f"/material/{material.id}/",
-        )
+    # Los cambios por UPDATE condicional (stock_service) no pasan por aquí
+    alertar_si_critico(instance)
 
 
 # ------------------ MATERIAL NUEVO ------------------ #
@@ -52,19 +20,13 @@ def notificar_material_nuevo(sender, instance, created, **kwargs):
     if not created:
         return
 
-    encargados_bodega = Usuario.objects.filter(
-        rol="BODEGA",
-        is_active=True,
+    notificar_bodega(
+        tipo="material_nuevo",
+        mensaje=f"Nuevo material creado: {instance.descripcion} ({instance.codigo})",
+        url=f"/material/{instance.id}/",
+        material=instance,
     )
 
-    for usuario in encargados_bodega:
-        Notificacion.objects.create(
-            usuario=usuario,
-            tipo="material_nuevo",
-            mensaje=f"Nuevo material creado: {instance.descripcion} ({instance.codigo})",
-            url=f"/material/{instance.id}/",
-        )
-
 
 # ------------------ INGRESO INICIAL INVENTARIO ------------------ #
 @receiver(post_save, sender=Inventario)
@@ -1,3 +1,387 @@
-from django.test import TestCase
+import os
+import subprocess
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+
+from .models import (
+    DetalleSolicitud, EjecucionTarea, Inventario, InventarioDiario, Local, Material, MLResult, Movimiento,
+    Notificacion, Solicitud, TareaProgramada, Usuario,
+)
+from .services import (
+    asignacion_service, cobertura_service, exportacion_parquet, historico_service, notificaciones_service, scheduler_service,
+    solicitudes_service, stock_service,
+)
+from .services.cron import ExpresionCron
+
+
+class InventarioDiarioTests(TestCase):
+
+    def setUp(self):
+        self.material = Material.objects.create(codigo='T001', descripcion='Material de prueba')
+        self.inventario = Inventario.objects.create(material=self.material, stock_actual=10, stock_seguridad=2)
+
+    def test_registrar_dos_veces_el_mismo_dia_sobrescribe(self):
+        dia = timezone.localdate()
+        historico_service.registrar_inventario_diario(dia)
+
+        Inventario.objects.filter(pk=self.inventario.pk).update(stock_actual=4, stock_seguridad=3)
+        historico_service.registrar_inventario_diario(dia)
+
+        fila = InventarioDiario.objects.get(material=self.material, dia=dia)
+        self.assertEqual(fila.stock_actual, 4)
+        self.assertEqual(fila.stock_seguridad, 3)
+        self.assertEqual(InventarioDiario.objects.filter(material=self.material).count(), 1)
+
+    def test_dia_ya_terminado_registra_el_cierre_y_no_el_stock_actual(self):
+        ayer = timezone.localdate() - timedelta(days=1)
+        Movimiento.objects.filter(material=self.material).update(fecha=timezone.now() - timedelta(days=3))
+        usuario = Usuario.objects.create(rut='66666666-6', username='66666666-6', rol='BODEGA')
+        stock_service.registrar_movimientos_lote([(self.material.pk, 'salida', 3)], usuario)
+
+        historico_service.registrar_inventario_diario(ayer)
+
+        self.assertEqual(InventarioDiario.objects.get(material=self.material, dia=ayer).stock_actual, 10)
+
+
+class ExportacionParquetTests(TestCase):
+
+    def test_desde_a_mitad_de_mes_reescribe_el_mes_completo(self):
+        import pyarrow.parquet as pq
+
+        usuario = Usuario.objects.create(rut='77777777-7', username='77777777-7', rol='BODEGA')
+        material = Material.objects.create(codigo='T007', descripcion='Material exportado')
+        for dia in (2, 20):
+            movimiento = Movimiento.objects.create(material=material, usuario=usuario, tipo='entrada', cantidad=1)
+            Movimiento.objects.filter(pk=movimiento.pk).update(
+                fecha=timezone.make_aware(datetime(2025, 3, dia, 12))
+            )
+
+        with tempfile.TemporaryDirectory() as destino:
+            exportacion_parquet.exportar_dataset_particionado('movimientos', destino, desde=date(2025, 3, 15))
+
+            archivo = os.path.join(destino, 'movimientos', 'anio=2025', 'mes=3', 'part-0.parquet')
+            self.assertEqual(pq.read_table(archivo).num_rows, 2)
+
+
+class CoberturaTests(TestCase):
+
+    def test_orden_por_urgencia_deja_sin_demanda_al_final(self):
+        inventarios = {}
+        for codigo, stock, demanda in (('T008', 50, 10), ('T009', 5, None), ('T010', 10, 10)):
+            material = Material.objects.create(codigo=codigo, descripcion=codigo)
+            inventarios[codigo] = Inventario.objects.create(material=material, stock_actual=stock)
+            if demanda:
+                MLResult.objects.create(
+                    material=material, demanda_promedio=demanda, desviacion=0, leadtime_dias=1,
+                    stock_min_calculado=0,
+                )
+
+        cobertura_service.calcular_cobertura_global()
+
+        orden = list(
+            Inventario.objects.filter(pk__in=[i.pk for i in inventarios.values()])
+            .order_by('sin_demanda', 'dias_cobertura', 'material_id')
+            .values_list('material__codigo', 'sin_demanda')
+        )
+        self.assertEqual(orden, [('T010', False), ('T008', False), ('T009', True)])
+
+
+class AsignacionPrioridadLocalTests(TestCase):
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create(rut='11111111-1', username='11111111-1', rol='GERENCIA')
+        self.material = Material.objects.create(codigo='T002', descripcion='Material de prueba')
+        Inventario.objects.create(material=self.material, stock_actual=5)
+        self.local = Local.objects.create(
+            codigo='L1', nombre='Local 1', direccion='Calle 1', comuna='Santiago',
+            region='Metropolitana', prioridad=1,
+        )
+
+    def _solicitud(self, local, antiguedad):
+        solicitud = Solicitud.objects.create(
+            local_destino=local, solicitante=self.usuario, motivo='Prueba',
+            fecha_solicitud=timezone.now() - timedelta(days=antiguedad),
+        )
+        DetalleSolicitud.objects.create(solicitud=solicitud, material=self.material, cantidad=5)
+        return solicitud
+
+    def test_solicitud_sin_local_va_al_final(self):
+        sin_local = self._solicitud(None, antiguedad=2)
+        con_local = self._solicitud(self.local, antiguedad=1)
+
+        plan = asignacion_service.asignar_stock(self.usuario, 'prioridad_local', simular=True)
+
+        estados = {solicitud_id: estado for solicitud_id, estado, _, _ in plan}
+        self.assertEqual(estados[con_local.pk], 'aprobada')
+        self.assertEqual(estados[sin_local.pk], 'pendiente')
+
+
+class ExpresionCronTests(SimpleTestCase):
+
+    def test_valor_con_paso_llega_hasta_el_maximo(self):
+        self.assertEqual(ExpresionCron('5/10 * * * *').minutos, {5, 15, 25, 35, 45, 55})
+
+    def test_paso_vacio_es_invalido(self):
+        with self.assertRaises(ValueError):
+            ExpresionCron('5/ * * * *')
+
+
+class EjecutarTareaTests(TestCase):
+
+    def setUp(self):
+        self.tarea = TareaProgramada.objects.create(nombre='Prueba', comando='check', cron='* * * * *')
+
+    def test_interrupcion_registra_la_ejecucion_y_reprograma(self):
+        with mock.patch.object(scheduler_service.subprocess, 'run', side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt), self.assertLogs(scheduler_service.logger, 'ERROR'):
+                scheduler_service.ejecutar_tarea(self.tarea)
+
+        self.tarea.refresh_from_db()
+        self.assertFalse(self.tarea.en_ejecucion)
+        self.assertFalse(self.tarea.ultimo_exito)
+        self.assertIsNotNone(self.tarea.proxima_ejecucion)
+        ejecucion = EjecucionTarea.objects.get(tarea=self.tarea)
+        self.assertFalse(ejecucion.exito)
+        self.assertIn('interrumpida', ejecucion.error)
+
+    def test_el_proceso_recibe_la_hora_programada(self):
+        programada = timezone.now() - timedelta(minutes=30)
+        self.tarea.proxima_ejecucion = programada
+        completado = subprocess.CompletedProcess([], 0, stdout='', stderr='')
+
+        with mock.patch.object(scheduler_service.subprocess, 'run', return_value=completado) as run:
+            scheduler_service.ejecutar_tarea(self.tarea)
+
+        entorno = run.call_args.kwargs['env']
+        self.assertEqual(
+            entorno[scheduler_service.VARIABLE_PROGRAMADA], timezone.localtime(programada).isoformat()
+        )
+
+    def test_tiempo_maximo_excedido_queda_como_fallida(self):
+        vencida = subprocess.TimeoutExpired(cmd='check', timeout=1, output=b'parcial')
+        with mock.patch.object(scheduler_service.subprocess, 'run', side_effect=vencida):
+            with self.assertLogs(scheduler_service.logger, 'ERROR'):
+                ejecucion = scheduler_service.ejecutar_tarea(self.tarea)
+
+        self.assertFalse(ejecucion.exito)
+        self.assertIn('Tiempo máximo', ejecucion.error)
+        self.assertEqual(ejecucion.salida, 'parcial')
+
+    def test_conserva_solo_las_ultimas_ejecuciones(self):
+        ahora = timezone.now()
+        EjecucionTarea.objects.bulk_create([
+            EjecucionTarea(tarea=self.tarea, inicio=ahora, fin=ahora, duracion=0, exito=True)
+            for _ in range(scheduler_service.MAX_EJECUCIONES_POR_TAREA + 5)
+        ])
+        terminado = subprocess.CompletedProcess(args=[], returncode=0, stdout='ok', stderr='')
+        with mock.patch.object(scheduler_service.subprocess, 'run', return_value=terminado):
+            ultima = scheduler_service.ejecutar_tarea(self.tarea)
+
+        ejecuciones = EjecucionTarea.objects.filter(tarea=self.tarea)
+        self.assertEqual(ejecuciones.count(), scheduler_service.MAX_EJECUCIONES_POR_TAREA)
+        self.assertTrue(ejecuciones.filter(pk=ultima.pk).exists())
+
+
+class NavbarNotificacionesTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = Usuario.objects.create(rut='22222222-2', username='22222222-2', rol='BODEGA')
+
+    def test_cache_vigente_no_consulta_notificaciones(self):
+        notificaciones_service.notificar([self.usuario.pk], 'material_nuevo', 'Uno')
+        notificaciones_service.datos_navbar(self.usuario)
+
+        with self.assertNumQueries(1):
+            datos = notificaciones_service.datos_navbar(self.usuario)
+        self.assertEqual(datos['count'], 1)
+
+    def test_escritura_cambia_la_clave(self):
+        notificaciones_service.notificar([self.usuario.pk], 'material_nuevo', 'Uno')
+        self.assertEqual(notificaciones_service.datos_navbar(self.usuario)['count'], 1)
+
+        notificaciones_service.notificar([self.usuario.pk], 'material_nuevo', 'Dos')
+        self.assertEqual(notificaciones_service.datos_navbar(self.usuario)['count'], 2)
+
+        notificaciones_service.marcar_todas_leidas(self.usuario)
+        datos = notificaciones_service.datos_navbar(self.usuario)
+        self.assertEqual(datos['count'], 0)
+        self.assertEqual(datos['notificaciones'], [])
+
+
+class EtagNotificacionesTests(TestCase):
+
+    def test_etag_cambia_con_las_no_leidas_y_usa_una_consulta(self):
+        usuario = Usuario.objects.create(rut='33333333-3', username='33333333-3', rol='BODEGA')
+        with self.assertNumQueries(1):
+            inicial = notificaciones_service.etag_dropdown(usuario)
+
+        notificacion = notificaciones_service.notificar([usuario.pk], 'material_nuevo', 'Uno')[0]
+        creada = notificaciones_service.etag_dropdown(usuario)
+        self.assertNotEqual(creada, inicial)
+
+        notificaciones_service.marcar_leida(Notificacion.objects.get(pk=notificacion.pk))
+        self.assertNotIn(notificaciones_service.etag_dropdown(usuario), {inicial, creada})
+
+
+class StockServiceTests(TestCase):
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create(rut='55555555-5', username='55555555-5', rol='BODEGA')
+        self.material = Material.objects.create(codigo='T004', descripcion='Material A')
+        self.otro = Material.objects.create(codigo='T005', descripcion='Material B')
+        Inventario.objects.create(material=self.material, stock_actual=10)
+        Inventario.objects.create(material=self.otro, stock_actual=2)
+
+    def test_ajustar_con_version_vieja_lanza_conflicto(self):
+        version = Inventario.objects.get(material=self.material).version
+        stock_service.descontar(self.material.pk, 3)
+
+        with self.assertRaises(stock_service.ConflictoVersion) as error:
+            stock_service.ajustar(self.material.pk, 50, version)
+
+        self.assertEqual(error.exception.inventario.stock_actual, 7)
+        self.assertEqual(error.exception.inventario.version, version + 1)
+        self.assertEqual(Inventario.objects.get(material=self.material).stock_actual, 7)
+
+    def test_lote_con_stock_insuficiente_no_aplica_nada(self):
+        lineas = [
+            (self.material.pk, 'entrada', 5),
+            (self.material.pk, 'salida', 4),
+            (self.otro.pk, 'salida', 3),
+        ]
+        movimientos = Movimiento.objects.count()
+
+        with self.assertRaises(stock_service.StockInsuficiente) as error:
+            stock_service.registrar_movimientos_lote(lineas, self.usuario)
+
+        self.assertEqual(error.exception.material_id, self.otro.pk)
+        stocks = dict(
+            Inventario.objects.filter(material__in=[self.material, self.otro]).values_list('material_id', 'stock_actual')
+        )
+        self.assertEqual(stocks, {self.material.pk: 10, self.otro.pk: 2})
+        self.assertEqual(Movimiento.objects.count(), movimientos)
+
+
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+class DescuentoConcurrenteTests(TransactionTestCase):
+    """Descuentos simultáneos desde varios hilos (cada uno con su conexión); corre en MySQL."""
+
+    def test_descuentos_simultaneos_no_pierden_ni_sobregiran(self):
+        material = Material.objects.create(codigo='T006', descripcion='Material concurrente')
+        Inventario.objects.create(material=material, stock_actual=10)
+        hilos_totales = 15
+        barrera = threading.Barrier(hilos_totales)
+        resultados = []
+
+        def descontar():
+            try:
+                barrera.wait()
+                try:
+                    stock_service.descontar(material.pk, 1)
+                    resultados.append('ok')
+                except stock_service.StockInsuficiente:
+                    resultados.append('insuficiente')
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=descontar) for _ in range(hilos_totales)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        inventario = Inventario.objects.get(material=material)
+        self.assertEqual(resultados.count('ok'), 10)
+        self.assertEqual(resultados.count('insuficiente'), 5)
+        self.assertEqual((inventario.stock_actual, inventario.version), (0, 10))
+
+
+class ReservasTests(TestCase):
+    """Lo reservado por solicitudes pendientes no se puede tomar por otra vía."""
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create(rut='44444444-4', username='44444444-4', rol='BODEGA')
+        self.material = Material.objects.create(codigo='T003', descripcion='Material reservado')
+        Inventario.objects.create(material=self.material, stock_actual=10)
+
+    def _solicitud(self, cantidad, antiguedad):
+        solicitud = Solicitud.objects.create(
+            solicitante=self.usuario, motivo='Prueba',
+            fecha_solicitud=timezone.now() - timedelta(days=antiguedad),
+        )
+        DetalleSolicitud.objects.create(solicitud=solicitud, material=self.material, cantidad=cantidad)
+        stock_service.reservar({self.material.pk: cantidad})
+        return solicitud
+
+    def _inventario(self):
+        return Inventario.objects.get(material=self.material)
+
+    def test_solicitud_nueva_no_toma_lo_reservado_por_una_anterior(self):
+        self._solicitud(8, antiguedad=2)
+        nueva = self._solicitud(8, antiguedad=1)
+
+        with self.assertRaises(stock_service.StockInsuficiente):
+            solicitudes_service.aprobar(nueva, self.usuario)
+
+        inventario = self._inventario()
+        self.assertEqual((inventario.stock_actual, inventario.stock_reservado), (10, 16))
+        nueva.refresh_from_db()
+        self.assertEqual(nueva.estado, 'pendiente')
+
+    def test_la_mas_antigua_se_aprueba_aunque_haya_sobre_reserva(self):
+        antigua = self._solicitud(8, antiguedad=2)
+        self._solicitud(8, antiguedad=1)
+
+        solicitudes_service.aprobar(antigua, self.usuario)
+
+        inventario = self._inventario()
+        self.assertEqual((inventario.stock_actual, inventario.stock_reservado), (2, 8))
+
+    def test_aprobar_lote_respeta_pendientes_anteriores_fuera_del_lote(self):
+        self._solicitud(6, antiguedad=3)
+        nueva = self._solicitud(6, antiguedad=1)
+
+        resultados = solicitudes_service.aprobar_lote([nueva.pk], self.usuario)
+
+        self.assertEqual(resultados, [(nueva.pk, False, 'Stock insuficiente: Material reservado (Disp: 4)')])
+        self.assertEqual(self._inventario().stock_actual, 10)
+
+    def test_salida_en_lote_no_usa_stock_reservado(self):
+        self._solicitud(7, antiguedad=1)
+
+        with self.assertRaises(stock_service.StockInsuficiente) as error:
+            stock_service.registrar_movimientos_lote([(self.material.pk, 'salida', 4)], self.usuario)
+        self.assertEqual(error.exception.disponible, 3)
+
+        stock_service.registrar_movimientos_lote([(self.material.pk, 'salida', 3)], self.usuario)
+        self.assertEqual(self._inventario().stock_actual, 7)
+
+    def test_asignar_subconjunto_descuenta_reservas_de_no_seleccionadas(self):
+        self._solicitud(6, antiguedad=3)
+        nueva = self._solicitud(6, antiguedad=1)
+
+        plan = asignacion_service.asignar_stock(self.usuario, solicitud_ids=[nueva.pk], simular=True)
+
+        self.assertEqual(plan, [(nueva.pk, 'parcial', 4, 6)])
+
+    def test_aprobacion_parcial_deja_el_saldo_pendiente_y_reservado(self):
+        solicitud = self._solicitud(14, antiguedad=1)
+
+        asignacion_service.asignar_stock(self.usuario)
+
+        solicitud.refresh_from_db()
+        self.assertEqual(solicitud.estado, 'aprobada')
+        saldo = Solicitud.objects.get(solicitud_origen=solicitud)
+        self.assertEqual(saldo.estado, 'pendiente')
+        self.assertEqual(saldo.fecha_solicitud, solicitud.fecha_solicitud)
+        self.assertEqual([(d.material_id, d.cantidad) for d in saldo.detalles.all()], [(self.material.pk, 4)])
+        inventario = self._inventario()
+        self.assertEqual((inventario.stock_actual, inventario.stock_reservado), (0, 4))
@@ -37,6 +37,8 @@ urlpatterns = [
        
     # Administración de solicitudes
     path('solicitud/gestionar/', views.gestionar_solicitudes, name='gestionar_solicitudes'),
+    path('solicitud/aprobar-lote/', views.aprobar_solicitudes_lote, name='aprobar_solicitudes_lote'),
+    path('solicitud/asignar-stock/', views.asignar_stock_pendientes, name='asignar_stock_pendientes'),
     path('solicitud/<int:solicitud_id>/', views.detalle_solicitud, name='detalle_solicitud'),
     path('solicitud/<int:solicitud_id>/cancelar/', views.cancelar_solicitud, name='cancelar_solicitud'),
     path('solicitud/<int:solicitud_id>/aprobar/', views.aprobar_solicitud, name='aprobar_solicitud'),
@@ -48,9 +50,12 @@ urlpatterns = [
     # Movimientos
     path('material/<int:material_id>/entrada/', views.registrar_entrada, name='registrar_entrada'),
     path('material/<int:material_id>/salida/', views.registrar_salida, name='registrar_salida'),
+    path('movimientos/lote/', views.registrar_movimientos_lote, name='registrar_movimientos_lote'),
     path('material/<int:material_id>/ajustar/', views.ajustar_inventario, name='ajustar_inventario'),
     path('material/<int:material_id>/movimientos/', views.historial_movimientos, name='historial_movimientos'),
     path('movimientos/', views.historial_movimientos_global, name='historial_movimientos_global'),
+    path('api/material/<int:material_id>/stock/', views.stock_historico_json, name='stock_historico_json'),
+    path('api/material/<int:material_id>/historial-stock/', views.historial_stock_json, name='historial_stock_json'),
     
     #Notificaciones
     path('notificaciones/', views.mis_notificaciones, name='mis_notificaciones'),
@@ -59,6 +64,7 @@ urlpatterns = [
     path('notificaciones/marcar-todas/', views.marcar_todas_leidas, name='marcar_todas_leidas'),
     path('notificaciones/<int:id>/eliminar/', views.eliminar_notificacion, name='eliminar_notificacion'),
     path('api/notificaciones/', views.obtener_notificaciones_json, name='obtener_notificaciones_json'),
+    path('api/notificaciones/stream/', views.stream_notificaciones, name='stream_notificaciones'),
     
     # Exportación a Excel
     path('exportar/inventario/', views.exportar_inventario_excel, name='exportar_inventario_excel'),
@@ -66,6 +72,8 @@ urlpatterns = [
     path('exportar/movimientos/', views.exportar_movimientos_excel, name='exportar_movimientos_excel'),
     path('exportar/movimientos/<int:material_id>/', views.exportar_movimientos_excel, name='exportar_movimientos_excel'),
     path('exportar/reporte-completo/', views.exportar_reporte_completo_excel, name='exportar_reporte_completo'),
+    path('exportar/sugerencias-compra/', views.exportar_sugerencias_compra_excel, name='exportar_sugerencias_compra_excel'),
+    path('exportar/parquet/<str:dataset>/', views.exportar_parquet, name='exportar_parquet'),
     
     # Gestión de Locales
     path('locales/', views.gestion_locales, name='gestion_locales'),
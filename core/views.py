@@ -11,19 +11,34 @@ from django.utils import timezone
 from django.urls import reverse
 from django.core.paginator import Paginator
 from django.core.serializers.json import DjangoJSONEncoder
-from .models import Inventario, Material, Notificacion, Solicitud, DetalleSolicitud, Movimiento, Usuario, Alerta, MLResult, Local
+from django.utils.dateparse import parse_date, parse_datetime
+from .models import Inventario, Material, Notificacion, Solicitud, DetalleSolicitud, Movimiento, Usuario, Alerta, MLResult, Local, SugerenciaCompra
 from .forms import (MaterialForm, MaterialInventarioForm, SolicitudForm, FiltroSolicitudesForm, CambiarPasswordForm, 
                     DetalleSolicitudFormSet, EditarMaterialForm, LocalForm, CargaMasivaStockForm, UsuarioForm)
 from .decorators import verificar_rol
-from .services.ml_service import ejecutar_calculo_global
-from django.views.decorators.http import require_POST
+from .services.ml_service import ejecutar_calculo_global, ultimos_resultados_ml
+from .services.cobertura_service import calcular_cobertura_global
+from .services.reposicion_service import calcular_sugerencias_compra
+from .services import notificaciones_service
+from .services.notificaciones_service import notificar_bodega, notificar_usuario
+from .services.exportacion_parquet import DATASETS as DATASETS_PARQUET, exportar_dataset_archivo
+from .services.notificaciones_stream import difusor_notificaciones
+from .services import stock_service
+from .services.stock_service import StockInsuficiente, ConflictoVersion
+from .services import solicitudes_service
+from .services.solicitudes_service import SolicitudNoPendiente
+from .services.asignacion_service import asignar_stock, POLITICAS as POLITICAS_ASIGNACION
+from .services.historico_service import stock_en, stock_en_lote, serie_stock
+from django.views.decorators.http import require_POST, condition
 from django.http import JsonResponse
 from datetime import timedelta, datetime
-from django.http import HttpResponse
+from django.http import HttpResponse, FileResponse, Http404, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 from collections import defaultdict
+import tempfile
 
 
 
@@ -132,6 +147,11 @@ def inventario(request):
     except ValueError:
         items_por_pagina = 25
     
+    # Filtro "se quiebra en N días" (o "critico": ya bajo el stock de
+    # seguridad, enlace del digest de alertas) y orden por urgencia
+    quiebre_dias = request.GET.get('quiebre', '').strip()
+    orden = request.GET.get('orden', '')
+    
     inventario_lista = Inventario.objects.select_related('material').all()
     
     if query:
@@ -141,7 +161,20 @@ def inventario(request):
             Q(material__ubicacion__icontains=query)
         )
     
-    inventario_lista = inventario_lista.order_by('material__codigo')
+    if quiebre_dias == 'critico':
+        inventario_lista = inventario_lista.filter(stock_actual__lte=F('stock_seguridad'))
+    elif quiebre_dias.isdigit():
+        inventario_lista = inventario_lista.filter(
+            fecha_quiebre__lte=timezone.localdate() + timedelta(days=int(quiebre_dias))
+        )
+    else:
+        quiebre_dias = ''
+    
+    if orden == 'urgencia':
+        # Sin demanda al final; índice (sin_demanda, dias_cobertura, material)
+        inventario_lista = inventario_lista.order_by('sin_demanda', 'dias_cobertura', 'material_id')
+    else:
+        inventario_lista = inventario_lista.order_by('material__codigo')
     
     paginator = Paginator(inventario_lista, items_por_pagina)
     page_number = request.GET.get('page', 1)
@@ -160,6 +193,8 @@ def inventario(request):
         'total_items': paginator.count,
         'query': query,
         'items_por_pagina': items_por_pagina,
+        'quiebre_dias': quiebre_dias,
+        'orden': orden,
     }
     
     return render(request, 'funcionalidad/inv_inventario.html', context)
@@ -328,29 +363,34 @@ def carga_masiva_stock(request):
                             
                             inv, _ = Inventario.objects.get_or_create(material=material)
 
-                            # Lógica de Movimiento
+                            # Lógica de Movimiento (UPDATE condicional, sin pisar cambios concurrentes)
                             if modo == 'ajuste':
-                                diferencia = nuevo_stock - inv.stock_actual
-                                inv.stock_actual = nuevo_stock
+                                stock_anterior = stock_service.ajustar(material.id, nuevo_stock, inv.version)
+                                diferencia = nuevo_stock - stock_anterior
+                                stock_final = nuevo_stock
                                 tipo_mov = 'ajuste'
                                 detalle_mov = f"Carga Masiva: Ajuste a {nuevo_stock}"
                             else:  # entrada (sumar)
                                 diferencia = nuevo_stock
-                                inv.stock_actual += nuevo_stock
+                                stock_final = stock_service.agregar(material.id, nuevo_stock)
                                 tipo_mov = 'entrada'
                                 detalle_mov = f"Carga Masiva: +{nuevo_stock}"
 
-                            inv.save()
-
                             if diferencia != 0:
                                 Movimiento.objects.create(
                                     material=material, usuario=request.user,
-                                    tipo=tipo_mov, cantidad=abs(diferencia), detalle=detalle_mov
+                                    tipo=tipo_mov, cantidad=abs(diferencia), variacion=diferencia,
+                                    detalle=detalle_mov
                                 )
 
                             resultado['estado'] = 'success'
-                            resultado['mensaje'] = f"Stock actualizado a {inv.stock_actual}"
+                            resultado['mensaje'] = f"Stock actualizado a {stock_final}"
                             
+                        except ConflictoVersion as e:
+                            resultado['mensaje'] = (
+                                f"Modificado por otro usuario durante la carga "
+                                f"(stock actual: {e.inventario.stock_actual}). Vuelve a cargar la fila."
+                            )
                         except Material.DoesNotExist:
                             resultado['mensaje'] = "Código no existe en el sistema"
                         except (ValueError, TypeError):
@@ -462,6 +502,8 @@ def recalcular_stock_ml(request):
         dias_historial=dias_historial,
         nivel_servicio=nivel_servicio,
     )
+    calcular_cobertura_global()
+    calcular_sugerencias_compra()
 
     count = len(resultados) if resultados else 0
     
@@ -481,29 +523,40 @@ def recalcular_stock_ml(request):
 def prediccion_stock(request):
     total_materiales = Material.objects.count()
     
-    # Obtener TODOS los resultados ordenados por fecha (el más reciente primero)
-    todos_resultados = MLResult.objects.select_related('material', 'material__inventario').order_by('-fecha_calculo')
+    # Último resultado de cada material, ordenado por urgencia en la BD
+    resultados = ultimos_resultados_ml().filter(
+        material__inventario__isnull=False
+    ).select_related(
+        'material', 'material__inventario'
+    ).order_by(
+        'material__inventario__sin_demanda', 'material__inventario__dias_cobertura', 'material__codigo'
+    )
     
-    # Filtrar en Python para quedarnos solo con el último de cada material
-    # Usamos un dict para rastrear si ya procesamos ese material
-    resultados_unicos = {}
-    ultimo_parametro = None
-
-    for res in todos_resultados:
-        if res.material.codigo not in resultados_unicos:
-            resultados_unicos[res.material.codigo] = res
-            # Guardamos el primer resultado (el más reciente de todos) para sacar info de parámetros
-            if ultimo_parametro is None:
-                ultimo_parametro = res
+    quiebre_dias = request.GET.get('quiebre', '').strip()
+    if quiebre_dias.isdigit():
+        resultados = resultados.filter(
+            material__inventario__fecha_quiebre__lte=timezone.localdate() + timedelta(days=int(quiebre_dias))
+        )
+    else:
+        quiebre_dias = ''
+    
+    # El resultado más reciente de todos, para mostrar info de parámetros
+    ultimo_parametro = MLResult.objects.order_by('-fecha_calculo').first()
+    
+    # Resumen sobre todos los resultados, en la BD
+    en_riesgo = resultados.filter(
+        Q(material__inventario__stock_actual__lte=0)
+        | Q(material__inventario__stock_actual__lt=F('stock_min_calculado'))
+    ).count()
     
-    # Convertir a lista
-    resultados = list(resultados_unicos.values())
+    # Solo se arma (y se decodifica la serie de) la página que se muestra
+    paginator = Paginator(resultados, 50)
+    page_obj = paginator.get_page(request.GET.get('page', 1))
     
     # Procesar para la tabla
     tabla_resultados = []
-    en_riesgo = 0
     
-    for res in resultados:
+    for res in page_obj:
         try:
             inv = res.material.inventario
             stock_actual = inv.stock_actual
@@ -516,11 +569,9 @@ def prediccion_stock(request):
             if stock_actual <= 0:
                 estado = 'QUIEBRE'
                 clase_css = 'dark'
-                en_riesgo += 1
             elif stock_actual < stock_critico:
                 estado = 'CRÍTICO'
                 clase_css = 'danger'
-                en_riesgo += 1
             elif stock_actual < (stock_critico * 1.2):
                 estado = 'ALERTA'
                 clase_css = 'warning'
@@ -539,6 +590,10 @@ def prediccion_stock(request):
                 'coeficiente_variacion': getattr(res, 'coeficiente_variacion', 0),
                 'metodo': getattr(res, 'metodo_utilizado', ''),
                 'demanda_leadtime': res.stock_min_calculado - getattr(res, 'stock_seguridad', 0),
+                'dias_cobertura': inv.dias_cobertura,
+                'fecha_quiebre': inv.fecha_quiebre,
+                # La serie se decodifica recién cuando el template la dibuja
+                'resultado': res,
             })
         except Inventario.DoesNotExist:
             continue
@@ -550,14 +605,14 @@ def prediccion_stock(request):
         
     }
 
-    tabla_resultados.sort(key=lambda x: x['diferencia'])
-
     context = {
         'total_materiales': total_materiales,
-        'materiales_calculados': len(tabla_resultados),
+        'materiales_calculados': paginator.count,
         'total_en_riesgo': en_riesgo,
         'tabla_resultados': tabla_resultados,
-        'info_calculo': info_calculo
+        'page_obj': page_obj,
+        'info_calculo': info_calculo,
+        'quiebre_dias': quiebre_dias,
     }
     
     return render(request, 'funcionalidad/prediccion_stock.html', context)
@@ -582,14 +637,6 @@ def crear_solicitud(request):
                 and f.cleaned_data.get('material')
                 and f.cleaned_data.get('cantidad')
             ]
-            for f in formset:
-                if f.cleaned_data and not f.cleaned_data.get('DELETE', False):
-                    material = f.cleaned_data.get('material')
-                    cantidad = f.cleaned_data.get('cantidad')
-                    
-                    # Solo agregar si tiene AMBOS campos llenos
-                    if material and cantidad:
-                        detalles_validos.append(f)
             
             if len(detalles_validos) == 0:
                 messages.error(request, 'Debes solicitar al menos 1 material.')
@@ -626,22 +673,24 @@ def crear_solicitud(request):
                     solicitud.save()
                     
                     # GUARDAR: Solo los detalles válidos (con datos)
+                    detalles = []
                     for detalle_form in detalles_validos:
                         detalle = detalle_form.save(commit=False)
                         detalle.solicitud = solicitud
                         detalle.save()
+                        detalles.append(detalle)
+                    
+                    # Comprometer el stock mientras la solicitud esté pendiente
+                    stock_service.reservar(stock_service.sumar_por_material(detalles))
                     
                     cantidad_total = sum(d.cleaned_data.get('cantidad', 0) for d in detalles_validos)
                     
                     # Notificar a BODEGA
-                    usuarios_bodega = Usuario.objects.filter(rol='BODEGA')
-                    for bodeguero in usuarios_bodega:
-                        Notificacion.objects.create(
-                            usuario=bodeguero,
-                            tipo='solicitud_pendiente',
-                            mensaje=f'Nueva solicitud #{solicitud.id} de {request.user.get_full_name()} - {len(detalles_validos)} materiales ({cantidad_total} items)',
-                            url=f'/solicitud/{solicitud.id}/'
-                        )
+                    notificar_bodega(
+                        tipo='solicitud_pendiente',
+                        mensaje=f'Nueva solicitud #{solicitud.id} de {request.user.get_full_name()} - {len(detalles_validos)} materiales ({cantidad_total} items)',
+                        url=f'/solicitud/{solicitud.id}/'
+                    )
                     
                     messages.success(
                         request, 
@@ -769,7 +818,9 @@ def gestionar_solicitudes(request):
     """Vista para que BODEGA gestione todas las solicitudes"""
     solicitudes_pendientes = Solicitud.objects.filter(
         estado='pendiente'
-    ).prefetch_related('detalles__material').order_by('-fecha_solicitud')
+    ).select_related('solicitante', 'local_destino').prefetch_related(
+        'detalles__material'
+    ).order_by('fecha_solicitud')
     
     todas_solicitudes = Solicitud.objects.all().prefetch_related(
         'detalles__material'
@@ -778,6 +829,7 @@ def gestionar_solicitudes(request):
     context = {
         'solicitudes_pendientes': solicitudes_pendientes,
         'todas_solicitudes': todas_solicitudes,
+        'politicas_asignacion': POLITICAS_ASIGNACION,
     }
     
     return render(request, 'funcionalidad/solmat_gestionar.html', context)
@@ -786,7 +838,7 @@ def gestionar_solicitudes(request):
 def detalle_solicitud(request, solicitud_id):
     """Vista para ver el detalle completo de una solicitud"""
     solicitud = get_object_or_404(
-        Solicitud.objects.prefetch_related('detalles__material'),
+        Solicitud.objects.prefetch_related('detalles__material__inventario'),
         id=solicitud_id
     )
     
@@ -803,14 +855,26 @@ def detalle_solicitud(request, solicitud_id):
     detalles_info = []
     tiene_stock_suficiente = True
     
+    # Una pendiente solo compite con lo reservado por pendientes más antiguas
+    reservado_anterior = None
+    if solicitud.estado == 'pendiente':
+        reservado_anterior = stock_service.reservado_anterior(
+            solicitud, [d.material_id for d in solicitud.detalles.all()]
+        )
+    
     for detalle in solicitud.detalles.all():
         try:
             inventario = detalle.material.inventario
-            stock_disponible = inventario.stock_actual
+            if reservado_anterior is not None:
+                reservado = reservado_anterior.get(detalle.material_id, 0)
+            else:
+                reservado = inventario.stock_reservado
+            stock_disponible = inventario.stock_actual - reservado
             nuevo_stock = stock_disponible - detalle.cantidad
             if nuevo_stock < 0:
                 tiene_stock_suficiente = False
         except Inventario.DoesNotExist:
+            reservado = 0
             stock_disponible = 0
             nuevo_stock = 0
             tiene_stock_suficiente = False
@@ -818,6 +882,7 @@ def detalle_solicitud(request, solicitud_id):
         detalles_info.append({
             'detalle': detalle,
             'stock_disponible': stock_disponible,
+            'stock_reservado': reservado,
             'nuevo_stock': nuevo_stock
         })
     
@@ -844,49 +909,98 @@ def aprobar_solicitud(request, solicitud_id):
         return redirect('gestionar_solicitudes')
     
     if request.method == 'POST':
-        with transaction.atomic():
-            # VERIFICAR STOCK PRIMERO (separar verificación de descuento)
-            for detalle in solicitud.detalles.all():
-                inventario = detalle.material.inventario
-                if inventario.stock_actual < detalle.cantidad:
-                    messages.error(request, f'Stock insuficiente: {detalle.material.descripcion} (Disp: {inventario.stock_actual})')
-                    return redirect('detalle_solicitud', solicitud_id=solicitud.id)
-    
-            # DESCONTAR STOCK (segunda pasada)
-            for detalle in solicitud.detalles.all():
-                inventario = detalle.material.inventario
-                inventario.stock_actual -= detalle.cantidad
-                inventario.save()
-                # MOVIMIENTO
-                Movimiento.objects.create(
-                    material=detalle.material,
-                    usuario=request.user,
-                    solicitud=solicitud,
-                    tipo='salida',
-                    cantidad=detalle.cantidad,
-                    detalle=f'Aprobación solicitud #{solicitud.id}'
-                )
-            
-            # APROBAR FINAL
-            solicitud.estado = 'aprobada'
-            solicitud.respondido_por = request.user
-            solicitud.fecha_respuesta = timezone.now()
-            solicitud.save()
-            
-            # NOTIFICACIÓN
-            Notificacion.objects.create(
-                usuario=solicitud.solicitante,
-                tipo='solicitud_aprobada',
-                mensaje=f'Tu solicitud #{solicitud.id} ha sido APROBADA',
-                url=f'/solicitud/{solicitud.id}/'
-            )
-            messages.success(request, f'Solicitud #{solicitud.id} aprobada y stock descontado.')
+        try:
+            solicitudes_service.aprobar(solicitud, request.user)
+        except SolicitudNoPendiente:
+            messages.error(request, 'Solo solicitudes pendientes.')
+            return redirect('gestionar_solicitudes')
+        except StockInsuficiente as e:
+            detalle = solicitud.detalles.select_related('material').get(material_id=e.material_id)
+            messages.error(request, f'Stock insuficiente: {detalle.material.descripcion} (Disp: {e.disponible})')
+            return redirect('detalle_solicitud', solicitud_id=solicitud.id)
+        
+        messages.success(request, f'Solicitud #{solicitud.id} aprobada y stock descontado.')
         return redirect('gestionar_solicitudes')
     
     return redirect('detalle_solicitud', solicitud_id=solicitud.id)
 
 
 
+@login_required
+@verificar_rol('BODEGA')
+@require_POST
+def aprobar_solicitudes_lote(request):
+    """
+    Aprueba varias solicitudes pendientes en una sola operación.
+    Responde JSON con el resultado por solicitud si el cliente lo pide.
+    """
+    ids = [int(i) for i in request.POST.getlist('solicitudes') if i.isdigit()]
+    if not ids:
+        messages.error(request, 'Selecciona al menos una solicitud.')
+        return redirect('gestionar_solicitudes')
+    
+    resultados = solicitudes_service.aprobar_lote(ids, request.user)
+    
+    if 'application/json' in request.headers.get('Accept', ''):
+        return JsonResponse({
+            'resultados': [
+                {'solicitud': pk, 'aprobada': aprobada, 'mensaje': mensaje}
+                for pk, aprobada, mensaje in resultados
+            ]
+        })
+    
+    aprobadas = sum(1 for _, aprobada, _ in resultados if aprobada)
+    if aprobadas:
+        messages.success(request, f'✓ {aprobadas} solicitud{"es" if aprobadas != 1 else ""} aprobada{"s" if aprobadas != 1 else ""} y stock descontado.')
+    for pk, aprobada, mensaje in resultados:
+        if not aprobada:
+            messages.warning(request, f'Solicitud #{pk}: {mensaje}')
+    
+    return redirect('gestionar_solicitudes')
+
+
+@login_required
+@verificar_rol('BODEGA')
+@require_POST
+def asignar_stock_pendientes(request):
+    """
+    Reparte el stock disponible entre las solicitudes pendientes
+    (las seleccionadas o toda la cola) con aprobaciones parciales.
+    """
+    politica = request.POST.get('politica', 'fifo')
+    if politica not in POLITICAS_ASIGNACION:
+        messages.error(request, 'Política de asignación no válida.')
+        return redirect('gestionar_solicitudes')
+    
+    ids = [int(i) for i in request.POST.getlist('solicitudes') if i.isdigit()] or None
+    simular = 'simular' in request.POST
+    
+    resultados = asignar_stock(request.user, politica, solicitud_ids=ids, simular=simular)
+    
+    if 'application/json' in request.headers.get('Accept', ''):
+        return JsonResponse({
+            'simulacion': simular,
+            'resultados': [
+                {'solicitud': pk, 'estado': estado, 'asignado': asignado, 'solicitado': solicitado}
+                for pk, estado, asignado, solicitado in resultados
+            ]
+        })
+    
+    completas = sum(1 for r in resultados if r[1] == 'aprobada')
+    parciales = sum(1 for r in resultados if r[1] == 'parcial')
+    pendientes = sum(1 for r in resultados if r[1] == 'pendiente')
+    resumen = f'{completas} completas, {parciales} parciales, {pendientes} sin stock ({POLITICAS_ASIGNACION[politica]})'
+    if simular:
+        messages.info(request, f'Simulación: {resumen}')
+        for pk, estado, asignado, solicitado in resultados:
+            if estado == 'parcial':
+                messages.info(request, f'Solicitud #{pk}: {asignado} de {solicitado} unidades')
+    else:
+        messages.success(request, f'✓ Stock asignado: {resumen}')
+    
+    return redirect('gestionar_solicitudes')
+
+
 @login_required
 @verificar_rol(['BODEGA'])
 def rechazar_solicitud(request, solicitud_id):
@@ -909,20 +1023,12 @@ def rechazar_solicitud(request, solicitud_id):
             messages.error(request, 'La justificación debe tener al menos 10 caracteres.')
             return redirect('detalle_solicitud', solicitud_id=solicitud_id)
         
-        # Rechazar solicitud
-        solicitud.estado = 'rechazada'
-        solicitud.respondido_por = request.user
-        solicitud.fecha_respuesta = timezone.now()
-        solicitud.observaciones = observaciones
-        solicitud.save()
-        
-        # CREAR NOTIFICACIÓN PARA EL TÉCNICO
-        Notificacion.objects.create(
-            usuario=solicitud.solicitante,
-            tipo='solicitud_rechazada',
-            mensaje=f'Tu solicitud #{solicitud.id} ha sido rechazada. Motivo: {observaciones[:100]}',
-            url=f'/solicitud/{solicitud.id}/'
-        )
+        # Rechazar, liberar la reserva y notificar al técnico
+        try:
+            solicitudes_service.rechazar(solicitud, request.user, observaciones)
+        except SolicitudNoPendiente:
+            messages.error(request, 'Solo se pueden rechazar solicitudes pendientes.')
+            return redirect('detalle_solicitud', solicitud_id=solicitud_id)
         
         messages.warning(
             request, 
@@ -944,9 +1050,13 @@ def cancelar_solicitud(request, solicitud_id):
     solicitud = get_object_or_404(Solicitud, id=solicitud_id, solicitante=request.user)
     
     if solicitud.estado == 'pendiente' and request.method == 'POST':
-        solicitud.delete()
-        messages.info(request, 'Solicitud cancelada exitosamente.')
-        return redirect('mis_solicitudes')
+        try:
+            solicitudes_service.cancelar(solicitud)
+        except SolicitudNoPendiente:
+            pass
+        else:
+            messages.info(request, 'Solicitud cancelada exitosamente.')
+            return redirect('mis_solicitudes')
     
     messages.error(request, 'No se puede cancelar esta solicitud.')
     return redirect('detalle_solicitud', solicitud_id=solicitud_id)
@@ -1044,11 +1154,7 @@ def registrar_entrada(request, material_id):
         else:
             try:
                 with transaction.atomic():
-                    stock_anterior = inventario.stock_actual
-                    stock_nuevo = stock_anterior + cantidad
-                    
-                    inventario.stock_actual = stock_nuevo
-                    inventario.save()
+                    stock_nuevo = stock_service.agregar(material.id, cantidad)
                     
                     try:
                         usuario_movimiento = Usuario.objects.get(
@@ -1081,6 +1187,91 @@ def registrar_entrada(request, material_id):
     
     return render(request, 'funcionalidad/mov_registrar_entrada.html', context)
 
+MAX_LINEAS_LOTE = 200
+
+
+def _lineas_movimiento(request):
+    """
+    Lee las líneas (codigo, tipo, cantidad) del formulario de lote.
+    Los códigos se resuelven con una sola consulta.
+    Retorna (lineas, filas, errores); lineas: [(material_id, tipo, cantidad)].
+    """
+    filas = [
+        {'codigo': codigo.strip().upper(), 'tipo': tipo, 'cantidad': cantidad.strip()}
+        for codigo, tipo, cantidad in zip(
+            request.POST.getlist('codigo'), request.POST.getlist('tipo'), request.POST.getlist('cantidad')
+        )
+        if codigo.strip() or cantidad.strip()
+    ]
+    errores = []
+    if not filas:
+        errores.append('Ingresa al menos una línea.')
+    elif len(filas) > MAX_LINEAS_LOTE:
+        errores.append(f'Máximo {MAX_LINEAS_LOTE} líneas por lote.')
+    
+    ids = dict(
+        Material.objects.filter(codigo__in={f['codigo'] for f in filas})
+        .values_list('codigo', 'id')
+    )
+    lineas = []
+    for numero, fila in enumerate(filas, start=1):
+        if fila['codigo'] not in ids:
+            errores.append(f"Línea {numero}: el código '{fila['codigo']}' no existe.")
+        elif fila['tipo'] not in ('entrada', 'salida'):
+            errores.append(f'Línea {numero}: tipo de movimiento inválido.')
+        elif not fila['cantidad'].isdigit() or int(fila['cantidad']) <= 0:
+            errores.append(f'Línea {numero}: la cantidad debe ser un entero mayor a 0.')
+        else:
+            lineas.append((ids[fila['codigo']], fila['tipo'], int(fila['cantidad'])))
+    return lineas, filas, errores
+
+
+@login_required
+@verificar_rol('BODEGA')
+def registrar_movimientos_lote(request):
+    """Registrar entradas y salidas de muchos materiales en una sola operación"""
+    filas = []
+    
+    if request.method == 'POST':
+        lineas, filas, errores = _lineas_movimiento(request)
+        detalle = request.POST.get('detalle', '').strip()
+        
+        for error in errores:
+            messages.error(request, error)
+        
+        if not errores:
+            try:
+                stocks = stock_service.registrar_movimientos_lote(
+                    lineas, request.user,
+                    detalle=detalle or f'Movimiento en lote registrado por {request.user.username}'
+                )
+            except StockInsuficiente as e:
+                material = Material.objects.get(id=e.material_id)
+                messages.error(
+                    request,
+                    f'Stock insuficiente de {material.codigo}: salidas {e.solicitado}, disponible {e.disponible}. '
+                    f'No se registró ningún movimiento.'
+                )
+            except Inventario.DoesNotExist as e:
+                messages.error(request, f'Error al registrar movimientos: {str(e)}')
+            else:
+                entradas = sum(c for _, tipo, c in lineas if tipo == 'entrada')
+                salidas = sum(c for _, tipo, c in lineas if tipo == 'salida')
+                messages.success(
+                    request,
+                    f'✓ {len(lineas)} movimientos registrados en {len(stocks)} materiales '
+                    f'(+{entradas} / -{salidas} unidades).'
+                )
+                return redirect('historial_movimientos_global')
+    
+    context = {
+        'filas': filas,
+        'materiales': Material.objects.order_by('codigo').values('codigo', 'descripcion'),
+        'max_lineas': MAX_LINEAS_LOTE,
+    }
+    return render(request, 'funcionalidad/mov_registrar_lote.html', context)
+
+
 @login_required
 @verificar_rol('BODEGA') 
 def registrar_salida(request, material_id):
@@ -1099,16 +1290,10 @@ def registrar_salida(request, material_id):
         
         if cantidad <= 0:
             messages.error(request, 'La cantidad debe ser mayor a 0.')
-        elif cantidad > inventario.stock_actual:
-            messages.error(request, f'Stock insuficiente. Disponible: {inventario.stock_actual}')
         else:
             try:
                 with transaction.atomic():
-                    stock_anterior = inventario.stock_actual
-                    stock_nuevo = stock_anterior - cantidad
-                    
-                    inventario.stock_actual = stock_nuevo
-                    inventario.save()
+                    stock_nuevo = stock_service.descontar(material.id, cantidad)
                     
                     try:
                         usuario_movimiento = Usuario.objects.get(
@@ -1131,6 +1316,8 @@ def registrar_salida(request, material_id):
                         f'Salida registrada: -{cantidad} {material.unidad_medida}. Stock actual: {stock_nuevo}'
                     )
                     return redirect('detalle_material', id=material_id)
+            except StockInsuficiente as e:
+                messages.error(request, f'Stock insuficiente. Disponible: {e.disponible}')
             except Exception as e:
                 messages.error(request, f'Error al registrar salida: {str(e)}')
     
@@ -1156,18 +1343,14 @@ def ajustar_inventario(request, material_id):
     if request.method == 'POST':
         nuevo_stock = int(request.POST.get('nuevo_stock', 0))
         detalle = request.POST.get('detalle', '')
+        # Versión del inventario que el usuario tenía en pantalla
+        version = int(request.POST.get('version', -1))
         
         if nuevo_stock < 0:
             messages.error(request, 'El stock no puede ser negativo.')
         else:
             try:
                 with transaction.atomic():
-                    stock_anterior = inventario.stock_actual
-                    diferencia = nuevo_stock - stock_anterior
-                    
-                    inventario.stock_actual = nuevo_stock
-                    inventario.save()
-                    
                     try:
                         usuario_movimiento = Usuario.objects.get(
                             email=request.user.email
@@ -1176,11 +1359,15 @@ def ajustar_inventario(request, material_id):
                         messages.error(request, 'Tu usuario no está registrado en el sistema de personal.')
                         return redirect('detalle_material', id=material_id)
                     
+                    stock_anterior = stock_service.ajustar(material.id, nuevo_stock, version)
+                    diferencia = nuevo_stock - stock_anterior
+                    
                     Movimiento.objects.create(
                         material=material,
                         usuario=usuario_movimiento,
                         tipo='ajuste',
                         cantidad=abs(diferencia),
+                        variacion=diferencia,
                         detalle=f'Ajuste de inventario ({diferencia:+d}): {detalle}'
                     )
                     
@@ -1189,6 +1376,18 @@ def ajustar_inventario(request, material_id):
                         f'Inventario ajustado. Stock anterior: {stock_anterior}, Stock nuevo: {nuevo_stock}'
                     )
                     return redirect('detalle_material', id=material_id)
+            except ConflictoVersion as e:
+                # Se vuelve a mostrar el formulario con el valor vigente
+                inventario = e.inventario
+                messages.warning(
+                    request,
+                    f'El stock cambió mientras editabas: ahora es {inventario.stock_actual}. '
+                    f'Revisa el conteo y confirma nuevamente.'
+                )
+                return render(request, 'funcionalidad/mov_ajustar_inventario.html', {
+                    'material': material,
+                    'inventario': inventario,
+                }, status=409)
             except Exception as e:
                 messages.error(request, f'Error al ajustar inventario: {str(e)}')
     
@@ -1215,6 +1414,57 @@ def historial_movimientos(request, material_id):
     
     return render(request, 'funcionalidad/mov_historial.html', context)
 
+def _fecha_consulta(valor):
+    """
+    'YYYY-MM-DD' (fin de ese día) o fecha-hora ISO, en la zona horaria
+    actual. None si no es válida.
+    """
+    fecha = parse_datetime(valor or '')
+    if fecha is None:
+        dia = parse_date(valor or '')
+        if dia is None:
+            return None
+        fecha = datetime.combine(dia, datetime.max.time())
+    if timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    return fecha
+
+
+@login_required
+@verificar_rol(['BODEGA', 'GERENCIA'])
+def stock_historico_json(request, material_id):
+    """API: stock de un material en una fecha (?fecha=YYYY-MM-DD o ISO)"""
+    material = get_object_or_404(Material, id=material_id)
+    fecha = _fecha_consulta(request.GET.get('fecha'))
+    if fecha is None:
+        return JsonResponse({'error': 'Parámetro fecha inválido (YYYY-MM-DD)'}, status=400)
+    
+    resultado = stock_en(material.id, fecha)
+    if resultado is None:
+        return JsonResponse({'error': 'El material no tiene cortes de stock'}, status=404)
+    
+    return JsonResponse({
+        'material': material.codigo,
+        'fecha': fecha.isoformat(),
+        'stock': resultado['stock'],
+        'exacto': resultado['exacto'],
+        'corte': resultado['corte'].isoformat(),
+    })
+
+
+@login_required
+@verificar_rol(['BODEGA', 'GERENCIA'])
+def historial_stock_json(request, material_id):
+    """API: serie diaria de stock para gráficos (?desde=&hasta=, reducida a lo más 400 puntos)"""
+    material = get_object_or_404(Material, id=material_id)
+    desde = parse_date(request.GET.get('desde', ''))
+    hasta = parse_date(request.GET.get('hasta', ''))
+    
+    serie = serie_stock(material.id, desde, hasta)
+    serie['material'] = material.codigo
+    return JsonResponse(serie)
+
+
 @login_required
 @verificar_rol(['BODEGA', 'GERENCIA']) 
 def historial_movimientos_global(request):
@@ -1248,38 +1498,24 @@ def mis_notificaciones(request):
     - TÉCNICO: Solo notificaciones de sus solicitudes
     - BODEGA/GERENCIA: Todas las notificaciones
     """
-    usuario = request.user
-    rol = usuario.rol
-    
-    # Filtrar notificaciones según el rol
-    if rol == 'TECNICO':
-        notificaciones = Notificacion.objects.filter(
-            usuario=usuario,
-            tipo__in=['solicitud_aprobada', 'solicitud_rechazada']
-        ).order_by('-creada_en')
-    elif rol in ['BODEGA', 'GERENCIA']:
-        notificaciones = Notificacion.objects.filter(
-            usuario=usuario
-        ).order_by('-creada_en')
-    else:
-        notificaciones = Notificacion.objects.none()
-    
-    # Paginación
-    paginator = Paginator(notificaciones, 20)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    notificaciones, _ = notificaciones_service.notificaciones_visibles(request.user)
+    
+    # Paginación keyset (cursor sobre creada_en, id): sin COUNT ni OFFSET
+    pagina = notificaciones_service.paginar_keyset(
+        notificaciones,
+        siguiente=request.GET.get('siguiente'),
+        anterior=request.GET.get('anterior'),
+        limite=20,
+    )
     
-    # Estadísticas
-    stats = {
-        'total': notificaciones.count(),
-        'no_leidas': notificaciones.filter(leida=False).count(),
-        'leidas': notificaciones.filter(leida=True).count(),
-    }
+    # Estadísticas (una sola consulta)
+    stats = notificaciones_service.estadisticas(notificaciones)
     
     context = {
-        'notificaciones': page_obj,
-        'page_obj': page_obj,
+        'notificaciones': pagina['items'],
+        'pagina': pagina,
         'stats': stats,
+        'no_leidas': stats['no_leidas'],
     }
     
     return render(request, 'funcionalidad/notificaciones.html', context)
@@ -1288,8 +1524,7 @@ def mis_notificaciones(request):
 def marcar_leida(request, id):
     
     notificacion = get_object_or_404(Notificacion, id=id, usuario=request.user)
-    notificacion.leida = True
-    notificacion.save()
+    notificaciones_service.marcar_leida(notificacion)
     messages.success(request, 'Notificación marcada como leída.')
     return redirect('mis_notificaciones')
 
@@ -1297,10 +1532,7 @@ def marcar_leida(request, id):
 def marcar_todas_leidas(request):
     
     if request.method == 'POST':
-        count = Notificacion.objects.filter(
-            usuario=request.user,
-            leida=False
-        ).update(leida=True)
+        count = notificaciones_service.marcar_todas_leidas(request.user)
         
         messages.success(request, f'✓ {count} notificaciones marcadas como leídas.')
     
@@ -1310,8 +1542,7 @@ def marcar_todas_leidas(request):
 def leer_notificacion(request, id):
     
     notificacion = get_object_or_404(Notificacion, id=id, usuario=request.user)
-    notificacion.leida = True
-    notificacion.save()
+    notificaciones_service.marcar_leida(notificacion)
     
     # Redirigir a la URL de la notificación si existe
     if notificacion.url:
@@ -1324,84 +1555,50 @@ def eliminar_notificacion(request, id):
     notificacion = get_object_or_404(Notificacion, id=id, usuario=request.user)
     
     if request.method == 'POST':
-        notificacion.delete()
+        notificaciones_service.eliminar(notificacion)
         messages.success(request, '✓ Notificación eliminada.')
     
     return redirect('mis_notificaciones')
 
+def _etag_notificaciones(request):
+    return notificaciones_service.etag_dropdown(request.user)
+
+
 @login_required
+@condition(etag_func=_etag_notificaciones)
 def obtener_notificaciones_json(request):
     """
     API endpoint para obtener notificaciones no leídas en formato JSON.
-    Usado por el dropdown del navbar.
+    Usado por el dropdown del navbar cuando no hay conexión SSE.
+    Si el ETag coincide responde 304 sin armar el payload.
     
     - TÉCNICO: Solo notificaciones de sus solicitudes
     - BODEGA/GERENCIA: Todas las notificaciones del sistema
     """
-    usuario = request.user
-    rol = usuario.rol
-    
-    # Filtrar notificaciones según el rol
-    if rol == 'TECNICO':
-        # TÉCNICO: Solo notificaciones relacionadas a SUS solicitudes
-        notificaciones = Notificacion.objects.filter(
-            usuario=usuario,
-            leida=False,
-            tipo__in=['solicitud_aprobada', 'solicitud_rechazada']
-        ).order_by('-creada_en')[:10]
-    elif rol in ['BODEGA', 'GERENCIA']:
-        # BODEGA y GERENCIA: Todas las notificaciones
-        notificaciones = Notificacion.objects.filter(
-            usuario=usuario,
-            leida=False
-        ).order_by('-creada_en')[:10]
-    else:
-        # Otro rol: Sin notificaciones
-        notificaciones = Notificacion.objects.none()
-    
-    # Contar total de no leídas
-    if rol == 'TECNICO':
-        count_total = Notificacion.objects.filter(
-            usuario=usuario,
-            leida=False,
-            tipo__in=['solicitud_aprobada', 'solicitud_rechazada']
-        ).count()
-    elif rol in ['BODEGA', 'GERENCIA']:
-        count_total = Notificacion.objects.filter(
-            usuario=usuario,
-            leida=False
-        ).count()
-    else:
-        count_total = 0
-    
-    data = {
-        'count': count_total,
-        'notificaciones': [
-            {
-                'id': n.id,
-                'tipo': n.tipo,
-                'mensaje': n.mensaje,
-                'url': n.url or '',
-                'fecha': n.creada_en.strftime('%d/%m/%Y %H:%M'),
-                'icono': get_icono_notificacion(n.tipo)
-            }
-            for n in notificaciones
-        ]
-    }
-    
-    return JsonResponse(data)
-
-def get_icono_notificacion(tipo):
-    """Retorna el ícono FontAwesome según el tipo de notificación"""
-    iconos = {
-        'stock_critico': 'fa-exclamation-triangle',
-        'solicitud_pendiente': 'fa-clipboard-list',
-        'material_nuevo': 'fa-box',
-        'aprobacion': 'fa-check-circle',
-        'solicitud_aprobada': 'fa-check-circle',      # Para técnicos
-        'solicitud_rechazada': 'fa-times-circle',     # Para técnicos
-    }
-    return iconos.get(tipo, 'fa-bell')
+    return JsonResponse(notificaciones_service.resumen_dropdown(
+        request.user, siguiente=request.GET.get('siguiente')
+    ))
+
+
+async def stream_notificaciones(request):
+    """
+    Server-Sent Events con el mismo payload que obtener_notificaciones_json.
+    Solo funciona servido por ASGI; bajo WSGI responde 204 y el navbar
+    sigue con polling.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    usuario = await request.auser()
+    if not usuario.is_authenticated:
+        return HttpResponse(status=401)
+
+    response = StreamingHttpResponse(
+        difusor_notificaciones.eventos(usuario),
+        content_type='text/event-stream',
+    )
+    response['X-Accel-Buffering'] = 'no'  # nginx: no acumular el stream
+    return response
 
 
 # ============================================= DASHBOARD ====================================
@@ -1424,6 +1621,11 @@ def dashboard(request):
         stock_actual__lte=F('stock_seguridad')
     ).count()
     
+    # Próximos quiebres proyectados (índice sobre fecha_quiebre)
+    proximos_quiebres = Inventario.objects.filter(
+        fecha_quiebre__isnull=False
+    ).select_related('material').order_by('fecha_quiebre', 'dias_cobertura')[:5]
+    
     # Context base
     context = {
         'usuario': usuario,
@@ -1433,6 +1635,7 @@ def dashboard(request):
         'solicitudes_pendientes': solicitudes_pendientes,
         'materiales_criticos': materiales_criticos,
         'materiales_criticos_lista': materiales_criticos_lista,
+        'proximos_quiebres': proximos_quiebres,
     }
     
     # ========== TÉCNICO ==========
@@ -1618,13 +1821,16 @@ def dashboard(request):
 @login_required
 @verificar_rol(['BODEGA', 'GERENCIA'])  # Ambos pueden exportar
 def exportar_inventario_excel(request):
-    """Exportar inventario completo a Excel"""
+    """Exportar inventario completo a Excel (o al cierre de ?fecha=YYYY-MM-DD)"""
+    fecha = _fecha_consulta(request.GET.get('fecha'))
+    
     wb = Workbook()
     ws = wb.active
     ws.title = "Inventario"
     
     # Headers
-    headers = ['Código', 'Descripción', 'Categoría', 'Stock Actual', 'Stock Seguridad', 'Estado', 'Ubicación']
+    columna_stock = f"Stock al {fecha:%d/%m/%Y}" if fecha else 'Stock Actual'
+    headers = ['Código', 'Descripción', 'Categoría', columna_stock, 'Stock Seguridad', 'Estado', 'Ubicación']
     ws.append(headers)
     
     # Estilo para headers
@@ -1634,9 +1840,18 @@ def exportar_inventario_excel(request):
         cell.alignment = Alignment(horizontal='center')
     
     # Datos
-    inventario = Inventario.objects.select_related('material').all()
+    inventario = list(Inventario.objects.select_related('material').all())
+    historico = stock_en_lote([inv.material_id for inv in inventario], fecha) if fecha else {}
     for inv in inventario:
-        if inv.stock_actual <= inv.stock_seguridad:
+        if fecha:
+            # Sin corte para ese material no hay dato histórico
+            stock = historico.get(inv.material_id, {}).get('stock')
+        else:
+            stock = inv.stock_actual
+        
+        if stock is None:
+            estado = 'SIN DATO'
+        elif stock <= inv.stock_seguridad:
             estado = 'CRÍTICO'
         else:
             estado = 'NORMAL'
@@ -1645,7 +1860,7 @@ def exportar_inventario_excel(request):
             inv.material.codigo,
             inv.material.descripcion,
             inv.material.get_categoria_display(),
-            inv.stock_actual,
+            stock,
             inv.stock_seguridad,
             estado,
             inv.material.ubicacion or 'No especificada'
@@ -1805,6 +2020,89 @@ def exportar_movimientos_excel(request, material_id=None):
 
 
 
+@login_required
+@verificar_rol(['BODEGA', 'GERENCIA'])
+def exportar_sugerencias_compra_excel(request):
+    """Exportar sugerencias de compra (calculadas por calcular_reposicion) a Excel"""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Sugerencias de Compra"
+    
+    # Headers
+    headers = [
+        'Código', 'Descripción', 'Stock Actual', 'Demanda Diaria', 'Lead Time (días)',
+        'Punto de Pedido', 'Nivel Objetivo', 'EOQ', 'Cantidad Sugerida', 'Método'
+    ]
+    ws.append(headers)
+    
+    # Estilo para headers
+    for cell in ws[1]:
+        cell.font = Font(bold=True, color='FFFFFF')
+        cell.fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+        cell.alignment = Alignment(horizontal='center')
+    
+    # Datos
+    sugerencias = SugerenciaCompra.objects.select_related('material').order_by('material__codigo')
+    for sug in sugerencias:
+        ws.append([
+            sug.material.codigo,
+            sug.material.descripcion,
+            sug.stock_actual,
+            sug.demanda_diaria,
+            sug.leadtime_dias,
+            sug.punto_pedido,
+            sug.nivel_objetivo,
+            sug.lote_economico,
+            sug.cantidad_sugerida,
+            sug.get_metodo_display(),
+        ])
+    
+    # Ajustar anchos
+    for col in range(1, 11):
+        ws.column_dimensions[get_column_letter(col)].width = 18
+    ws.column_dimensions['B'].width = 40
+    
+    # Preparar respuesta
+    response = HttpResponse(
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+    response['Content-Disposition'] = f'attachment; filename=sugerencias_compra_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+    wb.save(response)
+    return response
+
+
+@login_required
+@verificar_rol(['GERENCIA', 'SISTEMA'])
+def exportar_parquet(request, dataset):
+    """
+    Descarga un dataset (movimientos, detalles_solicitud, demanda_diaria) en Parquet.
+    Filtros opcionales ?desde=YYYY-MM-DD&hasta=YYYY-MM-DD.
+    El archivo se arma por lotes en un temporal, sin cargar la tabla en memoria.
+    """
+    if dataset not in DATASETS_PARQUET:
+        raise Http404('Dataset no disponible')
+    
+    try:
+        desde = datetime.strptime(request.GET['desde'], '%Y-%m-%d').date() if request.GET.get('desde') else None
+        hasta = datetime.strptime(request.GET['hasta'], '%Y-%m-%d').date() if request.GET.get('hasta') else None
+    except ValueError:
+        return HttpResponse('Fechas inválidas, use YYYY-MM-DD', status=400)
+    
+    archivo = tempfile.TemporaryFile()
+    try:
+        exportar_dataset_archivo(dataset, archivo, desde=desde, hasta=hasta)
+    except ImportError as e:
+        archivo.close()
+        return HttpResponse(str(e), status=501)
+    archivo.seek(0)
+    
+    filename = f'{dataset}_{timezone.now().strftime("%Y%m%d_%H%M%S")}.parquet'
+    return FileResponse(
+        archivo, as_attachment=True, filename=filename,
+        content_type='application/vnd.apache.parquet'
+    )
+
+
 @login_required
 @verificar_rol(['BODEGA', 'GERENCIA'])
 def exportar_reporte_completo_excel(request):